@@ -0,0 +1,88 @@
+﻿from __future__ import annotations
+
+import csv
+import sys
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+EVENT_NS = "{http://schemas.microsoft.com/win/2004/08/events/event}"
+
+# EventData fields carried into the triage event (everything else is dropped)
+DATA_FIELDS = ("ProcessGuid", "ProcessId", "Image", "CommandLine", "User",
+               "ParentProcessGuid", "ParentImage", "ParentCommandLine")
+
+
+def parse_sysmon_xml(raw: str, fields: Iterable[str] = DATA_FIELDS) -> Optional[Dict[str, Any]]:
+    """
+    Purpose: Read one rendered Sysmon event (Splunk _raw / wevtutil XML).
+    Returns the `fields` of EventData plus TimeCreated/Computer/EventRecordID for
+    EventID 1, else None.
+    Note: Also the parser of the mini-soc lab's tools/sysmon_analytics.py, which asks for more fields.
+    """
+    try:
+        root = ET.fromstring(raw)
+    except ET.ParseError:
+        return None
+    system = root.find(f"{EVENT_NS}System")
+    if system is None or system.findtext(f"{EVENT_NS}EventID") != "1":
+        return None
+
+    ev: Dict[str, Any] = dict.fromkeys(fields)
+    data = root.find(f"{EVENT_NS}EventData")
+    for node in (data if data is not None else ()):
+        name = node.get("Name")
+        if name in ev:
+            ev[name] = node.text
+    created = system.find(f"{EVENT_NS}TimeCreated")
+    ev["TimeCreated"] = created.get("SystemTime") if created is not None else None
+    ev["Computer"] = system.findtext(f"{EVENT_NS}Computer")
+    ev["EventRecordID"] = system.findtext(f"{EVENT_NS}EventRecordID")
+    return ev
+
+
+def to_triage_event(ev: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Purpose: Map a Sysmon EventID 1 record onto the parse_event input schema.
+    Note: Source identifiers (record id) stay alongside so verdicts can be traced back.
+    """
+    return {
+        "timestamp": ev.get("TimeCreated"),
+        "host": ev.get("Computer"),
+        "user": ev.get("User"),
+        "event_type": "process_create",
+        "process": {
+            "image": ev.get("Image"),
+            "command_line": ev.get("CommandLine") or "",
+            "parent_image": ev.get("ParentImage"),
+            "pid": ev.get("ProcessId"),
+            "process_guid": ev.get("ProcessGuid"),
+            "parent_command_line": ev.get("ParentCommandLine"),
+        },
+        "network": {},
+        "source": "sysmon",
+        "record_id": ev.get("EventRecordID"),
+    }
+
+
+def iter_sysmon_xml(raws: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Stream triage events from rendered Sysmon XML strings (non-EventID 1 skipped)."""
+    for raw in raws:
+        ev = parse_sysmon_xml(raw)
+        if ev is not None:
+            yield to_triage_event(ev)
+
+
+def iter_splunk_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Purpose: Stream triage events from a Splunk CSV export with a _raw Sysmon XML column
+    (e.g. the mini-soc lab's splunk_sysmon_eventcode1_7d.csv). One row in memory at a time.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "_raw" not in header:
+            raise ValueError(f"{path}: expected a '_raw' column")
+        i_raw = header.index("_raw")
+        yield from iter_sysmon_xml(row[i_raw] for row in reader if len(row) > i_raw)
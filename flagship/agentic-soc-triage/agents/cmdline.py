@@ -0,0 +1,208 @@
+﻿from __future__ import annotations
+
+import base64
+import binascii
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# powershell.exe / pwsh parameters; any unambiguous prefix is accepted by the host
+PS_PARAMS = (
+    "command", "configurationname", "encodedcommand", "executionpolicy", "file", "help",
+    "inputformat", "mta", "noexit", "nologo", "noninteractive", "noprofile", "outputformat",
+    "psconsolefile", "sta", "version", "windowstyle",
+)
+# Short forms the host resolves even though they are ambiguous prefixes
+PS_ALIASES = {"e": "encodedcommand", "ec": "encodedcommand", "ep": "executionpolicy",
+              "ex": "executionpolicy", "c": "command", "f": "file", "w": "windowstyle"}
+# Parameters that consume the next token as their value
+PS_VALUED = {"configurationname", "encodedcommand", "executionpolicy", "inputformat",
+             "outputformat", "psconsolefile", "version", "windowstyle"}
+# Parameters after which the rest of the line belongs to the script
+PS_TERMINAL = {"command", "file"}
+
+PS_IMAGES = {"powershell", "powershell.exe", "pwsh", "pwsh.exe", "powershell_ise.exe"}
+
+DOWNLOAD_MARKERS = ("downloadstring", "downloadfile", "downloaddata", "net.webclient", "invoke-webrequest",
+                    "iwr ", "start-bitstransfer", "invoke-restmethod", "irm ")
+
+# Base64 decode cap (characters of payload); longer payloads are decoded up to the cap
+MAX_ENCODED_CHARS = 32768
+# Decoded script text kept in the feature vector
+MAX_DECODED_CHARS = 4096
+MAX_NESTING = 2
+
+
+def _build_prefix_table() -> Dict[str, str]:
+    table: Dict[str, str] = {}
+    ambiguous = set()
+    for name in PS_PARAMS:
+        for i in range(1, len(name) + 1):
+            prefix = name[:i]
+            if prefix in table and table[prefix] != name:
+                ambiguous.add(prefix)
+            table[prefix] = name
+    for prefix in ambiguous:
+        del table[prefix]
+    for name in PS_PARAMS:
+        table[name] = name  # full names win over longer names they prefix
+    table.update(PS_ALIASES)
+    return table
+
+
+PS_PREFIXES = _build_prefix_table()
+
+# cmd.exe escape (^x -> x), Unicode dashes PowerShell accepts as parameter prefixes
+_CARET = re.compile(r"\^(.)", re.S)
+_DASHES = str.maketrans({"–": "-", "—": "-", "―": "-"})
+# CommandLineToArgvW-style token: runs of non-space text and "quoted spans"
+_TOKEN = re.compile(r'(?:[^\s"]+|"[^"]*"?)+')
+_QUOTE_IN_WORD = re.compile(r'[^\s"]"+[^\s"]')
+_B64 = re.compile(r"[A-Za-z0-9+/=]+")
+
+
+def normalize(cmd: str) -> str:
+    """Strip cmd.exe carets and fold Unicode dashes. Case is kept (base64 payloads need it)."""
+    if "^" in cmd:
+        cmd = _CARET.sub(r"\1", cmd)
+    return cmd.translate(_DASHES)
+
+
+def tokenize(cmd: str) -> List[str]:
+    """Split a (normalized) command line into arguments; quotes group and are dropped."""
+    return [t.replace('"', "") for t in _TOKEN.findall(cmd)]
+
+
+def _lowered(tokens: List[str]) -> List[Tuple[str, str]]:
+    return [(t.lower(), t) for t in tokens]
+
+
+def image_of(token: str) -> str:
+    return token.replace("/", "\\").rsplit("\\", 1)[-1]
+
+
+def _param(token: str, strict: bool) -> Optional[str]:
+    """Resolve `-enc`, `/enc`, `-EncodedCommand:` ... to a parameter name. `strict` drops 1-2 letter forms."""
+    if len(token) < 2 or token[0] not in "-/":
+        return None
+    name = token[1:].split(":", 1)[0]
+    if strict and len(name) < 3:
+        return None
+    return PS_PREFIXES.get(name)
+
+
+def decode_payload(payload: str) -> Tuple[Optional[str], bool]:
+    """
+    Decode a -EncodedCommand payload (base64 of UTF-16LE script text).
+    Returns (text or None if undecodable, truncated).
+    """
+    payload = payload.strip()
+    truncated = len(payload) > MAX_ENCODED_CHARS
+    if truncated:
+        payload = payload[:MAX_ENCODED_CHARS - MAX_ENCODED_CHARS % 4]
+    if not payload or not _B64.fullmatch(payload):
+        return None, truncated
+    try:
+        raw = base64.b64decode(payload + "=" * (-len(payload) % 4), validate=True)
+    except (binascii.Error, ValueError):
+        return None, truncated
+    if len(raw) >= 2 and raw[1] == 0:
+        text = raw[: len(raw) - len(raw) % 2].decode("utf-16-le", errors="replace")
+    else:
+        text = raw.decode("utf-8", errors="replace")
+    return text[:MAX_DECODED_CHARS], truncated
+
+
+def _scan_powershell(args: List[Tuple[str, str]], strict: bool, feat: Dict[str, Any], depth: int) -> None:
+    """Read powershell.exe host parameters from `args` ((lowered, original) tokens) into `feat`."""
+    i = 0
+    while i < len(args):
+        token = args[i][0]
+        name = _param(token, strict)
+        if name is None:
+            i += 1
+            if not strict:
+                break  # first bare argument is an implicit -Command
+            continue
+        inline = token.split(":", 1)[1] if ":" in token else None
+        original = args[i][1].split(":", 1)[1] if inline is not None else None
+        if inline is None and name in PS_VALUED and i + 1 < len(args):
+            inline, original = args[i + 1]
+            i += 1
+        value = inline
+        i += 1
+
+        if name == "encodedcommand":
+            feat["encoded_command"] = True
+            if value:
+                text, truncated = decode_payload(original)
+                feat["encoded_payload_len"] = len(original)
+                feat["encoded_truncated"] = truncated
+                feat["decode_error"] = text is None
+                if text is not None:
+                    feat["decoded_command"] = text
+        elif name == "windowstyle":
+            if value and (value in ("1", "hid", "hidden") or "hidden".startswith(value)):
+                feat["hidden_window"] = True
+        elif name == "executionpolicy":
+            if value in ("bypass", "unrestricted"):
+                feat["execution_policy_bypass"] = True
+        elif name == "noprofile":
+            feat["no_profile"] = True
+        elif name == "noninteractive":
+            feat["non_interactive"] = True
+        elif name in PS_TERMINAL:
+            feat["command_flag"] = feat["command_flag"] or name == "command"
+            _scan_tokens(args[i:], feat, depth + 1)  # nested invocations only
+            break
+
+
+def _scan_tokens(tokens: List[Tuple[str, str]], feat: Dict[str, Any], depth: int) -> bool:
+    """Find powershell invocations (also inside quoted arguments, e.g. cmd /c "powershell ...")."""
+    found = False
+    for i, (low, original) in enumerate(tokens):
+        if image_of(low) in PS_IMAGES:
+            found = True
+            _scan_powershell(tokens[i + 1:], False, feat, depth)
+            break  # the rest of the line belongs to this invocation
+        if " " in low and depth < MAX_NESTING and _scan_tokens(_lowered(tokenize(original)), feat, depth + 1):
+            found = True
+    if not found and depth == 0 and tokens and _param(tokens[0][0], False) is not None:
+        # Line starts with a parameter, so the image is not on it (e.g. a CommandLine field holding
+        # only the arguments). Any other first token is some other program's image, whose own flags
+        # (certutil -encode, reg -windowstyle) must not read as PowerShell. Only unmistakable
+        # (3+ letter) parameter names count here.
+        _scan_powershell(tokens, True, feat, depth)
+    return found
+
+
+@lru_cache(maxsize=8192)
+def extract_features(cmd: str) -> Dict[str, Any]:
+    """
+    Purpose: One feature vector per distinct command line; every enrichment heuristic reads from it.
+    Note: Memoized (lru_cache keys on the string hash); callers must not mutate the result.
+    """
+    norm = normalize(cmd)
+    tokens = _lowered(tokenize(norm))
+    feat: Dict[str, Any] = {
+        "image": image_of(tokens[0][0]) if tokens else "",
+        "token_count": len(tokens),
+        "is_powershell": False,
+        "encoded_command": False,
+        "encoded_payload_len": 0,
+        "encoded_truncated": False,
+        "decode_error": False,
+        "decoded_command": None,
+        "hidden_window": False,
+        "execution_policy_bypass": False,
+        "no_profile": False,
+        "non_interactive": False,
+        "command_flag": False,
+        "caret_obfuscation": "^" in cmd,
+        "quote_obfuscation": bool(_QUOTE_IN_WORD.search(cmd)),
+    }
+    feat["is_powershell"] = _scan_tokens(tokens, feat, 0)
+    script = (norm + " " + (feat["decoded_command"] or "")).lower()
+    feat["download_cradle"] = any(m in script for m in DOWNLOAD_MARKERS)
+    return feat
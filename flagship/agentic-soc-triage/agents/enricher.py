@@ -2,6 +2,8 @@
 
 from typing import Any, Dict
 
+from agents.cmdline import extract_features
+
 
 def enrich_event(parsed: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -9,18 +11,20 @@ def enrich_event(parsed: Dict[str, Any]) -> Dict[str, Any]:
     State/Gov-friendly: Enrichment is deterministic and reviewable.
     """
     dst_ip = (parsed.get("network") or {}).get("dst_ip")
-    cmd = (parsed.get("process") or {}).get("command_line", "")
+    cmd = (parsed.get("process") or {}).get("command_line") or ""
+    features = extract_features(cmd)  # memoized per distinct command line
 
     # Mock reputation and heuristics (replace with real sources in Phase 2)
     rep = {"dst_ip": dst_ip, "reputation": "unknown", "source": "mock"}
     if dst_ip and dst_ip.startswith("185."):
         rep["reputation"] = "suspicious"
 
+    # All command-line heuristics read the tokenized feature vector (see agents/cmdline.py)
     heuristics = {
-        "has_encoded_command": (" -enc " in cmd.lower()) or (" -encodedcommand " in cmd.lower()),
-        "has_hidden_window": ("-w hidden" in cmd.lower()) or ("-windowstyle hidden" in cmd.lower()),
+        "has_encoded_command": features["encoded_command"],
+        "has_hidden_window": features["hidden_window"],
     }
 
     enriched = dict(parsed)
-    enriched["enrichment"] = {"ip_reputation": rep, "heuristics": heuristics}
+    enriched["enrichment"] = {"ip_reputation": rep, "heuristics": heuristics, "command_line": dict(features)}
     return enriched
@@ -0,0 +1,148 @@
+﻿from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from itertools import cycle, islice
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from adapters.sysmon import iter_splunk_csv
+from pipelines.bulk import MINI_SOC_SYSMON, ROOT
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def encode_requests(events: List[Dict[str, Any]], per_request: int, count: int) -> List[Tuple[bytes, str, int]]:
+    """Pre-encode `count` request bodies (cycling through `events`) so the client measures the server, not json.dumps."""
+    bodies = []
+    source = cycle(events)
+    for _ in range(count):
+        chunk = list(islice(source, per_request))
+        if per_request == 1:
+            bodies.append((json.dumps(chunk[0]).encode("utf-8"), "application/json", 1))
+        else:
+            body = "\n".join(json.dumps(e) for e in chunk) + "\n"
+            bodies.append((body.encode("utf-8"), "application/x-ndjson", len(chunk)))
+    return bodies
+
+
+def client(url: str, bodies: List[Tuple[bytes, str, int]], latencies: List[float], errors: List[str]) -> None:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+    clock = time.perf_counter
+    for body, content_type, _ in bodies:
+        start = clock()
+        try:
+            conn.request("POST", target.path or "/triage", body, {"Content-Type": content_type})
+            resp = conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(f"{type(exc).__name__}: {exc}")
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+            continue
+        latencies.append(clock() - start)
+        if resp.status != 200 or b'"error"' in data:
+            errors.append(f"HTTP {resp.status}: {data[:200]!r}")
+    conn.close()
+
+
+def spawn_server(max_batch: int, max_wait_ms: float) -> Tuple[subprocess.Popen, str]:
+    """Start pipelines.serve on a free loopback port and wait until /health answers."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", "pipelines.serve", "--port", str(port),
+                             "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)],
+                            cwd=str(ROOT), stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, f"http://127.0.0.1:{port}/triage"
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("triage server did not start")
+
+
+def health(url: str) -> Dict[str, Any]:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=5)
+    conn.request("GET", "/health")
+    return json.loads(conn.getresponse().read())
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Load-test the triage HTTP API: throughput and latency percentiles.")
+    ap.add_argument("--url", default=None, help="Triage endpoint, e.g. http://127.0.0.1:8087/triage")
+    ap.add_argument("--spawn", action="store_true", help="Start a local pipelines.serve instance for the run")
+    ap.add_argument("--csv", default=str(MINI_SOC_SYSMON), help="Sysmon CSV export used as the event source")
+    ap.add_argument("--concurrency", "-c", type=int, default=8, help="Client connections")
+    ap.add_argument("--requests", "-n", type=int, default=2000, help="Total requests")
+    ap.add_argument("--per-request", type=int, default=1, help="Events per request (>1 sends NDJSON)")
+    ap.add_argument("--max-batch", type=int, default=64, help="Server micro-batch size (with --spawn)")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="Server micro-batch wait (with --spawn)")
+    args = ap.parse_args()
+    if not args.url and not args.spawn:
+        ap.error("give --url of a running server or --spawn")
+
+    events = list(iter_splunk_csv(args.csv))
+    if not events:
+        ap.error(f"no Sysmon EventID 1 events in {args.csv}")
+    bodies = encode_requests(events, max(1, args.per_request), args.requests)
+
+    proc = None
+    url = args.url
+    if args.spawn:
+        proc, url = spawn_server(args.max_batch, args.max_wait_ms)
+    try:
+        concurrency = max(1, min(args.concurrency, len(bodies)))
+        latencies: List[List[float]] = [[] for _ in range(concurrency)]
+        errors: List[str] = []
+        threads = [threading.Thread(target=client, args=(url, bodies[i::concurrency], latencies[i], errors))
+                   for i in range(concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stats = health(url)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat = sorted(x for per in latencies for x in per)
+    n_events = sum(n for _, _, n in bodies)
+    print(f"[OK] {len(lat)} requests ({n_events} events) over {concurrency} connections in {elapsed:.2f}s")
+    print(f"[OK] Throughput: {len(lat) / elapsed:.0f} req/s, {n_events / elapsed:.0f} events/s")
+    print("[OK] Latency ms: " + "  ".join(f"p{p}={percentile(lat, p) * 1000:.2f}" for p in (50, 95, 99))
+          + f"  max={lat[-1] * 1000 if lat else 0:.2f}")
+    print(f"[OK] Server batches: {stats['batcher']}")
+    if errors:
+        print(f"[!] {len(errors)} errors, e.g. {errors[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
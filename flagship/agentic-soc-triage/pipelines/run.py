@@ -4,7 +4,9 @@
 
 from __future__ import annotations
 
+import argparse
 import json
+import sys
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any, Dict
@@ -19,12 +21,26 @@ ROOT = Path(__file__).resolve().parents[1]
 SAMPLE = ROOT / "data" / "sample_logs" / "sample.json"
 REPORTS = ROOT / "reports"
 
+# Repo-wide instrumentation (--profile)
+SHARED = ROOT.parents[1] / "shared"
+if str(SHARED) not in sys.path:
+    sys.path.insert(0, str(SHARED))
+from instrumentation import add_profile_args, profile_session  # noqa: E402
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 def main() -> int:
+    ap = argparse.ArgumentParser(description="Triage the sample event and write a JSON report.")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    with profile_session(args, "triage-run"):
+        return run()
+
+
+def run() -> int:
     REPORTS.mkdir(parents=True, exist_ok=True)
 
     raw: Dict[str, Any] = json.loads(SAMPLE.read_text(encoding="utf-8-sig"))
@@ -0,0 +1,387 @@
+﻿from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from adapters.sysmon import iter_splunk_csv
+from agents.cmdline import extract_features
+from agents.parser import parse_event
+from agents.enricher import enrich_event
+from agents.classifier import classify_event
+from agents.responder import recommend_response
+from pipelines.bulk import MINI_SOC_SYSMON, STAGES, BulkSummary
+
+
+DEFAULT_QUEUE = 256
+# Shed once a sheddable stage's inbound queue has stayed >= 90% full for half a second
+DEFAULT_WATERMARK = 0.9
+DEFAULT_SHED_AFTER = 0.5
+
+_DONE = object()  # end-of-stream marker passed stage to stage
+_POLL = 0.1
+
+
+def prescreened_benign(item: Dict[str, Any]) -> bool:
+    """
+    True when the event is Benign whatever enrichment returns: without an encoded command or a
+    hidden window the command line scores 0, and a suspicious reputation alone (25) stays below
+    the Suspicious band (35). Reads the same memoized features as enrich_event, so it is cheap.
+    """
+    cmd = ((item.get("parsed") or {}).get("process") or {}).get("command_line") or ""
+    features = extract_features(cmd)
+    return not (features["encoded_command"] or features["hidden_window"])
+
+
+def enrich_without_lookups(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Command-line enrichment only; the reputation lookup is recorded as skipped."""
+    enriched = enrich_event(parsed)
+    dst_ip = enriched["enrichment"]["ip_reputation"]["dst_ip"]
+    enriched["enrichment"]["ip_reputation"] = {"dst_ip": dst_ip, "reputation": "not_checked", "source": "shed"}
+    return enriched
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step: fn(*item[k] for k in inputs) -> item[output].
+    `shed` marks items that may skip `fn` while this stage is saturated (its inbound queue stays
+    above the watermark); they get `fallback(*inputs)` instead, which must be cheap.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    output: str
+    workers: int = 1
+    mode: str = "thread"  # "thread" or "process" (fn must be picklable)
+    shed: Optional[Callable[[Dict[str, Any]], bool]] = None
+    fallback: Optional[Callable[..., Any]] = None
+
+
+def _delayed(fn: Callable[..., Any], delay: float, *args: Any) -> Any:
+    time.sleep(delay)
+    return fn(*args)
+
+
+def default_stages(workers: Optional[Dict[str, int]] = None, mode: str = "thread",
+                   enrich_delay: float = 0.0) -> List[Stage]:
+    """
+    Purpose: parse -> enrich -> classify -> respond as runtime stages.
+    Enrichment is the stage that waits on external sources, so it is the one that sheds: while
+    its inbound queue is saturated, prescreened-Benign events skip the lookups and are enriched
+    from the command line only. Their verdict cannot change (see prescreened_benign), so the
+    enrich workers are freed for the events that need them.
+    `enrich_delay` simulates a slow enrichment source (seconds per event) for load tests.
+    """
+    workers = workers or {}
+    enrich = partial(_delayed, enrich_event, enrich_delay) if enrich_delay else enrich_event
+    return [
+        Stage("parse", parse_event, ("raw",), "parsed", workers.get("parse", 1), mode),
+        Stage("enrich", enrich, ("parsed",), "enriched", workers.get("enrich", 1), mode,
+              shed=prescreened_benign, fallback=enrich_without_lookups),
+        Stage("classify", classify_event, ("enriched",), "verdict", workers.get("classify", 1), mode),
+        Stage("respond", recommend_response, ("enriched", "verdict"), "recommended_response",
+              workers.get("respond", 1), mode),
+    ]
+
+
+class ShedPolicy:
+    """
+    Reports saturation once queue fill has stayed at or above `watermark` for `after` seconds,
+    and keeps reporting it until fill drops below `low` (half the watermark by default), so a
+    stage that is shedding drains its backlog instead of flapping at the watermark.
+    Shared by all workers of a stage, hence the lock.
+    """
+
+    def __init__(self, watermark: float = DEFAULT_WATERMARK, after: float = DEFAULT_SHED_AFTER,
+                 low: Optional[float] = None):
+        self.watermark = watermark
+        self.after = after
+        self.low = watermark / 2 if low is None else low
+        self._since: Optional[float] = None
+        self._shedding = False
+        self._lock = threading.Lock()
+
+    def saturated(self, fill: float, now: float) -> bool:
+        with self._lock:
+            if self._shedding:
+                if fill < self.low:
+                    self._shedding = False
+                    self._since = None
+                return self._shedding
+            if fill >= self.watermark:
+                if self._since is None:
+                    self._since = now
+                self._shedding = now - self._since >= self.after
+                return self._shedding
+            self._since = None
+            return False
+
+
+class Metrics:
+    """Thread-safe counters plus live queue depths; snapshot() is cheap enough to poll."""
+
+    def __init__(self, names: List[str], queues: List["queue.Queue[Any]"]):
+        self._lock = threading.Lock()
+        self._names = names
+        self._queues = queues
+        self.events_in = 0
+        self.events_out = 0
+        self.reader_blocked = 0.0
+        self.processed = dict.fromkeys(names, 0)
+        self.shed = dict.fromkeys(names, 0)
+        self.errors = dict.fromkeys(names, 0)
+        self.max_depth = dict.fromkeys(names, 0)
+        self.last_error: Optional[str] = None
+
+    def inc(self, counter: str, stage: str) -> None:
+        with self._lock:
+            getattr(self, counter)[stage] += 1
+
+    def error(self, stage: str, exc: BaseException) -> None:
+        with self._lock:
+            self.errors[stage] += 1
+            self.last_error = f"{stage}: {type(exc).__name__}: {exc}"
+
+    def observe(self, stage: str, depth: int) -> None:
+        if depth > self.max_depth[stage]:
+            self.max_depth[stage] = depth
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "events_in": self.events_in,
+                "events_out": self.events_out,
+                "reader_blocked_s": round(self.reader_blocked, 4),
+                "queues": {
+                    name: {"depth": q.qsize(), "max_depth": self.max_depth[name], "capacity": q.maxsize}
+                    for name, q in zip(self._names, self._queues)
+                },
+                "processed": dict(self.processed),
+                "shed": dict(self.shed),
+                "errors": dict(self.errors),
+                "last_error": self.last_error,
+            }
+
+
+class TriageRuntime:
+    """
+    Purpose: Run triage as a streaming, flow-controlled pipeline.
+    Every stage reads from a bounded queue, so a slow stage blocks its producers and
+    ultimately the reader (backpressure) instead of buffering events without limit.
+    """
+
+    def __init__(self, stages: Optional[List[Stage]] = None, queue_size: int = DEFAULT_QUEUE,
+                 watermark: float = DEFAULT_WATERMARK, shed_after: float = DEFAULT_SHED_AFTER):
+        self.stages = stages or default_stages()
+        self.queue_size = queue_size
+        # queues[i] feeds stage i; the last one feeds the caller
+        self.queues: List["queue.Queue[Any]"] = [queue.Queue(maxsize=queue_size) for _ in range(len(self.stages) + 1)]
+        self.metrics = Metrics([s.name for s in self.stages], self.queues[:-1])
+        # One policy per sheddable stage, judged on that stage's own inbound queue: a full queue
+        # upstream of it (e.g. the reader outpacing parse) is ordinary backpressure, not saturation
+        self.policies = {idx: ShedPolicy(watermark, shed_after)
+                         for idx, stage in enumerate(self.stages) if stage.shed is not None}
+        self._stop = threading.Event()
+
+    def pressure(self, idx: int) -> float:
+        """Fill ratio of the queue feeding stage `idx` (0.0 - 1.0)."""
+        return self.queues[idx].qsize() / self.queue_size if self.queue_size > 0 else 0.0
+
+    def _put(self, q: "queue.Queue[Any]", item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue[Any]") -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _reader(self, events: Iterable[Dict[str, Any]]) -> None:
+        inbound, first = self.queues[0], self.stages[0].name
+        clock = time.perf_counter
+        seq = 0
+        try:
+            for raw in events:
+                item = {"seq": seq, "raw": raw, "elapsed": 0.0, "shed": []}
+                start = clock()
+                if not self._put(inbound, item):
+                    return
+                self.metrics.reader_blocked += clock() - start
+                self.metrics.events_in = seq = seq + 1
+                self.metrics.observe(first, inbound.qsize())
+        except Exception as exc:  # a broken source ends the stream; the stages still drain
+            self.metrics.error(first, exc)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._put(inbound, _DONE)
+
+    def _worker(self, idx: int, stage: Stage, pool: Optional[Executor],
+                remaining: List[int], lock: threading.Lock) -> None:
+        inbound, outbound = self.queues[idx], self.queues[idx + 1]
+        nxt = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+        policy = self.policies.get(idx)
+        clock = time.perf_counter
+        try:
+            while True:
+                item = self._get(inbound)
+                if item is _DONE:
+                    break
+                shed = (policy is not None and policy.saturated(self.pressure(idx), time.monotonic())
+                        and stage.shed(item))
+                args = [item[k] for k in stage.inputs]
+                start = clock()
+                try:
+                    if shed:
+                        item[stage.output] = stage.fallback(*args) if stage.fallback else None
+                    else:
+                        item[stage.output] = pool.submit(stage.fn, *args).result() if pool else stage.fn(*args)
+                except Exception as exc:
+                    self.metrics.error(stage.name, exc)
+                    continue  # rejected (e.g. parse_event schema errors): dropped and counted
+                item["elapsed"] += clock() - start
+                if shed:
+                    item["shed"].append(stage.name)
+                self.metrics.inc("shed" if shed else "processed", stage.name)
+                if not self._put(outbound, item):
+                    break
+                if nxt is not None:
+                    self.metrics.observe(nxt.name, outbound.qsize())
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for _ in range(nxt.workers if nxt else 1):
+                    self._put(outbound, _DONE)
+
+    def run(self, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Stream results (completion order; "seq" gives input order) as the stages produce them.
+        Each result holds raw/parsed/enriched/verdict/recommended_response, its agent time
+        ("elapsed") and the stages it skipped under load ("shed").
+        """
+        self._stop.clear()
+        pools: List[Executor] = []
+        threads = [threading.Thread(target=self._reader, args=(events,), name="triage-reader", daemon=True)]
+        for idx, stage in enumerate(self.stages):
+            pool = None
+            if stage.mode == "process":
+                pool = ProcessPoolExecutor(max_workers=stage.workers)
+                pools.append(pool)
+            remaining, lock = [stage.workers], threading.Lock()
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=self._worker, args=(idx, stage, pool, remaining, lock),
+                                                name=f"triage-{stage.name}-{n}", daemon=True))
+        for t in threads:
+            t.start()
+        out = self.queues[-1]
+        try:
+            while True:
+                item = self._get(out)
+                if item is _DONE:
+                    break
+                self.metrics.events_out += 1
+                yield item
+        finally:
+            self._stop.set()  # also unblocks everything if the caller stopped early
+            for t in threads:
+                t.join()
+            for pool in pools:
+                pool.shutdown()
+
+
+def iter_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Splunk Sysmon CSV (via adapters.sysmon), NDJSON (one event per line) or a single JSON event/list."""
+    if path.lower().endswith(".csv"):
+        yield from iter_splunk_csv(path)
+        return
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parse_workers(specs: List[str]) -> Dict[str, int]:
+    workers = {}
+    for spec in specs:
+        name, _, count = spec.partition("=")
+        if name not in STAGES or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(f"expected stage=N, got {spec!r}")
+        workers[name] = int(count)
+    return workers
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Streaming triage with bounded queues, backpressure and load shedding.")
+    ap.add_argument("input", nargs="?", default=str(MINI_SOC_SYSMON), help="Sysmon CSV export, NDJSON or JSON events")
+    ap.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE, help="Capacity of each inter-stage queue")
+    ap.add_argument("--workers", nargs="*", default=[], metavar="STAGE=N", help="e.g. enrich=4 respond=2")
+    ap.add_argument("--mode", choices=("thread", "process"), default="thread", help="Stage worker type")
+    ap.add_argument("--watermark", type=float, default=DEFAULT_WATERMARK, help="Enrich inbox fill ratio treated as saturated")
+    ap.add_argument("--shed-after", type=float, default=DEFAULT_SHED_AFTER, help="Seconds of saturation before shedding")
+    ap.add_argument("--enrich-delay-ms", type=float, default=0.0, help="Simulate slow enrichment (load testing)")
+    ap.add_argument("--metrics-every", type=float, default=0.0, help="Print a metrics line to stderr every N seconds")
+    ap.add_argument("--out", help="Write results as NDJSON")
+    ap.add_argument("--top", type=int, default=5)
+    args = ap.parse_args()
+    try:
+        workers = _parse_workers(args.workers)
+    except argparse.ArgumentTypeError as e:
+        ap.error(str(e))
+
+    runtime = TriageRuntime(default_stages(workers, args.mode, args.enrich_delay_ms / 1000.0),
+                            args.queue_size, args.watermark, args.shed_after)
+    summary = BulkSummary(args.top)
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    start = last = time.perf_counter()
+    try:
+        for item in runtime.run(iter_events(args.input)):
+            summary.add(item)
+            if out:
+                item.pop("enriched", None)
+                out.write(json.dumps(item, default=str) + "\n")
+            if args.metrics_every and time.perf_counter() - last >= args.metrics_every:
+                last = time.perf_counter()
+                snap = runtime.metrics.snapshot()
+                depths = " ".join(f"{k}={v['depth']}" for k, v in snap["queues"].items())
+                print(f"[..] in={snap['events_in']} out={snap['events_out']} {depths} shed={sum(snap['shed'].values())}",
+                      file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+    result = summary.to_dict(time.perf_counter() - start)
+    metrics = runtime.metrics.snapshot()
+
+    print(f"[OK] {result['events']} events in {result['seconds']:.3f}s ({result['events_per_sec']} events/s)")
+    print(f"[OK] Verdicts: {result['verdicts']}")
+    for name, q in metrics["queues"].items():
+        print(f"  - {name}: processed={metrics['processed'][name]} shed={metrics['shed'][name]} "
+              f"errors={metrics['errors'][name]} max_depth={q['max_depth']}/{q['capacity']}")
+    print(f"[OK] Reader blocked (backpressure): {metrics['reader_blocked_s']}s")
+    if metrics["last_error"]:
+        print(f"[!] Last error: {metrics['last_error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+﻿from __future__ import annotations
+
+import argparse
+import json
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+from agents.cmdline import extract_features
+from agents.parser import REQUIRED_TOP_LEVEL
+from pipelines.bulk import triage_batch
+from pipelines.run import SAMPLE
+
+
+DEFAULT_PORT = 8087
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+# Largest request body accepted (single event or NDJSON batch)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+RESULT_TIMEOUT = 30.0
+
+_STOP = object()
+
+
+class InvalidEvent(ValueError):
+    """The event was rejected before triage (client error, answered with 400)."""
+
+
+def validate(evt: Any) -> str | None:
+    """Reason the event cannot be triaged, or None. Checked per event so one bad line never fails a batch."""
+    if not isinstance(evt, dict):
+        return "event must be a JSON object"
+    missing = [k for k in REQUIRED_TOP_LEVEL if k not in evt]
+    if missing:
+        return f"Missing required fields: {missing}"
+    return None
+
+
+class MicroBatcher:
+    """
+    Purpose: Group events from concurrent requests into batches for triage_batch.
+    A batch closes at `max_batch` events or `max_wait` seconds after its first event,
+    whichever comes first, so a lone request waits at most max_wait.
+    """
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_wait: float = DEFAULT_MAX_WAIT_MS / 1000.0):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.batches = 0
+        self.events = 0
+        self.largest = 0
+        self.busy = 0.0
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="triage-batcher", daemon=True)
+
+    def start(self) -> "MicroBatcher":
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._q.put(_STOP)
+        self._thread.join()
+
+    def submit(self, events: List[Any]) -> List[Future]:
+        futures = []
+        for evt in events:
+            fut: Future = Future()
+            error = validate(evt)
+            if error:
+                fut.set_exception(InvalidEvent(error))
+            else:
+                self._q.put((evt, fut))
+            futures.append(fut)
+        return futures
+
+    def _collect(self, first: Tuple[Dict[str, Any], Future]) -> Tuple[List[Tuple[Dict[str, Any], Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._q.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+            start = time.perf_counter()
+            try:
+                results = triage_batch([evt for evt, _ in batch])
+            except Exception:
+                # One malformed event (e.g. a non-object "process") must not fail its neighbours
+                for evt, fut in batch:
+                    try:
+                        fut.set_result(triage_batch([evt])[0])
+                    except Exception as exc:
+                        fut.set_exception(exc)
+            else:
+                for (_, fut), result in zip(batch, results):
+                    fut.set_result(result)
+            self.busy += time.perf_counter() - start
+            self.batches += 1
+            self.events += len(batch)
+            self.largest = max(self.largest, len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "events": self.events,
+            "avg_batch": round(self.events / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest,
+            "queued": self._q.qsize(),
+            "busy_s": round(self.busy, 4),
+        }
+
+
+def result_body(fut: Future) -> Tuple[int, Dict[str, Any]]:
+    """(HTTP status, body) for one event: 400 rejected input, 504 timed out, 500 triage failed."""
+    try:
+        result = fut.result(timeout=RESULT_TIMEOUT)
+    except FutureTimeout:
+        return 504, {"error": "triage timed out"}
+    except InvalidEvent as exc:
+        return 400, {"error": str(exc)}
+    except Exception as exc:
+        return 500, {"error": f"triage failed: {type(exc).__name__}: {exc}"}
+    return 200, {"verdict": result["verdict"], "recommended_response": result["recommended_response"]}
+
+
+class TriageServer(ThreadingHTTPServer):
+    """Thread-per-connection server; all triage work is funneled through one MicroBatcher."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], batcher: MicroBatcher):
+        super().__init__(address, TriageHandler)
+        self.batcher = batcher
+        self.started = time.time()
+
+
+class TriageHandler(BaseHTTPRequestHandler):
+    """
+    POST /triage  application/json       one event    -> {"verdict", "recommended_response"}
+                  application/x-ndjson   one per line -> one result line per input line, in order
+    GET  /health                                      -> batcher and cache statistics
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so SOAR clients can reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes; avoid the 40 ms delayed-ACK stall
+    server: TriageServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # per-request access logs would dominate the cost of a triage call
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        self._send(status, json.dumps(obj).encode("utf-8"))
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        cache = extract_features.cache_info()
+        self._send_json(200, {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.server.started, 1),
+            "batcher": self.server.batcher.stats(),
+            "feature_cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize},
+        })
+
+    def do_POST(self) -> None:
+        if self.path.split("?", 1)[0] != "/triage":
+            self._send_json(404, {"error": "not found"})
+            return
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self.close_connection = True  # body (if any) has no known end; the stream cannot be reused
+            self._send_json(411, {"error": "Content-Length required"})
+            return
+        header = header.strip()
+        if not (header.isascii() and header.isdigit()):  # rejects "abc", "-1", "1_0"
+            self.close_connection = True
+            self._send_json(400, {"error": f"invalid Content-Length: {header!r}"})
+            return
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"})
+            return
+        body = self.rfile.read(length).decode("utf-8-sig", errors="replace")
+        ndjson = "ndjson" in (self.headers.get("Content-Type") or "")
+
+        if not ndjson:
+            try:
+                evt = json.loads(body)
+            except ValueError as exc:
+                self._send_json(400, {"error": f"invalid JSON: {exc}"})
+                return
+            self._send_json(*result_body(self.server.batcher.submit([evt])[0]))
+            return
+
+        # Submit every parsed line at once so they share micro-batches; bad lines answer in place
+        slots: List[Any] = []
+        events: List[Any] = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+                slots.append(None)
+            except ValueError as exc:
+                slots.append({"error": f"invalid JSON: {exc}"})
+        futures = iter(self.server.batcher.submit(events))
+        # Per-line errors are reported in the line; the response itself is 200
+        lines = [json.dumps(slot if slot is not None else result_body(next(futures))[1]) for slot in slots]
+        self._send(200, ("\n".join(lines) + "\n").encode("utf-8") if lines else b"", "application/x-ndjson")
+
+
+def warm_up(batcher: MicroBatcher) -> None:
+    """Triage the sample event once so agents, regexes and caches are hot before the first request."""
+    sample = json.loads(SAMPLE.read_text(encoding="utf-8-sig"))
+    batcher.submit([sample])[0].result(timeout=RESULT_TIMEOUT)
+
+
+def _raise_interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Local HTTP triage API with micro-batching.")
+    ap.add_argument("--host", default="127.0.0.1", help="Bind address (default: loopback only)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Events per micro-batch")
+    ap.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                    help="Longest an event waits for its batch to fill")
+    args = ap.parse_args()
+
+    batcher = MicroBatcher(args.max_batch, args.max_wait_ms / 1000.0).start()
+    warm_up(batcher)
+    server = TriageServer((args.host, args.port), batcher)
+    print(f"[OK] Triage API: http://{args.host}:{server.server_address[1]}/triage "
+          f"(max batch {batcher.max_batch}, max wait {args.max_wait_ms:g} ms)", flush=True)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(f"[OK] Stopped after {batcher.events} events in {batcher.batches} batches")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
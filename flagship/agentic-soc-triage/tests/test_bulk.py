@@ -0,0 +1,44 @@
+﻿from adapters.sysmon import iter_sysmon_xml
+from pipelines.bulk import run_bulk
+
+NS = "http://schemas.microsoft.com/win/2004/08/events/event"
+
+
+def sysmon_xml(record_id, computer, command_line, event_id=1):
+    return (
+        f"<Event xmlns='{NS}'><System><EventID>{event_id}</EventID>"
+        f"<TimeCreated SystemTime='2025-12-06T17:40:24.0785384Z'/>"
+        f"<EventRecordID>{record_id}</EventRecordID><Computer>{computer}</Computer></System>"
+        f"<EventData><Data Name='Image'>C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe</Data>"
+        f"<Data Name='CommandLine'>{command_line}</Data>"
+        f"<Data Name='ParentImage'>C:\\Windows\\explorer.exe</Data>"
+        f"<Data Name='User'>LAB\\timmy</Data></EventData></Event>"
+    )
+
+
+def test_sysmon_adapter_maps_process_creation_to_parse_event_schema():
+    events = list(iter_sysmon_xml([
+        sysmon_xml(1, "WIN10-LAB", "powershell.exe -nop"),
+        sysmon_xml(2, "WIN10-LAB", "ignored", event_id=3),
+        "<not xml",
+    ]))
+    assert len(events) == 1
+    evt = events[0]
+    assert evt["host"] == "WIN10-LAB"
+    assert evt["user"] == "LAB\\timmy"
+    assert evt["event_type"] == "process_create"
+    assert evt["process"]["parent_image"] == "C:\\Windows\\explorer.exe"
+    assert evt["record_id"] == "1"
+
+
+def test_run_bulk_summarizes_verdicts_hosts_and_slowest_events():
+    raws = [sysmon_xml(i, "WIN10-LAB", "powershell.exe -nop") for i in range(5)]
+    raws.append(sysmon_xml(99, "WIN10-DC", "powershell.exe -w hidden -enc AAAA"))
+    summary = run_bulk(iter_sysmon_xml(raws), batch_size=4, top=3)
+
+    assert summary["events"] == 6
+    assert summary["batches"] == 2
+    assert summary["verdicts"] == {"Benign": 5, "Suspicious": 1}
+    assert summary["top_risky_hosts"][0]["host"] == "WIN10-DC"
+    assert summary["top_risky_hosts"][0]["max_risk"] == 60
+    assert len(summary["slowest_events"]) == 3
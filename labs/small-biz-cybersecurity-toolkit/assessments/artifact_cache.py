@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Artifact Cache
+- Content-addressed store for generated reports, estimates and PDFs
+- A cache key is a hash of everything an artifact depends on (input digest,
+  template, rule tables, renderer version); see report_generator.py
+- Outputs are stored once by their own sha256 (objects/), keys point at them
+  (keys/), so identical artifacts are never stored twice
+- LRU eviction: a hit refreshes the object's mtime; prune() deletes the least
+  recently used objects until the store fits in max_bytes
+
+Layout:
+  <root>/objects/<2>/<sha256>     artifact bytes
+  <root>/keys/<2>/<key>.json      {"name": output file name, "object": sha256, "size": bytes}
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(*parts: Any) -> str:
+    """sha256 over the parts (str/bytes; anything else via its JSON form)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_copy(src: str, dst: str) -> None:
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ArtifactCache:
+    """
+    Safe to share between worker processes: every write is a temp file plus
+    os.replace, and objects are immutable. Run prune() from one process once
+    the batch is done.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects = os.path.join(root, "objects")
+        self.keys = os.path.join(root, "keys")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.keys, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        """Entry for `key` (its object still present), or None."""
+        try:
+            with open(self._key_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(entry.get("object", ""))):
+            return None  # evicted
+        return entry
+
+    def restore(self, key: str, outdir: str) -> str | None:
+        """
+        Write the cached artifact for `key` to outdir/<name>; returns its path,
+        or None on a miss. An output that already holds the same bytes is left
+        untouched.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        obj = self._object_path(entry["object"])
+        os.makedirs(outdir, exist_ok=True)
+        out = os.path.join(outdir, entry["name"])
+        try:
+            same = os.path.getsize(out) == entry["size"] and _file_sha256(out) == entry["object"]
+        except OSError:
+            same = False
+        try:
+            if not same:
+                _atomic_copy(obj, out)
+            os.utime(obj)  # LRU: mark as recently used
+        except FileNotFoundError:
+            return None  # evicted between get() and here
+        return out
+
+    def put(self, key: str, path: str) -> str:
+        """Store the file at `path` under `key`. Returns the object digest."""
+        digest = _file_sha256(path)
+        obj = self._object_path(digest)
+        if os.path.exists(obj):
+            os.utime(obj)
+        else:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            _atomic_copy(path, obj)
+        kp = self._key_path(key)
+        os.makedirs(os.path.dirname(kp), exist_ok=True)
+        tmp = f"{kp}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"name": os.path.basename(path), "object": digest, "size": os.path.getsize(obj)}, f)
+        os.replace(tmp, kp)
+        return digest
+
+    def _walk(self, top: str) -> Iterable[Tuple[str, os.stat_result]]:
+        if not os.path.isdir(top):
+            return
+        for shard in os.scandir(top):
+            if shard.is_dir():
+                for e in os.scandir(shard.path):
+                    if e.is_file() and not e.name.endswith(".tmp"):
+                        yield e.path, e.stat()
+
+    def usage(self) -> Tuple[int, int]:
+        """(objects, bytes) currently stored."""
+        sizes = [st.st_size for _, st in self._walk(self.objects)]
+        return len(sizes), sum(sizes)
+
+    def prune(self, max_bytes: int | None = None) -> Tuple[int, int]:
+        """
+        Evict least recently used objects until the store is within max_bytes,
+        then drop keys whose object is gone. Returns (objects removed, bytes freed).
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        objects: List[Tuple[float, int, str]] = [(st.st_mtime, st.st_size, p) for p, st in self._walk(self.objects)]
+        total = sum(size for _, size, _ in objects)
+        removed = freed = 0
+        for _, size, path in sorted(objects):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            freed += size
+        if removed:
+            for path, _ in list(self._walk(self.keys)):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        digest = json.load(f).get("object", "")
+                except (OSError, ValueError):
+                    digest = ""
+                if not os.path.exists(self._object_path(digest)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return removed, freed
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or prune the report artifact cache.")
+    parser.add_argument("root", help="Artifact cache directory")
+    parser.add_argument("--prune-mb", type=float, help="Evict least recently used artifacts down to this size")
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.root)
+    if args.prune_mb is not None:
+        start = time.perf_counter()
+        removed, freed = cache.prune(int(args.prune_mb * 1024 * 1024))
+        print(f"[+] Evicted {removed} artifacts ({freed / 1024 / 1024:.1f} MB) in {time.perf_counter() - start:.2f}s")
+    count, size = cache.usage()
+    print(f"[+] {args.root}: {count} artifacts, {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
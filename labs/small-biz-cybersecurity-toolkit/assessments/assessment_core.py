@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Assessment Core
+- Shared loading + normalization for report_generator.py and
+  remediation_cost_estimator.py
+- Parses each YAML/JSON input once (libyaml CSafeLoader when available)
+- Caches parsed + normalized findings on disk, keyed by a hash of the file
+  content, so re-running a portfolio skips parsing unchanged inputs
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+try:
+    import yaml  # pip install pyyaml
+    YAML_LOADER = getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader
+except ImportError:
+    yaml = None
+    YAML_LOADER = None
+
+
+CACHE_DIR_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# Bump when the cached layout or normalization rules change
+CACHE_VERSION = 1
+
+INPUT_EXTS = (".yaml", ".yml", ".json")
+
+# Non-boolean meta fields (not findings)
+META_FIELDS = ("Business Name", "Industry", "Employees", "Total workstations")
+# Map each checklist field to a category and an "expected good" value.
+# If actual != expected, report_generator assigns severity from "bad_sev".
+FIELD_RULES: Dict[str, Dict[str, Any]] = {
+    # Network / Wi-Fi
+    "Router firmware updated": {"section": "network", "good": "Yes", "bad_sev": "medium","win_tag": "patching"},
+    "Router admin password strong": {"section": "network", "good": "Yes", "bad_sev": "high","win_tag": "password_hygiene"},
+    "WPA2 or WPA3 in use": {"section": "network", "good": "Yes", "bad_sev": "high"},
+    "Guest Wi-Fi exists": {"section": "network", "good": "Yes", "bad_sev": "medium"},  # "No" may be OK; treat as medium improvement
+    "Guest Wi-Fi isolated": {"section": "network", "good": "Yes", "bad_sev": "high"},
+    "SSID names recorded": {"section": "network", "good": "Yes", "bad_sev": "medium"},
+    "Wi-Fi password complexity strong": {"section": "network", "good": "Yes", "bad_sev": "medium"},
+    "WPS disabled": {"section": "network", "good": "Yes", "bad_sev": "high"},
+    "UPnP disabled": {"section": "network", "good": "Yes", "bad_sev": "high"},
+    "Firewall enabled on router": {"section": "network", "good": "Yes", "bad_sev": "high","win_tag": "network_protection"},
+
+    # Devices / Workstations
+    "Windows Update current": {"section": "device", "good": "Yes", "bad_sev": "high","win_tag": "patching"},
+    "Antivirus active": {"section": "device", "good": "Yes", "bad_sev": "high","win_tag": "endpoint_protection"},
+    "Local admin disabled": {"section": "device", "good": "Yes", "bad_sev": "high"},
+    "BitLocker enabled": {"section": "device", "good": "Yes", "bad_sev": "medium"},
+    "Auto-lock screen enabled": {"section": "device", "good": "Yes", "bad_sev": "medium","win_tag": "workstation_hardening"},
+    "Shared accounts in use": {"section": "device", "good": "No", "bad_sev": "high"},  # good is "No"
+    "RDP enabled anywhere": {"section": "device", "good": "No", "bad_sev": "high"},
+    "Unsupported OS present": {"section": "device", "good": "No", "bad_sev": "high"},
+    "USB ports restricted": {"section": "device", "good": "Yes", "bad_sev": "medium","win_tag": "data_loss_prevention"},
+
+    # Accounts / Access Controls
+    "Unique accounts per employee": {"section": "access", "good": "Yes", "bad_sev": "high"},
+    "Password complexity enforced": {"section": "access", "good": "Yes", "bad_sev": "medium","win_tag": "password_hygiene"},
+    "Password expiration policy active": {"section": "access", "good": "Yes", "bad_sev": "low"},  # informational; will be treated as secure/medium only
+    "MFA on email": {"section": "access", "good": "Yes", "bad_sev": "high"},
+    "MFA on critical systems": {"section": "access", "good": "Yes", "bad_sev": "high"},
+    "Inactive accounts removed": {"section": "access", "good": "Yes", "bad_sev": "medium","win_tag": "account_hygiene"},
+    "Default accounts disabled": {"section": "access", "good": "Yes", "bad_sev": "high","win_tag": "account_hygiene"},
+
+    # Backups / Data Protection
+    "Backups occur regularly": {"section": "backup", "good": "Yes", "bad_sev": "high"},
+    "Backups stored offsite": {"section": "backup", "good": "Yes", "bad_sev": "high"},
+    "Backup integrity tested": {"section": "backup", "good": "Yes", "bad_sev": "medium"},
+    "Shared folders restricted": {"section": "backup", "good": "Yes", "bad_sev": "medium","win_tag": "data_access"},
+    "Everyone permissions found": {"section": "backup", "good": "No", "bad_sev": "high","win_tag": "data_access"},
+
+    # Business Processes
+    "Incident Response Plan exists": {"section": "process", "good": "Yes", "bad_sev": "medium"},
+    "Cybersecurity training done": {"section": "process", "good": "Yes", "bad_sev": "medium","win_tag": "user_training"},
+    "Onboarding documented": {"section": "process", "good": "Yes", "bad_sev": "low","win_tag": "on_offboarding"},
+    "Offboarding documented": {"section": "process", "good": "Yes", "bad_sev": "high","win_tag": "on_offboarding"},
+
+    # Physical Security
+    "Networking equipment secured": {"section": "physical", "good": "Yes", "bad_sev": "medium","win_tag": "physical_security"},
+    "Server room restricted": {"section": "physical", "good": "Yes", "bad_sev": "high"},
+    "Workstations not publicly exposed": {"section": "physical", "good": "Yes", "bad_sev": "high"},
+}
+
+# Findings that flat inputs may give at the top level instead of under Findings.
+# Derived from FIELD_RULES, so both tools load a flat input with the same fields
+# and get the same findings and digest on either path.
+FINDING_FIELDS = tuple(FIELD_RULES)
+
+
+def normalize_value(v: Any) -> str:
+    if v is None:
+        return "Unknown"
+    s = str(v).strip()
+    # Accept common variants
+    s_low = s.lower()
+    if s_low in ("yes", "y", "true", "enabled", "on"):
+        return "Yes"
+    if s_low in ("no", "n", "false", "disabled", "off"):
+        return "No"
+    if s_low in ("unknown", "unk", "?"):
+        return "Unknown"
+    return s  # allow custom strings
+
+
+def merge_findings(data: Dict[str, Any], known_fields: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Findings block, plus any `known_fields` given at the top level
+    (flat inputs still work; keys under Findings win).
+    """
+    findings = data.get("Findings") or data.get("findings") or {}
+    merged = dict(findings)
+    for k in known_fields:
+        if k in data and k not in merged:
+            merged[k] = data[k]
+    return merged
+
+
+def parse_input(raw: bytes, ext: str) -> Dict[str, Any]:
+    text = raw.decode("utf-8")
+    if ext in ("yaml", "yml"):
+        if yaml is None:
+            raise RuntimeError("pyyaml not installed. Run: pip install pyyaml")
+        return yaml.load(text, Loader=YAML_LOADER) or {}
+    if ext == "json":
+        return json.loads(text)
+    raise ValueError("Input must be .yaml/.yml or .json")
+
+
+@dataclass
+class Assessment:
+    """One client's assessment input, loaded once and shared by every generator."""
+    path: str
+    digest: str
+    data: Dict[str, Any]
+    # Findings (see merge_findings) and their normalized values (meta fields excluded)
+    findings: Dict[str, Any]
+    normalized: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def business(self) -> str | None:
+        return self.data.get("Business Name") or self.data.get("business_name")
+
+    @property
+    def employees(self) -> Any:
+        return self.data.get("Employees") or self.data.get("employees")
+
+    @property
+    def workstations(self) -> Any:
+        return self.data.get("Total workstations") or self.data.get("total_workstations")
+
+
+def collect_inputs(batch: str) -> List[str]:
+    """Input files from a directory (YAML/JSON, non-recursive) or a manifest.
+
+    A manifest is a text file with one input path per line (relative paths are
+    resolved against the manifest's directory; blank lines and # comments are
+    ignored) or a JSON list of paths.
+    """
+    if os.path.isdir(batch):
+        return sorted(os.path.join(batch, n) for n in os.listdir(batch)
+                      if n.lower().endswith(INPUT_EXTS) and os.path.isfile(os.path.join(batch, n)))
+    if not os.path.isfile(batch):
+        raise FileNotFoundError(f"Batch directory or manifest not found: {batch}")
+    base = os.path.dirname(os.path.abspath(batch))
+    with open(batch, "r", encoding="utf-8") as f:
+        if batch.lower().endswith(".json"):
+            entries = [str(p) for p in json.load(f)]
+        else:
+            entries = [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in entries]
+
+
+def _cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, digest[:2], f"{digest}.json")
+
+
+def _read_cache(path: str) -> Dict[str, Any] | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("version") == CACHE_VERSION else None
+
+
+def _write_cache(path: str, entry: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, default=str)
+    os.replace(tmp, path)
+
+
+def load_assessment(path: str, known_fields: Iterable[str] = (),
+                    cache_dir: str | None = CACHE_DIR_DEFAULT) -> Assessment:
+    """
+    Read `path` once and return its Assessment. With `cache_dir`, the parsed
+    data and normalized findings are reused from a previous run whenever the
+    file content (sha256) is unchanged. Pass cache_dir=None to disable.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+    ext = os.path.splitext(path)[1].lower().strip(".")
+    with open(path, "rb") as f:
+        raw = f.read()
+    known_fields = tuple(known_fields)
+    digest = hashlib.sha256(ext.encode() + b"\0" + "\0".join(known_fields).encode() + b"\0" + raw).hexdigest()
+
+    if cache_dir:
+        entry = _read_cache(_cache_path(cache_dir, digest))
+        if entry is not None:
+            return Assessment(path=path, digest=digest, data=entry["data"],
+                              findings=entry["findings"], normalized=entry["normalized"])
+
+    data = parse_input(raw, ext)
+    findings = merge_findings(data, known_fields)
+    normalized = {k: normalize_value(v) for k, v in findings.items() if k not in META_FIELDS}
+    assessment = Assessment(path=path, digest=digest, data=data, findings=findings, normalized=normalized)
+
+    if cache_dir:
+        _write_cache(_cache_path(cache_dir, digest), {
+            "version": CACHE_VERSION, "data": data, "findings": findings, "normalized": normalized,
+        })
+    return assessment
@@ -1,114 +1,375 @@
 """
-Simple Markdown → PDF converter.
+Markdown → PDF converter and rendering service.
 
 Usage:
     python md_to_pdf.py input.md output.pdf
+    python md_to_pdf.py input.md output.html --renderer html   # no wkhtmltopdf needed
+    python md_to_pdf.py --bench 200 --workers 4 [input.md]     # PDFs per minute
+
+Library:
+    with PdfService(workers=4) as svc:
+        futures = [svc.submit(md_text, "out/report.pdf", title="report") for ...]
+        for f in futures:
+            print(f.result().path)
 
 Requirements:
     pip install markdown pdfkit
     Install wkhtmltopdf (https://wkhtmltopdf.org/)
+    (without pdfkit/wkhtmltopdf the "html" renderer writes the styled HTML instead)
 """
 
 import argparse
+import hashlib
 import os
+import queue
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from html import escape
 
-import markdown
-import pdfkit
+try:
+    import markdown  # pip install markdown
+except ImportError:
+    markdown = None
 
+try:
+    import pdfkit  # pip install pdfkit (+ wkhtmltopdf binary)
+except ImportError:
+    pdfkit = None
 
-def build_html(markdown_text: str, title: str = "Report") -> str:
-    """Wrap markdown-converted HTML with a basic styled HTML document."""
-    body = markdown.markdown(
-        markdown_text,
-        extensions=["tables", "fenced_code"],
-    )
 
-    # Simple, clean styling for reports
-    html = f"""<!DOCTYPE html>
+MARKDOWN_EXTENSIONS = ["tables", "fenced_code"]
+RENDERERS = ("auto", "pdf", "html")
+# Bump when conversion output changes in a way HTML_SHELL/extensions do not capture
+RENDER_VERSION = 1
+
+# Built once at import; wrap_html only concatenates title and body into it.
+HTML_SHELL = """<!DOCTYPE html>
 <html>
 <head>
   <meta charset="utf-8" />
-  <title>{title}</title>
+  <title>%TITLE%</title>
   <style>
-    body {{
+    body {
       font-family: Arial, sans-serif;
       font-size: 11pt;
       line-height: 1.4;
       color: #222222;
       max-width: 800px;
       margin: 40px auto;
-    }}
-    h1, h2, h3 {{
+    }
+    h1, h2, h3 {
       font-weight: bold;
       color: #111111;
       margin-top: 1.4em;
       margin-bottom: 0.5em;
-    }}
-    h1 {{
+    }
+    h1 {
       font-size: 20pt;
       border-bottom: 1px solid #cccccc;
       padding-bottom: 6px;
-    }}
-    h2 {{
+    }
+    h2 {
       font-size: 16pt;
       border-bottom: 1px solid #e0e0e0;
       padding-bottom: 4px;
-    }}
-    h3 {{
+    }
+    h3 {
       font-size: 13pt;
-    }}
-    p {{
+    }
+    p {
       margin: 0.3em 0 0.6em 0;
-    }}
-    ul, ol {{
+    }
+    ul, ol {
       margin: 0.2em 0 0.6em 1.5em;
-    }}
-    table {{
+    }
+    table {
       border-collapse: collapse;
       margin: 0.8em 0;
       width: 100%;
-    }}
-    th, td {{
+    }
+    th, td {
       border: 1px solid #cccccc;
       padding: 6px 8px;
       text-align: left;
-    }}
-    th {{
+    }
+    th {
       background-color: #f5f5f5;
       font-weight: bold;
-    }}
-    code {{
+    }
+    code {
       font-family: Consolas, "Courier New", monospace;
       font-size: 10pt;
       background: #f2f2f2;
       padding: 1px 3px;
       border-radius: 3px;
-    }}
+    }
   </style>
 </head>
 <body>
-{body}
+%BODY%
 </body>
 </html>
 """
-    return html
+_SHELL_HEAD, _SHELL_REST = HTML_SHELL.split("%TITLE%")
+_SHELL_MID, _SHELL_TAIL = _SHELL_REST.split("%BODY%")
+
+BENCH_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated", "Cornerstone_Dental_Assessment.md")
+
+
+def render_fingerprint(renderer: str) -> str:
+    """Identifies what a resolved renderer produces, for caching its output."""
+    parts = [str(RENDER_VERSION), renderer, HTML_SHELL, ",".join(MARKDOWN_EXTENSIONS),
+             getattr(markdown, "__version__", "")]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _require_markdown() -> None:
+    if markdown is None:
+        raise RuntimeError("markdown not installed. Run: pip install markdown")
+
+
+def build_html(markdown_text: str, title: str = "Report") -> str:
+    """Wrap markdown-converted HTML with a basic styled HTML document."""
+    _require_markdown()
+    body = markdown.markdown(
+        markdown_text,
+        extensions=MARKDOWN_EXTENSIONS,
+    )
+    return wrap_html(body, title)
+
+
+def wrap_html(body: str, title: str = "Report") -> str:
+    """Place converted HTML inside the styled report document."""
+    return f"{_SHELL_HEAD}{escape(title)}{_SHELL_MID}{body}{_SHELL_TAIL}"
+
+
+def resolve_renderer(renderer: str = "auto", wkhtmltopdf: str = None) -> str:
+    """
+    "pdf" or "html". "auto" picks pdf when pdfkit and a wkhtmltopdf binary are
+    available, otherwise the local HTML-only renderer.
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"renderer must be one of {RENDERERS}")
+    if renderer == "html":
+        return "html"
+    binary = wkhtmltopdf or shutil.which("wkhtmltopdf")
+    if pdfkit is not None and binary and os.path.exists(binary):
+        return "pdf"
+    if renderer == "pdf":
+        raise RuntimeError("PDF rendering needs pdfkit (pip install pdfkit) and the wkhtmltopdf binary")
+    return "html"
+
+
+def output_for(path: str, renderer: str) -> str:
+    """The HTML renderer writes <name>.html where a .pdf was requested."""
+    if renderer == "html" and path.lower().endswith(".pdf"):
+        return path[:-4] + ".html"
+    return path
+
+
+class PdfConverter:
+    """
+    Reusable in-process converter for batch runs: the wkhtmltopdf configuration
+    is resolved once and one Markdown instance (extensions loaded once) is
+    reset between documents. Not thread-safe; PdfService gives each worker
+    thread its own.
+    """
+
+    def __init__(self, wkhtmltopdf: str = None, renderer: str = "auto"):
+        _require_markdown()
+        self.renderer = resolve_renderer(renderer, wkhtmltopdf)
+        self.config = None
+        if self.renderer == "pdf":
+            self.config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf) if wkhtmltopdf else pdfkit.configuration()
+        self.md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+
+    def to_html(self, markdown_text: str, title: str = "Report") -> str:
+        return wrap_html(self.md.reset().convert(markdown_text), title)
+
+    def convert_text(self, markdown_text: str, output_pdf: str, title: str = "Report") -> str:
+        """Render one document; returns the path written (.html for the HTML renderer)."""
+        html = self.to_html(markdown_text, title)
+        output = output_for(output_pdf, self.renderer)
+        if self.renderer == "pdf":
+            # HTML goes to wkhtmltopdf on stdin; no temp file round trip
+            pdfkit.from_string(html, output, configuration=self.config, options={"quiet": ""})
+        else:
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(html)
+        return output
+
+
+@dataclass
+class Rendered:
+    path: str
+    seconds: float
+
+
+class PdfService:
+    """
+    Long-lived conversion service: `workers` threads, each holding a warm
+    PdfConverter, pull jobs from a bounded queue. submit() blocks while the
+    queue is full, so a fast producer cannot pile up unbounded work. Threads
+    are enough here: wkhtmltopdf runs as its own process, and the Markdown
+    step is a few milliseconds per report.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = None, wkhtmltopdf: str = None,
+                 renderer: str = "auto"):
+        self.workers = max(1, workers)
+        # Resolve once so every worker (and the caller) agree on the output type
+        self.renderer = resolve_renderer(renderer, wkhtmltopdf)
+        self.fingerprint = render_fingerprint(self.renderer)
+        self._jobs = queue.Queue(maxsize=queue_size or self.workers * 4)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._threads = []
+        for i in range(self.workers):
+            converter = PdfConverter(wkhtmltopdf, self.renderer)
+            t = threading.Thread(target=self._run, args=(converter,), name=f"pdf-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, markdown_text: str, output_pdf: str, title: str = "Report") -> Future:
+        """Queue one document; the Future resolves to a Rendered."""
+        if not self._threads:
+            raise RuntimeError("PdfService is closed")
+        future = Future()
+        self._jobs.put((future, markdown_text, output_pdf, title))
+        return future
+
+    def submit_file(self, input_md: str, output_pdf: str = None, title: str = None) -> Future:
+        with open(input_md, "r", encoding="utf-8") as f:
+            text = f.read()
+        output_pdf = output_pdf or os.path.splitext(input_md)[0] + ".pdf"
+        title = title or os.path.splitext(os.path.basename(input_md))[0]
+        return self.submit(text, output_pdf, title)
+
+    def _run(self, converter: PdfConverter) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, text, output_pdf, title = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                path = converter.convert_text(text, output_pdf, title)
+            except BaseException as e:
+                with self._lock:
+                    self.failed += 1
+                future.set_exception(e)
+                continue
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += seconds
+            future.set_result(Rendered(path, seconds))
+
+    def close(self) -> None:
+        """Finish queued jobs and stop the workers."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(markdown_text: str, count: int, workers: int, renderer: str = "auto",
+              wkhtmltopdf: str = None, outdir: str = None) -> dict:
+    """
+    Render `count` copies of one document twice: the old way (new Markdown
+    instance and pdfkit configuration per document, one at a time) and through
+    a PdfService. Returns documents/minute for both.
+    """
+    outdir = outdir or tempfile.mkdtemp(prefix="md2pdf-bench-")
+    os.makedirs(outdir, exist_ok=True)
+    renderer = resolve_renderer(renderer, wkhtmltopdf)
+
+    start = time.perf_counter()
+    for i in range(count):
+        html = build_html(markdown_text, title=f"cold-{i}")
+        out = output_for(os.path.join(outdir, f"cold-{i}.pdf"), renderer)
+        if renderer == "pdf":
+            config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf) if wkhtmltopdf else pdfkit.configuration()
+            pdfkit.from_string(html, out, configuration=config, options={"quiet": ""})
+        else:
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(html)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with PdfService(workers=workers, wkhtmltopdf=wkhtmltopdf, renderer=renderer) as svc:
+        futures = [svc.submit(markdown_text, os.path.join(outdir, f"warm-{i}.pdf"), title=f"warm-{i}")
+                   for i in range(count)]
+        for f in futures:
+            f.result()
+    warm = time.perf_counter() - start
+
+    return {
+        "renderer": renderer, "count": count, "workers": workers, "outdir": outdir,
+        "cold_seconds": cold, "service_seconds": warm,
+        "cold_per_minute": count / cold * 60 if cold else 0.0,
+        "service_per_minute": count / warm * 60 if warm else 0.0,
+    }
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Convert a Markdown file to a styled PDF report."
     )
-    parser.add_argument("input_md", help="Path to input Markdown file")
-    parser.add_argument("output_pdf", help="Path to output PDF file")
+    parser.add_argument("input_md", nargs="?", help="Path to input Markdown file")
+    parser.add_argument("output_pdf", nargs="?", help="Path to output PDF file")
     parser.add_argument(
         "--wkhtmltopdf",
         help="Optional path to wkhtmltopdf binary if not in PATH",
         default=None,
     )
+    parser.add_argument("--renderer", choices=RENDERERS, default="pdf",
+                        help="pdf (wkhtmltopdf), html (local fallback) or auto (default: pdf)")
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="Benchmark: render N copies of input_md (default: a sample report)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Service worker threads for --bench (default: CPU count)")
 
     args = parser.parse_args()
 
+    if markdown is None:
+        print("[!] markdown not installed. Run: pip install markdown")
+        sys.exit(1)
+
+    if args.bench:
+        input_md = args.input_md or BENCH_SAMPLE
+        with open(input_md, "r", encoding="utf-8") as f:
+            md_text = f.read()
+        try:
+            r = benchmark(md_text, args.bench, args.workers, args.renderer, args.wkhtmltopdf, args.output_pdf)
+        except (RuntimeError, OSError) as e:
+            print(f"[!] Benchmark failed: {e}")
+            sys.exit(1)
+        print(f"[+] {r['count']} x {os.path.basename(input_md)} ({r['renderer']}) -> {r['outdir']}")
+        print(f"[+] One-shot per document: {r['cold_seconds']:.2f}s  ({r['cold_per_minute']:,.0f}/min)")
+        print(f"[+] PdfService, {r['workers']} worker(s): {r['service_seconds']:.2f}s  "
+              f"({r['service_per_minute']:,.0f}/min)")
+        return
+
+    if not args.input_md or not args.output_pdf:
+        parser.error("input_md and output_pdf are required (unless --bench)")
+
     if not os.path.isfile(args.input_md):
         print(f"[!] Input file not found: {args.input_md}")
         sys.exit(1)
@@ -117,20 +378,14 @@ def main():
         md_text = f.read()
 
     title = os.path.splitext(os.path.basename(args.input_md))[0]
-    html = build_html(md_text, title=title)
-
-    # Configure wkhtmltopdf if a path is provided
-    if args.wkhtmltopdf:
-        config = pdfkit.configuration(wkhtmltopdf=args.wkhtmltopdf)
-    else:
-        config = None  # assumes wkhtmltopdf is in PATH
 
     try:
-        pdfkit.from_string(html, args.output_pdf, configuration=config)
-        print(f"[+] PDF written to: {args.output_pdf}")
-    except OSError as e:
+        converter = PdfConverter(args.wkhtmltopdf, args.renderer)
+        output = converter.convert_text(md_text, args.output_pdf, title=title)
+        print(f"[+] {converter.renderer.upper()} written to: {output}")
+    except (OSError, RuntimeError) as e:
         print("[!] Failed to generate PDF.")
-        print("    Make sure wkhtmltopdf is installed and accessible.")
+        print("    Make sure pdfkit + wkhtmltopdf are installed and accessible (or use --renderer html).")
         print(f"    Error: {e}")
         sys.exit(1)
 
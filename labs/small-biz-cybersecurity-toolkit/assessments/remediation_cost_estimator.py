@@ -4,109 +4,152 @@ Remediation Cost Estimator
 - Reads the same YAML used for the assessment
 - Outputs a non-binding cost & effort estimate
 - Intended for internal use or optional addendum
+- Portfolio mode (--portfolio) sums numeric cost models across many clients
+  and writes exposure / distribution / top items to CSV + JSON
 """
 
-import yaml
+from __future__ import annotations
+
+import bisect
+import csv
+import json
+import math
 import os
 import re
 from datetime import date
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+try:
+    import numpy as np  # optional: vectorized portfolio aggregation
+except ImportError:
+    np = None
+
+from artifact_cache import cache_key
+from assessment_core import CACHE_DIR_DEFAULT, FINDING_FIELDS, Assessment, collect_inputs, load_assessment
 
 # ---- Cost Rules (YOU control these) ----
+# cost:      flat (min, max) USD for the engagement
+# per_seat:  optional (min, max) USD added per seat; "seats" says what is
+#            counted ("employees" or "workstations", from the assessment)
 REMEDIATION_RULES = {
     "WPA2 or WPA3 in use": {
         "issue_when": "No",
         "fix": "Enable WPA2/WPA3 Wi-Fi encryption",
         "effort": "Low",
-        "cost_range": "$0 – $150",
+        "cost": (0, 150),
     },
     "Unique accounts per employee": {
         "issue_when": "No",
         "fix": "Create unique user accounts and remove shared logins",
         "effort": "Medium",
-        "cost_range": "$150 – $500",
+        "cost": (150, 500),
+        "per_seat": (10, 25),
+        "seats": "employees",
     },
     "Shared accounts in use": {
         "issue_when": "Yes",
         "fix": "Eliminate shared accounts and assign per-user credentials",
         "effort": "Medium",
-        "cost_range": "$150 – $500",
+        "cost": (150, 500),
+        "per_seat": (10, 25),
+        "seats": "employees",
     },
     "MFA on email": {
         "issue_when": "No",
         "fix": "Enable multi-factor authentication on email",
         "effort": "Low",
-        "cost_range": "$0 – $100",
+        "cost": (0, 100),
+        "per_seat": (0, 10),
+        "seats": "employees",
     },
     "MFA on critical systems": {
         "issue_when": "No",
         "fix": "Enable MFA on critical systems",
         "effort": "Medium",
-        "cost_range": "$100 – $300",
+        "cost": (100, 300),
+        "per_seat": (5, 15),
+        "seats": "employees",
     },
     "Backups stored offsite": {
         "issue_when": "No",
         "fix": "Configure offsite backups",
         "effort": "Medium",
-        "cost_range": "$200 – $800",
+        "cost": (200, 800),
     },
     "Server room restricted": {
         "issue_when": "No",
         "fix": "Restrict access to server/networking equipment",
         "effort": "Low",
-        "cost_range": "$50 – $300",
+        "cost": (50, 300),
     },
     "Workstations not publicly exposed": {
         "issue_when": "No",
         "fix": "Limit physical access to workstations",
         "effort": "Low",
-        "cost_range": "$0 – $200",
+        "cost": (0, 200),
+        "per_seat": (0, 20),
+        "seats": "workstations",
     },
 }
 
+CONTROLS = list(REMEDIATION_RULES)
+# Bump when render_estimate changes; the artifact cache keys on it
+ESTIMATE_VERSION = 1
+
+# Portfolio cost-to-fix distribution: upper bounds of the per-client midpoint buckets (USD)
+COST_BUCKETS = (500, 1000, 2500, 5000, 10000)
+PERCENTILES = (10, 25, 50, 75, 90)
+
 # ---- Helpers ----
-def normalize(val: Any) -> str:
-    if val is None:
-        return "Unknown"
-    v = str(val).strip().lower()
-    if v in ("yes", "true", "enabled", "on"):
-        return "Yes"
-    if v in ("no", "false", "disabled", "off"):
-        return "No"
-    if v in ("unknown", "?"):
-        return "Unknown"
-    return val
+def seat_count(value: Any) -> int:
+    """Employees / workstations as an int ("13", 13, "10-15" -> 10; unknown -> 0)."""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    m = re.search(r"\d+", str(value).replace(",", ""))
+    return int(m.group()) if m else 0
 
-# ---- Main ----
-def main():
-    import argparse
+def seats_for(assessment: Assessment) -> Tuple[int, int]:
+    """(employees, workstations); workstations fall back to the employee count."""
+    employees = seat_count(assessment.employees)
+    return employees, seat_count(assessment.workstations) or employees
 
-    parser = argparse.ArgumentParser(description="Generate remediation cost estimate from assessment YAML.")
-    parser.add_argument("-i", "--input", required=True, help="Path to assessment YAML file")
-    parser.add_argument("-o", "--outdir", default="reports", help="Output directory")
-    args = parser.parse_args()
+def rule_cost(rule: Dict[str, Any], employees: int, workstations: int) -> Tuple[float, float]:
+    lo, hi = rule["cost"]
+    if "per_seat" in rule:
+        seats = workstations if rule.get("seats") == "workstations" else employees
+        lo, hi = lo + rule["per_seat"][0] * seats, hi + rule["per_seat"][1] * seats
+    return lo, hi
 
-    with open(args.input, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+def money(v: float) -> str:
+    return f"${v:,.0f}"
 
-    business = data.get("Business Name", "Unknown Business")
-    findings: Dict[str, Any] = data.get("Findings", {})
+def money_range(lo: float, hi: float) -> str:
+    return f"{money(lo)} – {money(hi)}"
 
-    rows: List[str] = []
+def estimate_items(normalized: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Remediation rules triggered by an assessment's normalized findings."""
+    return [rule for control, rule in REMEDIATION_RULES.items()
+            if normalized.get(control, "Unknown") == rule["issue_when"]]
 
-    for control, rule in REMEDIATION_RULES.items():
-        actual = normalize(findings.get(control))
-        if actual == rule["issue_when"]:
-            rows.append(
-                f"| {rule['fix']} | {rule['effort']} | {rule['cost_range']} |"
-            )
+def render_estimate(business: str, items: List[Dict[str, Any]], today: str,
+                    employees: int = 0, workstations: int = 0) -> str:
+    costs = [rule_cost(rule, employees, workstations) for rule in items]
+    rows: List[str] = [
+        f"| {rule['fix']} | {rule['effort']} | {money_range(lo, hi)} |" for rule, (lo, hi) in zip(items, costs)
+    ]
 
     if not rows:
         rows.append("| No remediation required | — | $0 |")
+    else:
+        rows.append(f"| **Total** | | **{money_range(sum(c[0] for c in costs), sum(c[1] for c in costs))}** |")
 
-    today = date.today().strftime("%m/%d/%Y")
+    seat_note = ""
+    if any("per_seat" in rule for rule in items):
+        seat_note = f"\n- Per-seat items are sized for {employees} employees / {workstations} workstations"
 
-    report = f"""# Remediation Effort & Cost Estimate
+    return f"""# Remediation Effort & Cost Estimate
 **Business:** {business}  
 **Date:** {today}
 
@@ -127,19 +170,252 @@ def main():
 ## Notes
 - Most items involve configuration changes rather than new hardware
 - Work can be completed incrementally
-- Pricing may change if scope or environment differs
+- Pricing may change if scope or environment differs{seat_note}
 
 ---
 
 *Generated automatically from assessment responses*
 """
 
+def write_estimate(outdir: str, business: str, report: str) -> str:
     safe_name = re.sub(r"[^A-Za-z0-9_]+", "_", business)
-    os.makedirs(args.outdir, exist_ok=True)
-    outpath = os.path.join(args.outdir, f"{safe_name}_Remediation_Estimate.md")
+    os.makedirs(outdir, exist_ok=True)
+    outpath = os.path.join(outdir, f"{safe_name}_Remediation_Estimate.md")
 
     with open(outpath, "w", encoding="utf-8") as f:
         f.write(report)
+    return outpath
+
+def estimate_for(assessment: Assessment, outdir: str, today: str) -> str:
+    """Write the estimate for an already loaded Assessment. Returns the output path."""
+    business = assessment.business or "Unknown Business"
+    employees, workstations = seats_for(assessment)
+    report = render_estimate(business, estimate_items(assessment.normalized), today, employees, workstations)
+    return write_estimate(outdir, business, report)
+
+def estimate_key(assessment: Assessment, today: str) -> str:
+    """Artifact-cache key of an assessment's estimate (input content, rules, renderer version, date)."""
+    return cache_key("estimate", ESTIMATE_VERSION, REMEDIATION_RULES, assessment.digest, today)
+
+# ---- Portfolio aggregation ----
+def _rule_vectors() -> Dict[str, List[float]]:
+    """Per-control cost columns, in CONTROLS order."""
+    cols: Dict[str, List[float]] = {"base_min": [], "base_max": [], "seat_min": [], "seat_max": [], "by_ws": []}
+    for control in CONTROLS:
+        rule = REMEDIATION_RULES[control]
+        seat_lo, seat_hi = rule.get("per_seat", (0, 0))
+        cols["base_min"].append(rule["cost"][0])
+        cols["base_max"].append(rule["cost"][1])
+        cols["seat_min"].append(seat_lo)
+        cols["seat_max"].append(seat_hi)
+        cols["by_ws"].append(rule.get("seats") == "workstations")
+    return cols
+
+def portfolio_totals(issues: List[List[int]], employees: List[int],
+                     workstations: List[int]) -> Dict[str, List[float]]:
+    """
+    Reduce a clients x CONTROLS 0/1 issue matrix to per-client and per-control
+    (min, max) cost totals plus per-control client counts. With numpy this is
+    one broadcast over the whole portfolio; without it, the same arithmetic
+    row by row.
+    """
+    v = _rule_vectors()
+    if np is not None:
+        hit = np.asarray(issues, dtype=np.float64).reshape(len(issues), len(CONTROLS))
+        seats = np.where(np.asarray(v["by_ws"])[None, :],
+                         np.asarray(workstations, dtype=np.float64)[:, None],
+                         np.asarray(employees, dtype=np.float64)[:, None])
+        lo = hit * (np.asarray(v["base_min"]) + np.asarray(v["seat_min"]) * seats)
+        hi = hit * (np.asarray(v["base_max"]) + np.asarray(v["seat_max"]) * seats)
+        return {
+            "client_min": lo.sum(axis=1).tolist(), "client_max": hi.sum(axis=1).tolist(),
+            "item_min": lo.sum(axis=0).tolist(), "item_max": hi.sum(axis=0).tolist(),
+            "affected": hit.sum(axis=0).astype(int).tolist(),
+        }
+
+    out: Dict[str, List[float]] = {
+        "client_min": [], "client_max": [],
+        "item_min": [0.0] * len(CONTROLS), "item_max": [0.0] * len(CONTROLS), "affected": [0] * len(CONTROLS),
+    }
+    for row, emp, ws in zip(issues, employees, workstations):
+        cmin = cmax = 0.0
+        for j, h in enumerate(row):
+            if not h:
+                continue
+            n = ws if v["by_ws"][j] else emp
+            lo, hi = v["base_min"][j] + v["seat_min"][j] * n, v["base_max"][j] + v["seat_max"][j] * n
+            cmin += lo
+            cmax += hi
+            out["item_min"][j] += lo
+            out["item_max"][j] += hi
+            out["affected"][j] += 1
+        out["client_min"].append(cmin)
+        out["client_max"].append(cmax)
+    return out
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (rank = ceil(pct/100 * n))."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def _bucket_labels() -> List[str]:
+    edges = (0,) + COST_BUCKETS
+    labels = [f"{money(a)} – {money(b)}" for a, b in zip(edges, edges[1:])]
+    return labels + [f"{money(COST_BUCKETS[-1])}+"]
+
+def aggregate(assessments: List[Assessment], top: int = 10) -> Dict[str, Any]:
+    """
+    Portfolio summary for loaded assessments: total exposure, the per-client
+    cost-to-fix distribution and the remediation items ranked by total cost.
+    """
+    seats = [seats_for(a) for a in assessments]
+    employees = [e for e, _ in seats]
+    workstations = [w for _, w in seats]
+    issues = [[int(a.normalized.get(c, "Unknown") == REMEDIATION_RULES[c]["issue_when"]) for c in CONTROLS]
+              for a in assessments]
+    totals = portfolio_totals(issues, employees, workstations)
+
+    clients = []
+    for i, a in enumerate(assessments):
+        cmin, cmax = totals["client_min"][i], totals["client_max"][i]
+        clients.append({
+            "business": a.business, "industry": a.data.get("Industry") or "",
+            "path": a.path, "employees": employees[i], "workstations": workstations[i],
+            "items": sum(issues[i]), "cost_min": cmin, "cost_max": cmax, "cost_mid": (cmin + cmax) / 2,
+        })
+
+    items = []
+    for j, control in enumerate(CONTROLS):
+        affected = totals["affected"][j]
+        if not affected:
+            continue
+        imin, imax = totals["item_min"][j], totals["item_max"][j]
+        rule = REMEDIATION_RULES[control]
+        items.append({
+            "control": control, "fix": rule["fix"], "effort": rule["effort"],
+            "clients": affected, "share": affected / len(assessments),
+            "cost_min": imin, "cost_max": imax, "cost_mid": (imin + imax) / 2,
+        })
+    items.sort(key=lambda it: (-it["cost_mid"], -it["clients"], it["control"]))
+
+    mids = sorted(c["cost_mid"] for c in clients)
+    buckets = dict.fromkeys(_bucket_labels(), 0)
+    labels = list(buckets)
+    for m in mids:
+        buckets[labels[bisect.bisect_left(COST_BUCKETS, m)]] += 1
+
+    total_min = sum(c["cost_min"] for c in clients)
+    total_max = sum(c["cost_max"] for c in clients)
+    return {
+        "clients": len(clients),
+        "exposure": {"cost_min": total_min, "cost_max": total_max, "cost_mid": (total_min + total_max) / 2},
+        "distribution": {
+            "percentiles": {f"p{p}": _percentile(mids, p) for p in PERCENTILES},
+            "mean": (sum(mids) / len(mids)) if mids else 0.0,
+            "max": mids[-1] if mids else 0.0,
+            "buckets": buckets,
+        },
+        "items": items,
+        "top_items": items[:top],
+        "per_client": clients,
+    }
+
+def trend(summary: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    """Change against an earlier --json summary (e.g. last quarter's run)."""
+    prev_items = {it["control"]: it for it in previous.get("items", [])}
+    cur_items = {it["control"]: it for it in summary["items"]}
+    return {
+        "clients": summary["clients"] - previous.get("clients", 0),
+        "exposure": {k: v - previous.get("exposure", {}).get(k, 0) for k, v in summary["exposure"].items()},
+        "items": {c: {"clients": cur_items.get(c, {}).get("clients", 0) - prev_items.get(c, {}).get("clients", 0),
+                      "cost_mid": cur_items.get(c, {}).get("cost_mid", 0) - prev_items.get(c, {}).get("cost_mid", 0)}
+                  for c in sorted(set(cur_items) | set(prev_items))},
+    }
+
+def load_portfolio(paths: List[str], cache_dir: str | None) -> Tuple[List[Assessment], List[Tuple[str, str]]]:
+    """Load every input once; inputs without a Business Name or that fail to parse are skipped."""
+    loaded, skipped = [], []
+    for path in paths:
+        try:
+            assessment = load_assessment(path, FINDING_FIELDS, cache_dir=cache_dir)
+        except Exception as e:
+            skipped.append((path, f"{type(e).__name__}: {e}"))
+            continue
+        if not assessment.business:
+            skipped.append((path, "no Business Name"))
+            continue
+        loaded.append(assessment)
+    return loaded, skipped
+
+CLIENT_COLUMNS = ("business", "industry", "path", "employees", "workstations", "items",
+                  "cost_min", "cost_max", "cost_mid")
+
+def write_clients_csv(path: str, clients: List[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=CLIENT_COLUMNS)
+        w.writeheader()
+        for c in clients:
+            w.writerow({k: (round(v, 2) if isinstance(v, float) else v) for k, v in c.items()})
+
+def print_portfolio(summary: Dict[str, Any], skipped: List[Tuple[str, str]]) -> None:
+    exp, dist = summary["exposure"], summary["distribution"]
+    print(f"[+] Clients: {summary['clients']}  skipped: {len(skipped)}")
+    for path, why in skipped:
+        print(f"    - {path}: {why}")
+    print(f"[+] Total exposure: {money_range(exp['cost_min'], exp['cost_max'])} (mid {money(exp['cost_mid'])})")
+    print("[+] Cost to fix per client (mid): "
+          + "  ".join(f"{k}={money(v)}" for k, v in dist["percentiles"].items())
+          + f"  max={money(dist['max'])}")
+    for label, n in dist["buckets"].items():
+        print(f"    {label:<18} {n}")
+    print("[+] Top remediation items:")
+    for it in summary["top_items"]:
+        print(f"    {it['fix']:<58} {it['clients']:>4} clients  {money_range(it['cost_min'], it['cost_max'])}")
+
+# ---- Main ----
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate remediation cost estimate from assessment YAML.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("-i", "--input", help="Path to assessment YAML file")
+    src.add_argument("-p", "--portfolio",
+                     help="Directory of YAML/JSON inputs or a manifest; aggregate costs across all clients")
+    parser.add_argument("-o", "--outdir", default="reports", help="Output directory")
+    parser.add_argument("--cache", default=CACHE_DIR_DEFAULT, help="Parsed-input cache directory ('' disables)")
+    parser.add_argument("--csv", help="Portfolio: write per-client costs to this CSV")
+    parser.add_argument("--json", help="Portfolio: write the full summary to this JSON file")
+    parser.add_argument("--top", type=int, default=10, help="Portfolio: remediation items to rank (default: 10)")
+    parser.add_argument("--previous", help="Portfolio: earlier --json summary to report the trend against")
+    args = parser.parse_args()
+
+    if args.portfolio:
+        assessments, skipped = load_portfolio(collect_inputs(args.portfolio), args.cache or None)
+        summary = aggregate(assessments, top=args.top)
+        summary["generated"] = date.today().isoformat()
+        summary["skipped"] = [{"path": p, "reason": why} for p, why in skipped]
+        if args.previous:
+            with open(args.previous, "r", encoding="utf-8") as f:
+                summary["trend"] = trend(summary, json.load(f))
+        print_portfolio(summary, skipped)
+        if "trend" in summary:
+            t = summary["trend"]["exposure"]
+            print(f"[+] Trend vs {args.previous}: {summary['trend']['clients']:+d} clients, "
+                  f"exposure mid {t['cost_mid']:+,.0f}")
+        if args.csv:
+            write_clients_csv(args.csv, summary["per_client"])
+            print(f"[OK] Per-client costs: {args.csv}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            print(f"[OK] Portfolio summary: {args.json}")
+        return
+
+    assessment = load_assessment(args.input, FINDING_FIELDS, cache_dir=args.cache or None)
+    today = date.today().strftime("%m/%d/%Y")
+    outpath = estimate_for(assessment, args.outdir, today)
 
     print(f"[OK] Cost estimate generated: {outpath}")
 
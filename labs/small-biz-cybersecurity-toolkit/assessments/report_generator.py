@@ -4,26 +4,39 @@ SMB Report Generator
 - Reads a Markdown template
 - Reads findings from YAML/JSON
 - Outputs a filled-in Markdown report
+- --batch renders a whole directory/manifest of inputs across worker processes
+- --estimate also writes the remediation cost estimate from the same parsed input
+- Unchanged clients (same input, template, rules and renderer) are restored
+  from the artifact cache instead of being rendered again
 
 Template path (default): assessment_template.md
 """
 
 from __future__ import annotations
 
-import subprocess
 import sys
 import argparse
 import datetime as dt
-import json
 import os
 import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Tuple
 
-try:
-    import yaml  # pip install pyyaml
-except ImportError:
-    yaml = None
+from artifact_cache import DEFAULT_MAX_BYTES, ArtifactCache, cache_key
+from assessment_core import (
+    CACHE_DIR_DEFAULT, FIELD_RULES, FINDING_FIELDS, META_FIELDS, Assessment, collect_inputs, load_assessment, merge_findings,
+    normalize_value, parse_input,
+)
+from remediation_cost_estimator import estimate_for, estimate_key
+
+# Repo-wide instrumentation (--profile)
+SHARED_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "shared"))
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+from instrumentation import add_profile_args, profile_session  # noqa: E402
 
 
 TEMPLATE_DEFAULT = "assessment_template.md"
@@ -35,59 +48,8 @@ LABELS = {
     "secure": '<span style="color:#2d6a4f; font-weight:bold;">✔ Secure / In Place</span>',
 }
 
-# Map each field to a category and an "expected good" value.
-# If actual != expected, we assign severity based on "bad impact" rules below.
-FIELD_RULES: Dict[str, Dict[str, Any]] = {
-    # Network / Wi-Fi
-    "Router firmware updated": {"section": "network", "good": "Yes", "bad_sev": "medium","win_tag": "patching"},
-    "Router admin password strong": {"section": "network", "good": "Yes", "bad_sev": "high","win_tag": "password_hygiene"},
-    "WPA2 or WPA3 in use": {"section": "network", "good": "Yes", "bad_sev": "high"},
-    "Guest Wi-Fi exists": {"section": "network", "good": "Yes", "bad_sev": "medium"},  # "No" may be OK; treat as medium improvement
-    "Guest Wi-Fi isolated": {"section": "network", "good": "Yes", "bad_sev": "high"},
-    "SSID names recorded": {"section": "network", "good": "Yes", "bad_sev": "medium"},
-    "Wi-Fi password complexity strong": {"section": "network", "good": "Yes", "bad_sev": "medium"},
-    "WPS disabled": {"section": "network", "good": "Yes", "bad_sev": "high"},
-    "UPnP disabled": {"section": "network", "good": "Yes", "bad_sev": "high"},
-    "Firewall enabled on router": {"section": "network", "good": "Yes", "bad_sev": "high","win_tag": "network_protection"},
-
-    # Devices / Workstations
-    "Windows Update current": {"section": "device", "good": "Yes", "bad_sev": "high","win_tag": "patching"},
-    "Antivirus active": {"section": "device", "good": "Yes", "bad_sev": "high","win_tag": "endpoint_protection"},
-    "Local admin disabled": {"section": "device", "good": "Yes", "bad_sev": "high"},
-    "BitLocker enabled": {"section": "device", "good": "Yes", "bad_sev": "medium"},
-    "Auto-lock screen enabled": {"section": "device", "good": "Yes", "bad_sev": "medium","win_tag": "workstation_hardening"},
-    "Shared accounts in use": {"section": "device", "good": "No", "bad_sev": "high"},  # good is "No"
-    "RDP enabled anywhere": {"section": "device", "good": "No", "bad_sev": "high"},
-    "Unsupported OS present": {"section": "device", "good": "No", "bad_sev": "high"},
-    "USB ports restricted": {"section": "device", "good": "Yes", "bad_sev": "medium","win_tag": "data_loss_prevention"},
-
-    # Accounts / Access Controls
-    "Unique accounts per employee": {"section": "access", "good": "Yes", "bad_sev": "high"},
-    "Password complexity enforced": {"section": "access", "good": "Yes", "bad_sev": "medium","win_tag": "password_hygiene"},
-    "Password expiration policy active": {"section": "access", "good": "Yes", "bad_sev": "low"},  # informational; will be treated as secure/medium only
-    "MFA on email": {"section": "access", "good": "Yes", "bad_sev": "high"},
-    "MFA on critical systems": {"section": "access", "good": "Yes", "bad_sev": "high"},
-    "Inactive accounts removed": {"section": "access", "good": "Yes", "bad_sev": "medium","win_tag": "account_hygiene"},
-    "Default accounts disabled": {"section": "access", "good": "Yes", "bad_sev": "high","win_tag": "account_hygiene"},
-
-    # Backups / Data Protection
-    "Backups occur regularly": {"section": "backup", "good": "Yes", "bad_sev": "high"},
-    "Backups stored offsite": {"section": "backup", "good": "Yes", "bad_sev": "high"},
-    "Backup integrity tested": {"section": "backup", "good": "Yes", "bad_sev": "medium"},
-    "Shared folders restricted": {"section": "backup", "good": "Yes", "bad_sev": "medium","win_tag": "data_access"},
-    "Everyone permissions found": {"section": "backup", "good": "No", "bad_sev": "high","win_tag": "data_access"},
-
-    # Business Processes
-    "Incident Response Plan exists": {"section": "process", "good": "Yes", "bad_sev": "medium"},
-    "Cybersecurity training done": {"section": "process", "good": "Yes", "bad_sev": "medium","win_tag": "user_training"},
-    "Onboarding documented": {"section": "process", "good": "Yes", "bad_sev": "low","win_tag": "on_offboarding"},
-    "Offboarding documented": {"section": "process", "good": "Yes", "bad_sev": "high","win_tag": "on_offboarding"},
-
-    # Physical Security
-    "Networking equipment secured": {"section": "physical", "good": "Yes", "bad_sev": "medium","win_tag": "physical_security"},
-    "Server room restricted": {"section": "physical", "good": "Yes", "bad_sev": "high"},
-    "Workstations not publicly exposed": {"section": "physical", "good": "Yes", "bad_sev": "high"},
-}
+# Field rules (section, expected "good" value, severity when it differs) live in
+# assessment_core.FIELD_RULES, which also defines the fields flat inputs are read with
 
 # For "What You’re Doing Well" Section
 WIN_TAG_TEXT = {
@@ -135,32 +97,8 @@ class FindingLine:
 def load_input(path: str) -> Dict[str, Any]:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Input file not found: {path}")
-
-    ext = os.path.splitext(path)[1].lower().strip(".")
-    with open(path, "r", encoding="utf-8") as f:
-        raw = f.read()
-
-    if ext in ("yaml", "yml"):
-        if yaml is None:
-            raise RuntimeError("pyyaml not installed. Run: pip install pyyaml")
-        return yaml.safe_load(raw) or {}
-    if ext == "json":
-        return json.loads(raw)
-    raise ValueError("Input must be .yaml/.yml or .json")
-
-def normalize_value(v: Any) -> str:
-    if v is None:
-        return "Unknown"
-    s = str(v).strip()
-    # Accept common variants
-    s_low = s.lower()
-    if s_low in ("yes", "y", "true", "enabled", "on"):
-        return "Yes"
-    if s_low in ("no", "n", "false", "disabled", "off"):
-        return "No"
-    if s_low in ("unknown", "unk", "?"):
-        return "Unknown"
-    return s  # allow custom strings
+    with open(path, "rb") as f:
+        return parse_input(f.read(), os.path.splitext(path)[1].lower().strip("."))
 
 def classify(field: str, value: str) -> Tuple[str, str]:
     """
@@ -202,31 +140,102 @@ def build_wins_section(wins: set[str]) -> str:
     return "\n".join(lines)
 
 
-def build_section_lines(findings: Dict[str, Any]) -> Tuple[Dict[str, List[FindingLine]], List[str], List[str]]:
+# Medium findings promoted into "Top Risks"
+PROMOTED_MEDIUM = frozenset({
+    "Guest Wi-Fi isolated",
+    "WPS disabled",
+    "UPnP disabled",
+    "BitLocker enabled",
+    "Backup integrity tested",
+})
+
+# (field, expected value, quick win when the finding differs from it)
+QUICK_WIN_RULES = (
+    ("WPA2 or WPA3 in use", "Yes", "- Enable **WPA2/WPA3** on all Wi-Fi networks"),
+    ("MFA on email", "Yes", "- Enable **MFA** for all email accounts"),
+    ("Unique accounts per employee", "Yes", "- Create **unique accounts** per employee and remove shared logins"),
+    ("Shared accounts in use", "No", "- Eliminate **shared accounts** and assign per-user credentials"),
+    ("Backups stored offsite", "Yes", "- Configure **offsite backups** (cloud or rotated external drive stored offsite)"),
+    ("Server room restricted", "Yes", "- Restrict **server/networking access** (locked closet/room, limited key access)"),
+)
+
+# Unknown verification items
+UNKNOWN_VERIFY_FIELDS = (
+    "Guest Wi-Fi isolated",
+    "WPS disabled",
+    "UPnP disabled",
+    "BitLocker enabled",
+    "RDP enabled anywhere",
+    "Backups occur regularly",
+    "Backup integrity tested",
+    "SSID names recorded",
+)
+
+# Stable ordering: keep the order defined in FIELD_RULES when possible
+ORDER_INDEX = {k: i for i, k in enumerate(FIELD_RULES.keys())}
+
+def _classification(field: str, value: str) -> Tuple[str, str, str, str | None]:
+    sev, label = classify(field, value)
+    rule = FIELD_RULES.get(field, {})
+    win_tag = rule.get("win_tag") if sev == "secure" else None
+    return sev, label, rule.get("section", "process"), win_tag
+
+# (field, normalized value) -> (severity, label_html, section, win_tag), built
+# once at import for every mapped field and the normalized Yes/No/Unknown values.
+CLASSIFICATION: Dict[Tuple[str, str], Tuple[str, str, str, str | None]] = {
+    (field, value): _classification(field, value)
+    for field in FIELD_RULES
+    for value in ("Yes", "No", "Unknown")
+}
+
+def lookup(field: str, value: str) -> Tuple[str, str, str, str | None]:
+    """Classification of an already normalized finding (table hit, else computed)."""
+    hit = CLASSIFICATION.get((field, value))
+    return hit if hit is not None else _classification(field, value)
+
+@dataclass
+class Analysis:
+    """Everything the report needs from one assessment's findings."""
+    sections: Dict[str, List[FindingLine]]
+    unknown_items: List[str]
+    top_risks: List[str]
+    wins: set[str]
+    total_score: int
+    cat_scores: Dict[str, int]
+    quick_wins: str
+
+def analyze(findings: Dict[str, Any], normalized: bool = False) -> Analysis:
+    """
+    Single pass over the findings: each value is normalized once and
+    classified by table lookup; sections, top risks, wins, unknowns, scores
+    and quick wins all come from that pass. With normalized=True the values
+    are taken as already normalized (Assessment.normalized).
+    """
     sections: Dict[str, List[FindingLine]] = {k: [] for k in SECTION_TITLES.keys()}
+    counts_by_section = {k: {"secure": 0, "total": 0} for k in SECTION_TITLES.keys()}
     unknown_items: List[str] = []
     top_risks: List[str] = []
     wins: set[str] = set()
+    values: Dict[str, str] = {}
 
     for key, val in findings.items():
         # skip non-boolean meta fields
-        if key in ("Business Name", "Industry", "Employees", "Total workstations"):
+        if key in META_FIELDS:
             continue
 
-        v = normalize_value(val)
-        sev, label = classify(key, v)
+        v = val if normalized else normalize_value(val)
+        values[key] = v
+        sev, label, sec, win_tag = lookup(key, v)
 
         # ✅ Collect wins for SMB-friendly summary
-        if sev == "secure":
-            rule = FIELD_RULES.get(key)
-            if rule and "win_tag" in rule:
-                wins.add(rule["win_tag"])
-
-        note = WHY.get(key)
-        sections_key = FIELD_RULES.get(key, {}).get("section", "process")  # default-ish
+        if win_tag:
+            wins.add(win_tag)
 
-        sections.setdefault(sections_key, [])
-        sections[sections_key].append(FindingLine(key=key, value=v, label_html=label, note=note))
+        sections.setdefault(sec, []).append(FindingLine(key=key, value=v, label_html=label, note=WHY.get(key)))
+        counts = counts_by_section.setdefault(sec, {"secure": 0, "total": 0})
+        counts["total"] += 1
+        if sev == "secure":
+            counts["secure"] += 1
 
         if sev == "unknown":
             unknown_items.append(key)
@@ -234,85 +243,51 @@ def build_section_lines(findings: Dict[str, Any]) -> Tuple[Dict[str, List[Findin
         if sev == "high":
             # keep top risks short, client-friendly
             top_risks.append(f'- {LABELS["high"]} {key}')
-        elif sev == "medium" and key in (
-            "Guest Wi-Fi isolated",
-            "WPS disabled",
-            "UPnP disabled",
-            "BitLocker enabled",
-            "Backup integrity tested",
-        ):
+        elif sev == "medium" and key in PROMOTED_MEDIUM:
             # promote some medium/unknown-adjacent items into “Top Risks” if relevant
             top_risks.append(f'- {LABELS["medium"]} {key}')
 
-    # Stable ordering: keep the order defined in FIELD_RULES when possible
-    order_index = {k: i for i, k in enumerate(FIELD_RULES.keys())}
-
-    for sec, lines in sections.items():
-        lines.sort(key=lambda x: order_index.get(x.key, 9999))
+    for lines in sections.values():
+        lines.sort(key=lambda x: ORDER_INDEX.get(x.key, 9999))
 
-    # De-dup top risks while keeping order
-    seen = set()
-    top_risks_dedup = []
-    for r in top_risks:
-        if r not in seen:
-            top_risks_dedup.append(r)
-            seen.add(r)
-
-    return sections, unknown_items, top_risks_dedup, wins
-
-def score_from_findings(findings: Dict[str, Any]) -> Tuple[int, Dict[str, int]]:
-    """
-    Simple scoring:
-    - Start at 100.
-    - High: -12
-    - Medium: -6
-    - Unknown: -4
-    Minimum 0.
-
-    Category scores out of 10 derived from % of secure items in that category.
-    """
-    total = 100
-    counts_by_section = {k: {"secure": 0, "total": 0} for k in SECTION_TITLES.keys()}
-
-    for key, val in findings.items():
-        if key in ("Business Name", "Industry", "Employees", "Total workstations"):
-            continue
-
-        v = normalize_value(val)
-        sev, _ = classify(key, v)
-
-        # total score penalties
-        if sev == "high":
-            total -= 12
-        elif sev == "medium":
-            total -= 6
-        elif sev == "unknown":
-            total -= 4
-
-        sec = FIELD_RULES.get(key, {}).get("section", "process")
-        if sec not in counts_by_section:
-            counts_by_section[sec] = {"secure": 0, "total": 0}
-        counts_by_section[sec]["total"] += 1
-        if sev == "secure":
-            counts_by_section[sec]["secure"] += 1
-
-    total = max(0, min(100, total))
-
-    # Convert to /10 category scores
+    # Category scores out of 10 derived from % of secure items in that category
     cat_scores = {}
     for sec, c in counts_by_section.items():
-        if c["total"] == 0:
-            cat_scores[sec] = 10
-        else:
-            pct = c["secure"] / c["total"]
-            cat_scores[sec] = int(round(pct * 10))
+        cat_scores[sec] = 10 if c["total"] == 0 else int(round(c["secure"] / c["total"] * 10))
 
     # Derive overall score from category snapshot
     visible_categories = ["network", "access", "device", "process"]
     overall_10 = sum(cat_scores.get(k, 0) for k in visible_categories) / len(visible_categories)
-    total = int(round((overall_10 / 10) * 100))
+    total_score = int(round((overall_10 / 10) * 100))
+
+    # Quick wins from high/unknown items (missing fields count as Unknown)
+    quick = [text for field, good, text in QUICK_WIN_RULES if values.get(field, "Unknown") != good]
+    if any(values.get(f, "Unknown") == "Unknown" for f in UNKNOWN_VERIFY_FIELDS):
+        quick.append("- Verify all **Unknown** configurations (router settings + backup checks)")
+
+    return Analysis(
+        sections=sections,
+        unknown_items=unknown_items,
+        # De-dup top risks while keeping order
+        top_risks=list(dict.fromkeys(top_risks)),
+        wins=wins,
+        total_score=total_score,
+        cat_scores=cat_scores,
+        quick_wins="\n".join(quick) if quick else "- No immediate quick wins identified.",
+    )
+
+def build_section_lines(findings: Dict[str, Any]) -> Tuple[Dict[str, List[FindingLine]], List[str], List[str], set[str]]:
+    a = analyze(findings)
+    return a.sections, a.unknown_items, a.top_risks, a.wins
 
-    return total, cat_scores
+def score_from_findings(findings: Dict[str, Any]) -> Tuple[int, Dict[str, int]]:
+    """
+    Overall score out of 100 from the average of the network, access, device
+    and process category scores; category scores out of 10 are the share of
+    secure items in that category.
+    """
+    a = analyze(findings)
+    return a.total_score, a.cat_scores
 
 def render_findings_block(lines: List[FindingLine]) -> str:
     out = []
@@ -327,77 +302,136 @@ def build_quick_wins(findings: Dict[str, Any]) -> str:
     """
     Auto-generate quick wins based on high/unknown items.
     """
-    wins = []
-
-    def add_once(text: str):
-        if text not in wins:
-            wins.append(text)
-
-    # High-priority quick wins
-    if normalize_value(findings.get("WPA2 or WPA3 in use")) != "Yes":
-        add_once("- Enable **WPA2/WPA3** on all Wi-Fi networks")
-    if normalize_value(findings.get("MFA on email")) != "Yes":
-        add_once("- Enable **MFA** for all email accounts")
-    if normalize_value(findings.get("Unique accounts per employee")) != "Yes":
-        add_once("- Create **unique accounts** per employee and remove shared logins")
-    if normalize_value(findings.get("Shared accounts in use")) != "No":
-        add_once("- Eliminate **shared accounts** and assign per-user credentials")
-    if normalize_value(findings.get("Backups stored offsite")) != "Yes":
-        add_once("- Configure **offsite backups** (cloud or rotated external drive stored offsite)")
-    if normalize_value(findings.get("Server room restricted")) != "Yes":
-        add_once("- Restrict **server/networking access** (locked closet/room, limited key access)")
-
-    # Unknown verification items
-    unknown_fields = [
-        "Guest Wi-Fi isolated",
-        "WPS disabled",
-        "UPnP disabled",
-        "BitLocker enabled",
-        "RDP enabled anywhere",
-        "Backups occur regularly",
-        "Backup integrity tested",
-        "SSID names recorded",
-    ]
-    if any(normalize_value(findings.get(f)) == "Unknown" for f in unknown_fields):
-        add_once("- Verify all **Unknown** configurations (router settings + backup checks)")
-
-    return "\n".join(wins) if wins else "- No immediate quick wins identified."
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate SMB cybersecurity assessment report from template + findings.")
-    parser.add_argument("--input", "-i", required=True, help="Path to input YAML/JSON file containing business + findings.")
-    parser.add_argument("--template", "-t", default=TEMPLATE_DEFAULT, help=f"Path to template markdown (default: {TEMPLATE_DEFAULT})")
-    parser.add_argument("--outdir", "-o", default="reports", help="Output directory (default: reports)")
-    parser.add_argument("--pdf", action="store_true", help="Also generate a PDF version of the report")
-    parser.add_argument("--md2pdf", default="md_to_pdf.py", help="Path to md_to_pdf.py (default: md_to_pdf.py)")
-    parser.add_argument("--wkhtmltopdf", default=None, help="Optional path to wkhtmltopdf binary (if not in PATH)")
-    args = parser.parse_args()
+    return analyze(findings).quick_wins
+
+SHORT_TERM = "\n".join([
+    "- Enable WPA2/WPA3 Wi-Fi encryption",
+    "- Enforce unique user accounts and remove shared logins",
+    "- Enable MFA on email and any critical systems",
+    "- Implement offsite backups and define backup frequency",
+    "- Restrict physical access to networking/server equipment",
+    "- Verify and resolve all Unknown items",
+])
+
+LONG_TERM = "\n".join([
+    "- Deploy full-disk encryption (BitLocker) on all workstations",
+    "- Centralize identity and access management (least privilege)",
+    "- Establish monthly backup test/restore checks",
+    "- Perform quarterly account access reviews and annual security review",
+    "- Document remote access policy and restrict/monitor any RDP usage",
+])
+
+# Bump when report rendering code changes in a way the rule tables below do not capture
+RENDER_VERSION = 1
+# Artifact-cache fingerprint of every table that shapes a report
+RULES_FINGERPRINT = cache_key(LABELS, FIELD_RULES, WIN_TAG_TEXT, WHY, SECTION_TITLES, sorted(PROMOTED_MEDIUM),
+                              QUICK_WIN_RULES, UNKNOWN_VERIFY_FIELDS, SHORT_TERM, LONG_TERM)
+ARTIFACT_CACHE_DEFAULT = os.path.join(CACHE_DIR_DEFAULT, "artifacts")
+
+# Placeholders build_report() fills ({{TODAY}} is an alias of {{DATE}})
+REPORT_PLACEHOLDERS = (
+    "BUSINESS_NAME", "INDUSTRY", "EMPLOYEES", "DATE", "TODAY",
+    "SCORE_TOTAL", "SCORE_NETWORK", "SCORE_ACCESS", "SCORE_DEVICE", "SCORE_PROCESSES",
+    "TOP_RISKS", "QUICK_WINS", "WINS_SECTION",
+    "NETWORK_FINDINGS", "DEVICE_FINDINGS", "ACCESS_FINDINGS", "BACKUP_FINDINGS",
+    "PROCESS_FINDINGS", "PHYSICAL_FINDINGS", "UNKNOWN_ITEMS",
+    "SHORT_TERM_RECOMMENDATIONS", "LONG_TERM_RECOMMENDATIONS",
+)
+OPTIONAL_PLACEHOLDERS = {"TODAY"}
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    Template split once into literal text and placeholder names:
+    literals[0] names[0] literals[1] names[1] ... literals[-1].
+    Rendering is a single join, so values are never rescanned (a value that
+    contains "{{...}}" is inserted verbatim, not substituted again).
+    """
+    literals: Tuple[str, ...]
+    names: Tuple[str, ...]
+    path: str = ""
+
+    @classmethod
+    def compile(cls, text: str, path: str = "") -> "CompiledTemplate":
+        parts = PLACEHOLDER_RE.split(text)
+        return cls(literals=tuple(parts[0::2]), names=tuple(parts[1::2]), path=path)
+
+    @property
+    def placeholders(self) -> set:
+        return set(self.names)
+
+    def unknown_placeholders(self) -> List[str]:
+        """Placeholders in the template that build_report() never fills (left as-is)."""
+        return sorted(self.placeholders - set(REPORT_PLACEHOLDERS))
+
+    def unused_placeholders(self) -> List[str]:
+        """Report fields the template does not use."""
+        return [n for n in REPORT_PLACEHOLDERS if n not in self.placeholders and n not in OPTIONAL_PLACEHOLDERS]
+
+    def digest(self) -> str:
+        """Content hash of the compiled template (path and mtime do not matter)."""
+        return cache_key(self.literals, self.names)
+
+    def render(self, values: Dict[str, str]) -> str:
+        out = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = values.get(name)
+            out.append("{{" + name + "}}" if value is None else value)
+            out.append(literal)
+        return "".join(out)
+
+# path -> ((mtime_ns, size), CompiledTemplate)
+_TEMPLATE_CACHE: Dict[str, Tuple[Tuple[int, int], CompiledTemplate]] = {}
+
+def load_template(path: str) -> CompiledTemplate:
+    """Compiled template for `path`; recompiled only when the file's mtime/size change."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Template not found: {path}")
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _TEMPLATE_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        compiled = CompiledTemplate.compile(f.read(), path)
+    _TEMPLATE_CACHE[path] = (key, compiled)
+    return compiled
+
+def check_template(template: CompiledTemplate) -> None:
+    """Warn about placeholders the generator cannot fill and report fields the template drops."""
+    unknown = template.unknown_placeholders()
+    if unknown:
+        print(f"[!] {template.path}: unknown placeholders left unfilled: {', '.join('{{%s}}' % n for n in unknown)}")
+    unused = template.unused_placeholders()
+    if unused:
+        print(f"[!] {template.path}: template does not use: {', '.join('{{%s}}' % n for n in unused)}")
+
+def build_report(data: Dict[str, Any], template: CompiledTemplate, today: str) -> Tuple[str, str]:
+    """Fill `template` from one assessment's data. Returns (business name, report markdown)."""
+    # Allow findings to be merged with top-level key-values if user prefers flat input
+    # (If they put everything under Findings, perfect. If not, it still works.)
+    merged_findings = merge_findings(data, FINDING_FIELDS)
+    return render_report(data, analyze(merged_findings), template, today)
 
-    data = load_input(args.input)
+def build_report_for(assessment: Assessment, template: CompiledTemplate, today: str) -> Tuple[str, str]:
+    """build_report() for an Assessment loaded with FIELD_RULES as known fields (no re-normalizing)."""
+    return render_report(assessment.data, analyze(assessment.normalized, normalized=True), template, today)
 
+def render_report(data: Dict[str, Any], analysis: Analysis, template: CompiledTemplate, today: str) -> Tuple[str, str]:
     business = data.get("Business Name") or data.get("business_name") or "UNKNOWN_BUSINESS"
     industry = data.get("Industry") or data.get("industry") or "UNKNOWN_INDUSTRY"
     employees = data.get("Employees") or data.get("employees") or "?"
-    findings = data.get("Findings") or data.get("findings") or {}
-
-    # Allow findings to be merged with top-level key-values if user prefers flat input
-    # (If they put everything under Findings, perfect. If not, it still works.)
-    merged_findings = {}
-    merged_findings.update(findings)
-
-    # Also merge any known keys at the top-level as findings if present
-    for k in FIELD_RULES.keys():
-        if k in data and k not in merged_findings:
-            merged_findings[k] = data[k]
 
-    # Compute sections & scores
-    sections, unknown_items, top_risks, wins = build_section_lines(merged_findings)
-    total_score, cat_scores = score_from_findings(merged_findings)
+    sections, unknown_items, cat_scores = analysis.sections, analysis.unknown_items, analysis.cat_scores
+    total_score = analysis.total_score
 
     # Build content blocks
+    top_risks = analysis.top_risks
     top_risks_block = "\n".join(top_risks) if top_risks else f"- {LABELS['secure']} No high severity risks identified"
-    quick_wins_block = build_quick_wins(merged_findings)
-    wins_block = build_wins_section(wins)
+    quick_wins_block = analysis.quick_wins
+    wins_block = build_wins_section(analysis.wins)
 
     network_block = render_findings_block(sections.get("network", []))
     device_block = render_findings_block(sections.get("device", []))
@@ -408,88 +442,298 @@ def main() -> None:
 
     unknown_items_block = "\n".join([f"- {u}" for u in unknown_items]) if unknown_items else "- None"
 
-    short_term = "\n".join([
-        "- Enable WPA2/WPA3 Wi-Fi encryption",
-        "- Enforce unique user accounts and remove shared logins",
-        "- Enable MFA on email and any critical systems",
-        "- Implement offsite backups and define backup frequency",
-        "- Restrict physical access to networking/server equipment",
-        "- Verify and resolve all Unknown items",
-    ])
-
-    long_term = "\n".join([
-        "- Deploy full-disk encryption (BitLocker) on all workstations",
-        "- Centralize identity and access management (least privilege)",
-        "- Establish monthly backup test/restore checks",
-        "- Perform quarterly account access reviews and annual security review",
-        "- Document remote access policy and restrict/monitor any RDP usage",
-    ])
-
-    # Load template
-    if not os.path.exists(args.template):
-        raise FileNotFoundError(f"Template not found: {args.template}")
-
-    with open(args.template, "r", encoding="utf-8") as f:
-        template = f.read()
-
-    today = dt.date.today().strftime("%m/%d/%Y")
-
-    replacements = {
-        "{{BUSINESS_NAME}}": str(business),
-        "{{INDUSTRY}}": str(industry),
-        "{{EMPLOYEES}}": str(employees),
-        "{{DATE}}": today,
-        "{{SCORE_TOTAL}}": str(total_score),
-        "{{SCORE_NETWORK}}": str(cat_scores.get("network", 0)),
-        "{{SCORE_ACCESS}}": str(cat_scores.get("access", 0)),
-        "{{SCORE_DEVICE}}": str(cat_scores.get("device", 0)),
-        "{{SCORE_PROCESSES}}": str(cat_scores.get("process", 0)),
-        "{{TOP_RISKS}}": top_risks_block,
-        "{{QUICK_WINS}}": quick_wins_block,
-        "{{WINS_SECTION}}": wins_block,
-        "{{NETWORK_FINDINGS}}": network_block,
-        "{{DEVICE_FINDINGS}}": device_block,
-        "{{ACCESS_FINDINGS}}": access_block,
-        "{{BACKUP_FINDINGS}}": backup_block,
-        "{{PROCESS_FINDINGS}}": process_block,
-        "{{PHYSICAL_FINDINGS}}": physical_block,
-        "{{UNKNOWN_ITEMS}}": unknown_items_block,
-        "{{SHORT_TERM_RECOMMENDATIONS}}": short_term,
-        "{{LONG_TERM_RECOMMENDATIONS}}": long_term,
+    values = {
+        "BUSINESS_NAME": str(business),
+        "INDUSTRY": str(industry),
+        "EMPLOYEES": str(employees),
+        "DATE": today,
+        # Fallback: {{TODAY}} if user used it in content
+        "TODAY": today,
+        "SCORE_TOTAL": str(total_score),
+        "SCORE_NETWORK": str(cat_scores.get("network", 0)),
+        "SCORE_ACCESS": str(cat_scores.get("access", 0)),
+        "SCORE_DEVICE": str(cat_scores.get("device", 0)),
+        "SCORE_PROCESSES": str(cat_scores.get("process", 0)),
+        "TOP_RISKS": top_risks_block,
+        "QUICK_WINS": quick_wins_block,
+        "WINS_SECTION": wins_block,
+        "NETWORK_FINDINGS": network_block,
+        "DEVICE_FINDINGS": device_block,
+        "ACCESS_FINDINGS": access_block,
+        "BACKUP_FINDINGS": backup_block,
+        "PROCESS_FINDINGS": process_block,
+        "PHYSICAL_FINDINGS": physical_block,
+        "UNKNOWN_ITEMS": unknown_items_block,
+        "SHORT_TERM_RECOMMENDATIONS": SHORT_TERM,
+        "LONG_TERM_RECOMMENDATIONS": LONG_TERM,
     }
+    return str(business), template.render(values)
 
-    report = template
-    for k, v in replacements.items():
-        report = report.replace(k, v)
-
-    # Fallback: replace {{TODAY}} if user used it in content
-    report = report.replace("{{TODAY}}", today)
-
-    # Output file
+def write_report(outdir: str, business: str, report: str) -> str:
     safe_name = re.sub(r"[^A-Za-z0-9_\-]+", "_", str(business)).strip("_")
-    os.makedirs(args.outdir, exist_ok=True)
-    outpath = os.path.join(args.outdir, f"{safe_name}_SMB_Report.md")
-
+    os.makedirs(outdir, exist_ok=True)
+    outpath = os.path.join(outdir, f"{safe_name}_SMB_Report.md")
     with open(outpath, "w", encoding="utf-8") as f:
         f.write(report)
+    return outpath
 
-    print(f"[OK] Generated report: {outpath}")
+def report_key(assessment: Assessment, template_digest: str, today: str) -> str:
+    """
+    Artifact-cache key of a report: input content, template, rule tables,
+    renderer version and the report date ({{DATE}} is in the output, so a
+    report is never restored with an earlier day's date).
+    """
+    return cache_key("report", RENDER_VERSION, RULES_FINGERPRINT, template_digest, assessment.digest, today)
+
+def render_outputs(assessment: Assessment, template: CompiledTemplate, template_digest: str, today: str,
+                   outdir: str, estimate: bool = False, cache: ArtifactCache | None = None,
+                   refresh: bool = False) -> Dict[str, Any]:
+    """Write the report (and estimate) for one client, from the artifact cache when unchanged."""
+    key = report_key(assessment, template_digest, today)
+    ekey = estimate_key(assessment, today) if estimate else None
+    if cache is not None and not refresh:
+        output = cache.restore(key, outdir)
+        est = cache.restore(ekey, outdir) if ekey else None
+        if output and (est or not ekey):
+            return {"output": output, "estimate": est, "key": key, "cached": True}
+
+    business, report = build_report_for(assessment, template, today)
+    output = write_report(outdir, business, report)
+    # Same in-memory Assessment: the input is not parsed a second time
+    est = estimate_for(assessment, outdir, today) if estimate else None
+    if cache is not None:
+        cache.put(key, output)
+        if est:
+            cache.put(ekey, est)
+    return {"output": output, "estimate": est, "key": key, "cached": False}
+
+def queue_pdf(result: Dict[str, Any], pdf_service: Any, cache: ArtifactCache | None,
+              refresh: bool = False) -> Tuple[str | None, Any]:
+    """
+    Restore the report's PDF from the cache, or submit it to the service.
+    Returns (pdf cache key, Future or None).
+    """
+    pkey = cache_key("pdf", result["key"], pdf_service.fingerprint) if cache is not None else None
+    if pkey and not refresh:
+        pdf = cache.restore(pkey, os.path.dirname(result["output"]))
+        if pdf:
+            result.update(pdf=pdf, pdf_cached=True)
+            return pkey, None
+    return pkey, pdf_service.submit_file(result["output"])
+
+def finish_pdf(result: Dict[str, Any], pkey: str | None, future: Any, cache: ArtifactCache | None) -> None:
+    try:
+        rendered = future.result()
+    except Exception as e:
+        result["error"] = f"PDF: {type(e).__name__}: {e}"
+        return
+    result["pdf"], result["pdf_seconds"] = rendered.path, rendered.seconds
+    if cache is not None and pkey:
+        cache.put(pkey, rendered.path)
+
+# ---- Batch mode ----
+# Each worker process receives the compiled template once (pool initializer).
+# PDFs are not rendered in the workers: finished reports are queued to one
+# md_to_pdf.PdfService in this process (warm converters, bounded job queue),
+# so conversion overlaps with rendering of the remaining reports.
+
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(template: CompiledTemplate, today: str, outdir: str, estimate: bool = False,
+                 cache_dir: str | None = None, artifact_dir: str | None = None, refresh: bool = False) -> None:
+    _WORKER.update(template=template, template_digest=template.digest(), today=today, outdir=outdir,
+                   estimate=estimate, cache_dir=cache_dir, refresh=refresh,
+                   artifacts=ArtifactCache(artifact_dir) if artifact_dir else None)
+
+def _render_one(path: str) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"input": path, "output": None, "pdf": None, "estimate": None, "seconds": 0.0,
+                              "pdf_seconds": 0.0, "error": None, "skipped": None, "key": None, "cached": False,
+                              "pdf_cached": False}
+    start = time.perf_counter()
+    try:
+        assessment = load_assessment(path, FINDING_FIELDS, _WORKER["cache_dir"])
+        if not assessment.business:
+            # inputs/ ships Template.yaml next to the real assessments; skip it rather than fail the batch
+            result["skipped"] = "no Business Name (blank template?)"
+        else:
+            result.update(render_outputs(assessment, _WORKER["template"], _WORKER["template_digest"],
+                                         _WORKER["today"], _WORKER["outdir"], _WORKER["estimate"],
+                                         _WORKER["artifacts"], _WORKER["refresh"]))
+    except Exception as e:  # one bad input must not stop the batch
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def _iter_rendered(inputs: List[str], initargs: tuple, workers: int):
+    if workers == 1:
+        _init_worker(*initargs)
+        for p in inputs:
+            yield _render_one(p)
+        return
+    chunksize = max(1, len(inputs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.map(_render_one, inputs, chunksize=chunksize)
+
+def run_batch(inputs: List[str], template: CompiledTemplate, today: str, outdir: str, workers: int,
+              pdf_service: Any = None, estimate: bool = False, cache_dir: str | None = None,
+              artifacts: ArtifactCache | None = None, refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Render every input, in parallel across `workers` processes (1 = in this
+    process). With a PdfService, each finished report is queued for conversion
+    as soon as it is written (or its PDF restored from `artifacts`).
+    """
+    initargs = (template, today, outdir, estimate, cache_dir, artifacts.root if artifacts else None, refresh)
+    workers = max(1, min(workers, len(inputs)))
+    results, pending = [], []
+    for result in _iter_rendered(inputs, initargs, workers):
+        results.append(result)
+        if pdf_service is not None and result["error"] is None and result["skipped"] is None:
+            pkey, future = queue_pdf(result, pdf_service, artifacts, refresh)
+            if future is not None:
+                pending.append((result, pkey, future))
+    for result, pkey, future in pending:
+        finish_pdf(result, pkey, future, artifacts)
+    return results
+
+def print_batch_summary(results: List[Dict[str, Any]], elapsed: float, workers: int) -> None:
+    ok = [r for r in results if r["error"] is None and r["skipped"] is None]
+    failed = [r for r in results if r["error"] is not None]
+    for r in results:
+        if r["skipped"] is not None:
+            print(f"[i] Skipped {r['input']}: {r['skipped']}")
+    for r in failed:
+        print(f"[!] {r['input']}: {r['error']}")
+    for o in sorted(o for o, n in Counter(r["output"] for r in ok).items() if n > 1):
+        print(f"[!] Several inputs share a Business Name and overwrote {o}")
+    rate = len(ok) / elapsed if elapsed else 0.0
+    skipped = len(results) - len(ok) - len(failed)
+    print(f"[+] Batch: {len(ok)} reports ({len(failed)} failed, {skipped} skipped) in {elapsed:.2f}s "
+          f"with {workers} worker(s) -> {rate:,.1f} reports/s")
+    if ok:
+        per = sorted(r["seconds"] for r in ok)
+        print(f"[+] Per report: median {per[len(per) // 2] * 1000:.1f} ms, max {per[-1] * 1000:.1f} ms")
+        estimates = sum(1 for r in ok if r["estimate"])
+        if estimates:
+            print(f"[+] Cost estimates: {estimates}")
+        pdf_times = [r["pdf_seconds"] for r in ok if r["pdf"] and not r["pdf_cached"]]
+        if pdf_times:
+            print(f"[+] PDFs: {len(pdf_times)}, {sum(pdf_times) / len(pdf_times) * 1000:.1f} ms average conversion")
+        cached = sum(1 for r in ok if r["cached"])
+        if cached:
+            pdfs = sum(1 for r in ok if r["pdf_cached"])
+            print(f"[+] Unchanged (artifact cache): {cached} reports" + (f", {pdfs} PDFs" if pdfs else ""))
+
+def print_cache_summary(artifacts: ArtifactCache) -> None:
+    """Evict least recently used artifacts beyond the size limit and report the store size."""
+    removed, freed = artifacts.prune()
+    count, size = artifacts.usage()
+    line = f"[+] Artifact cache: {count} artifacts, {size / 1024 / 1024:.1f} MB"
+    if removed:
+        line += f" (evicted {removed}, {freed / 1024 / 1024:.1f} MB)"
+    print(line)
+
+def start_pdf_service(workers: int, wkhtmltopdf: str | None, renderer: str) -> Any:
+    """md_to_pdf.PdfService, or exit with a hint when its dependencies are missing."""
+    try:
+        from md_to_pdf import PdfService
+        service = PdfService(workers=workers, wkhtmltopdf=wkhtmltopdf, renderer=renderer)
+    except (RuntimeError, OSError) as e:
+        print(f"[!] --pdf: {e}")
+        sys.exit(1)
+    if service.renderer == "html" and renderer == "auto":
+        print("[i] wkhtmltopdf not available: writing HTML instead of PDF")
+    return service
 
-     # Optional: also generate PDF
-    if args.pdf:
-        pdf_outpath = os.path.splitext(outpath)[0] + ".pdf"
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate SMB cybersecurity assessment report from template + findings.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", "-i", help="Path to input YAML/JSON file containing business + findings.")
+    source.add_argument("--batch", "-b", help="Directory of YAML/JSON inputs, or a manifest file listing them (one report each)")
+    parser.add_argument("--template", "-t", default=TEMPLATE_DEFAULT, help=f"Path to template markdown (default: {TEMPLATE_DEFAULT})")
+    parser.add_argument("--outdir", "-o", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--pdf", action="store_true", help="Also generate a PDF version of the report")
+    parser.add_argument("--pdf-renderer", choices=("auto", "pdf", "html"), default="pdf",
+                        help="pdf (wkhtmltopdf), html (local fallback) or auto (default: pdf)")
+    parser.add_argument("--pdf-workers", type=int, default=2,
+                        help="Warm PDF converter threads (default: 2)")
+    parser.add_argument("--wkhtmltopdf", default=None, help="Optional path to wkhtmltopdf binary (if not in PATH)")
+    parser.add_argument("--estimate", "-e", action="store_true",
+                        help="Also write the remediation cost estimate (from the same parsed input)")
+    parser.add_argument("--cache", default=CACHE_DIR_DEFAULT,
+                        help="Parsed-input cache directory, keyed by file content ('' disables)")
+    parser.add_argument("--artifact-cache", default=ARTIFACT_CACHE_DEFAULT,
+                        help="Rendered report/estimate/PDF cache directory ('' disables)")
+    parser.add_argument("--artifact-cache-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="Artifact cache size limit; least recently used artifacts are evicted (default: 512)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-render everything (the artifact cache is still updated)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for --batch (default: CPU count)")
+    add_profile_args(parser)
+    args = parser.parse_args()
+    with profile_session(args, "report-generator"):
+        run(args)
 
-        cmd = [sys.executable, args.md2pdf, outpath, pdf_outpath]
-        if args.wkhtmltopdf:
-            cmd += ["--wkhtmltopdf", args.wkhtmltopdf]
 
+def run(args: argparse.Namespace) -> None:
+    template = load_template(args.template)
+    check_template(template)
+    today = dt.date.today().strftime("%m/%d/%Y")
+
+    artifacts = None
+    if args.artifact_cache:
+        artifacts = ArtifactCache(args.artifact_cache, int(args.artifact_cache_mb * 1024 * 1024))
+
+    # Fail on missing PDF dependencies before any report is rendered
+    pdf_service = start_pdf_service(args.pdf_workers, args.wkhtmltopdf, args.pdf_renderer) if args.pdf else None
+
+    if args.batch:
+        inputs = collect_inputs(args.batch)
+        if not inputs:
+            print(f"[!] No YAML/JSON inputs found in {args.batch}")
+            sys.exit(1)
+        workers = max(1, min(args.workers, len(inputs)))
+        start = time.perf_counter()
         try:
-            subprocess.run(cmd, check=True)
-            print(f"[OK] Generated PDF: {pdf_outpath}")
-        except subprocess.CalledProcessError as e:
+            results = run_batch(inputs, template, today, args.outdir, workers, pdf_service,
+                                args.estimate, args.cache or None, artifacts, args.refresh)
+        finally:
+            if pdf_service is not None:
+                pdf_service.close()
+        print_batch_summary(results, time.perf_counter() - start, workers)
+        if artifacts is not None:
+            print_cache_summary(artifacts)
+        if any(r["error"] for r in results):
+            sys.exit(1)
+        return
+
+    assessment = load_assessment(args.input, FINDING_FIELDS, args.cache or None)
+    result = render_outputs(assessment, template, template.digest(), today, args.outdir, args.estimate,
+                            artifacts, args.refresh)
+    unchanged = " (unchanged, from artifact cache)" if result["cached"] else ""
+
+    print(f"[OK] Generated report: {result['output']}{unchanged}")
+
+    if args.estimate:
+        print(f"[OK] Cost estimate generated: {result['estimate']}{unchanged}")
+
+    # Optional: also generate PDF
+    if pdf_service is not None:
+        try:
+            pkey, future = queue_pdf(result, pdf_service, artifacts, args.refresh)
+            if future is not None:
+                finish_pdf(result, pkey, future, artifacts)
+        finally:
+            pdf_service.close()
+        if result.get("error"):
             print("[!] PDF generation failed.")
-            print(f"    Command: {' '.join(cmd)}")
-            raise
+            print(f"    Error: {result['error']}")
+            sys.exit(1)
+        cached_pdf = " (unchanged, from artifact cache)" if result.get("pdf_cached") else ""
+        print(f"[OK] Generated {pdf_service.renderer.upper()}: {result['pdf']}{cached_pdf}")
+
+    if artifacts is not None:
+        artifacts.prune()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,441 @@
+"""
+log_correlation.py — Streaming multi-source correlation engine
+--------------------------------------------------------------
+Merges time-ordered authentication and phishing events from several sources
+into one stream and evaluates windowed join rules over it.
+
+Sources (each may be given several times):
+  --wevtutil PATH   wevtutil /f:text export (4624/4625), parsed with the
+                    windows-event-monitor-analyzer block parser
+  --clicks PATH     click JSONL from the awareness landing page: a
+                    click-journal directory or a single .jsonl file
+  --splunk PATH     Splunk CSV export of Security logons (EventCode,
+                    Account_Name, Source_Network_Address, ComputerName, _time)
+
+Every source is a generator of Event tuples sorted by time; the streams are
+combined with a k-way heap merge (heapq.merge), so memory does not grow with
+the number of events. Splunk exports are newest-first and are the one
+exception: their rows are collected as compact tuples and sorted once.
+
+Rules keep per-key join state (user or IP -> recent events) in an
+OrderedDict ordered by last update: keys idle for longer than the rule's
+window are evicted as the stream advances, and a hard cap on keys bounds
+memory on pathological input.
+
+Usage:
+  python log_correlation.py --wevtutil FailedLogons.txt --wevtutil SuccessfulLogons.txt \\
+      --clicks ../../siem-labs/security-awareness-automation/evidence/logs/click-journal \\
+      --splunk splunk_security_logons_7d.csv --out alerts.jsonl
+"""
+
+import argparse
+import csv
+import heapq
+import ipaddress
+import json
+import os
+import sys
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ANALYZER_DIR = os.path.normpath(os.path.join(HERE, "..", "..", "..", "windows-event-monitor-analyzer"))
+AWARENESS_SRC = os.path.normpath(os.path.join(HERE, "..", "..", "siem-labs", "security-awareness-automation", "src"))
+sys.path.insert(0, ANALYZER_DIR)
+sys.path.insert(0, AWARENESS_SRC)
+from click_journal import iter_events as iter_journal, iter_file as iter_click_file  # noqa: E402
+from columnar import to_epoch  # noqa: E402
+from parser import detect_utf16, iter_blocks, parse_block  # noqa: E402
+
+# kind: "logon_failed" (4625), "logon_success" (4624) or "click";
+# host is the computer for logons and the campaign for clicks
+Event = namedtuple("Event", "ts kind user ip host source")
+
+KIND_BY_EVENT_ID = {"4624": "logon_success", "4625": "logon_failed"}
+NO_VALUE = {"", "-", "n/a", "null"}
+
+DEFAULT_MAX_KEYS = 200_000
+# Recent events remembered per key (enough for any threshold below)
+MAX_EVENTS_PER_KEY = 64
+# How far a streaming source may run out of order before events count as late
+DEFAULT_REORDER_SECONDS = 60.0
+
+
+# ---- Normalization ----
+def norm_user(value):
+    """'DOMAIN\\Tim' / 'tim@example.com' / 'Tim' -> 'tim'; None for blanks."""
+    if not value:
+        return None
+    user = value.strip()
+    if user.lower() in NO_VALUE:
+        return None
+    user = user.rsplit("\\", 1)[-1].split("@", 1)[0]
+    return user.lower() or None
+
+def norm_ip(value):
+    if not value:
+        return None
+    ip = value.strip()
+    return None if ip.lower() in NO_VALUE else ip
+
+@lru_cache(maxsize=65536)
+def is_external(ip):
+    """Publicly routable address (not private, loopback, link-local, ...)."""
+    if not ip:
+        return False
+    try:
+        return ipaddress.ip_address(ip.split("%", 1)[0]).is_global
+    except ValueError:
+        return False
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+# ---- Sources ----
+def iter_wevtutil(path):
+    """Logon events from a wevtutil text export, streamed block by block."""
+    with open(path, "rb") as f:
+        codec, bom_len = detect_utf16(f.read(2))
+    with open(path, "r", encoding=codec, errors="ignore") as f:
+        if bom_len:
+            f.read(1)
+        for block in iter_blocks(f):
+            ev = parse_block(block)
+            if not ev:
+                continue
+            ts = to_epoch(ev["when"])
+            if not ts:
+                continue
+            yield Event(float(ts), KIND_BY_EVENT_ID[ev["event_id"]], norm_user(ev["account"]),
+                        norm_ip(ev["src_ip"]), ev["host"], "wevtutil")
+
+def iter_clicks(path):
+    """Click events from a click-journal directory or a single JSONL file."""
+    records = iter_journal(path) if os.path.isdir(path) else iter_click_file(path)
+    for rec in records:
+        try:
+            ts = datetime.fromisoformat(rec["timestamp_utc"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            continue
+        yield Event(ts, "click", norm_user(rec.get("user")), norm_ip(rec.get("client_ip")),
+                    rec.get("campaign"), "clicks")
+
+def _splunk_account(value):
+    """
+    Account_Name is multi-valued (subject, then target). Same preference as the
+    wevtutil parser: a later value replaces a blank, N/A or machine account.
+    """
+    account = None
+    for candidate in (value or "").split("\n"):
+        candidate = candidate.strip()
+        if not account or account.upper() in ("N/A", "-") or account.endswith("$"):
+            account = candidate or account
+    return account
+
+def _splunk_time(value):
+    """'2025-11-05T19:50:00.000-0800' -> epoch seconds (0 if unparseable)."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+    except ValueError:
+        return float(to_epoch(value))
+
+def iter_splunk(path):
+    """Logon events from a Splunk CSV export, sorted oldest-first."""
+    events = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            kind = KIND_BY_EVENT_ID.get(row.get("EventCode", ""))
+            if kind is None:
+                continue
+            ts = _splunk_time(row.get("_time", ""))
+            if not ts:
+                continue
+            events.append(Event(ts, kind, norm_user(_splunk_account(row.get("Account_Name"))),
+                                norm_ip(row.get("Source_Network_Address")),
+                                row.get("ComputerName") or row.get("host"), "splunk"))
+    # Exports are newest-first: one reversed run, which sort() handles in linear time
+    events.sort(key=lambda e: e.ts)
+    yield from events
+
+def reorder(events, name, stats, slack=DEFAULT_REORDER_SECONDS):
+    """
+    Re-sequence a nearly ordered stream: events are held in a heap until the
+    stream is `slack` seconds past them. Anything older than what was already
+    released is dropped and counted as late (e.g. a newest-first export, or a
+    host clock that was set back): passing it on would break the time order
+    heapq.merge and the window rules rely on.
+    """
+    heap, seq, released = [], 0, float("-inf")
+    for ev in events:
+        if ev.ts < released:
+            stats["late"][name] += 1
+            continue
+        heapq.heappush(heap, (ev.ts, seq, ev))
+        seq += 1
+        horizon = ev.ts - slack
+        while heap and heap[0][0] <= horizon:
+            released = heap[0][0]
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+def counted(events, name, stats):
+    for ev in events:
+        stats["events"][name] += 1
+        yield ev
+
+def merged(sources, stats, slack=DEFAULT_REORDER_SECONDS):
+    """k-way heap merge of (label, iterator) sources into one time-ordered stream."""
+    streams = [counted(reorder(it, label, stats, slack), label, stats) for label, it in sources]
+    return heapq.merge(*streams, key=lambda e: e.ts)
+
+
+# ---- Rules ----
+class WindowRule:
+    """
+    Base for windowed rules: key -> deque of recent matching events, in an
+    OrderedDict kept in last-update order so idle keys are evicted from the
+    front as time advances.
+    """
+
+    def __init__(self, name, window_seconds, threshold=1, max_keys=DEFAULT_MAX_KEYS, description=""):
+        self.name = name
+        self.window = window_seconds
+        self.threshold = threshold
+        self.max_keys = max_keys
+        self.description = description
+        self.state = OrderedDict()
+        self.alerts = 0
+        self.evicted = 0
+        self.peak_keys = 0
+
+    def expire(self, now):
+        cutoff = now - self.window
+        state = self.state
+        while state:
+            key, recent = next(iter(state.items()))
+            if recent and recent[-1].ts >= cutoff:
+                break
+            del state[key]
+
+    def remember(self, key, ev):
+        recent = self.state.get(key)
+        if recent is None:
+            recent = self.state[key] = deque(maxlen=max(MAX_EVENTS_PER_KEY, self.threshold))
+            if len(self.state) > self.max_keys:
+                self.state.popitem(last=False)
+                self.evicted += 1
+            self.peak_keys = max(self.peak_keys, len(self.state))
+        else:
+            self.state.move_to_end(key)
+        recent.append(ev)
+        return recent
+
+    def in_window(self, recent, now):
+        cutoff = now - self.window
+        while recent and recent[0].ts < cutoff:
+            recent.popleft()
+        return recent
+
+    def alert(self, key, recent, trigger=None):
+        self.alerts += 1
+        last = trigger or recent[-1]
+        return {
+            "rule": self.name,
+            "time": iso(last.ts),
+            "key": key,
+            "count": len(recent),
+            "first_seen": iso(recent[0].ts),
+            "users": sorted({e.user for e in recent if e.user}),
+            "ips": sorted({e.ip for e in recent if e.ip}),
+            "hosts": sorted({e.host for e in recent if e.host}),
+            "trigger": dict(last._asdict(), ts=iso(last.ts)) if trigger else None,
+            "description": self.description,
+        }
+
+
+class ThresholdRule(WindowRule):
+    """`threshold` events of `kinds` for one key within the window."""
+
+    def __init__(self, name, kinds, key, window_seconds, threshold, **kw):
+        super().__init__(name, window_seconds, threshold, **kw)
+        self.kinds = frozenset(kinds)
+        self.then_kinds = frozenset()
+        self.key = key
+
+    def first(self, ev):
+        key = self.key(ev)
+        if key is None:
+            return None
+        recent = self.in_window(self.remember(key, ev), ev.ts)
+        if len(recent) >= self.threshold:
+            alert = self.alert(key, recent)
+            del self.state[key]  # next alert needs a fresh burst
+            return alert
+        return None
+
+
+class SequenceRule(WindowRule):
+    """
+    At least `threshold` events of `first_kinds` for a key, followed within the
+    window by an event of `then_kinds` for the same key (optionally filtered).
+    """
+
+    def __init__(self, name, first_kinds, then_kinds, key, window_seconds, threshold=1,
+                 then_filter=None, **kw):
+        super().__init__(name, window_seconds, threshold, **kw)
+        self.kinds = frozenset(first_kinds)
+        self.then_kinds = frozenset(then_kinds)
+        self.key = key
+        self.then_filter = then_filter
+
+    def first(self, ev):
+        key = self.key(ev)
+        if key is not None:
+            self.remember(key, ev)
+        return None
+
+    def then(self, ev):
+        if self.then_filter is not None and not self.then_filter(ev):
+            return None
+        key = self.key(ev)
+        recent = self.state.get(key) if key is not None else None
+        if not recent:
+            return None
+        if not self.in_window(recent, ev.ts):
+            del self.state[key]
+            return None
+        if len(recent) < self.threshold:
+            return None
+        alert = self.alert(key, recent, trigger=ev)
+        del self.state[key]
+        return alert
+
+
+def user_key(include_machine=False):
+    def key(ev):
+        if not ev.user or (not include_machine and ev.user.endswith("$")):
+            return None
+        return ev.user
+    return key
+
+def ip_key(ev):
+    return ev.ip
+
+def default_rules(args):
+    users = user_key(args.include_machine_accounts)
+    return [
+        ThresholdRule(
+            "bruteforce_source", ("logon_failed",), lambda ev: ev.ip or users(ev),
+            args.bruteforce_minutes * 60, args.bruteforce_threshold, max_keys=args.max_keys,
+            description=f">= {args.bruteforce_threshold} failed logons from one source "
+                        f"within {args.bruteforce_minutes:g} min",
+        ),
+        SequenceRule(
+            "success_after_failures", ("logon_failed",), ("logon_success",), users,
+            args.window_minutes * 60, args.failures, max_keys=args.max_keys,
+            description=f">= {args.failures} failed logons followed by a success for the same user "
+                        f"within {args.window_minutes:g} min",
+        ),
+        SequenceRule(
+            "click_then_external_logon", ("click",), ("logon_success",), users,
+            args.click_window_minutes * 60, 1, then_filter=lambda ev: is_external(ev.ip),
+            max_keys=args.max_keys,
+            description=f"phishing click followed by a logon from an external IP "
+                        f"within {args.click_window_minutes:g} min",
+        ),
+    ]
+
+
+class Correlator:
+    """Feed a time-ordered stream through every rule; yields alerts."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.dispatch = {}
+        for rule in rules:
+            for kind in rule.kinds:
+                self.dispatch.setdefault(kind, []).append(rule.first)
+            for kind in rule.then_kinds:
+                self.dispatch.setdefault(kind, []).append(rule.then)
+        self.events = 0
+
+    def run(self, events, expire_every=1024):
+        expire_at = 0
+        for ev in events:
+            self.events += 1
+            if self.events >= expire_at:
+                for rule in self.rules:
+                    rule.expire(ev.ts)
+                expire_at = self.events + expire_every
+            for handler in self.dispatch.get(ev.kind, ()):
+                alert = handler(ev)
+                if alert is not None:
+                    yield alert
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Correlate logon and phishing-click events across sources.")
+    ap.add_argument("--wevtutil", action="append", default=[], help="wevtutil /f:text export (repeatable)")
+    ap.add_argument("--clicks", action="append", default=[], help="Click journal dir or click JSONL (repeatable)")
+    ap.add_argument("--splunk", action="append", default=[], help="Splunk CSV export of logons (repeatable)")
+    ap.add_argument("--out", help="Write alerts as JSON Lines here (default: print them)")
+    ap.add_argument("--window-minutes", type=float, default=10, help="Failures -> success window (default: 10)")
+    ap.add_argument("--failures", type=int, default=3, help="Failed logons before a success alerts (default: 3)")
+    ap.add_argument("--click-window-minutes", type=float, default=60,
+                    help="Click -> external logon window (default: 60)")
+    ap.add_argument("--bruteforce-minutes", type=float, default=5, help="Brute-force window (default: 5)")
+    ap.add_argument("--bruteforce-threshold", type=int, default=5,
+                    help="Failed logons per source within the window (default: 5)")
+    ap.add_argument("--include-machine-accounts", action="store_true",
+                    help="Also join on machine accounts (NAME$)")
+    ap.add_argument("--max-keys", type=int, default=DEFAULT_MAX_KEYS,
+                    help=f"Join-state cap per rule (default: {DEFAULT_MAX_KEYS})")
+    ap.add_argument("--reorder-seconds", type=float, default=DEFAULT_REORDER_SECONDS,
+                    help="Out-of-order tolerance per streaming source; later stragglers are dropped (default: 60)")
+    args = ap.parse_args()
+
+    sources = ([(f"wevtutil:{p}", iter_wevtutil(p)) for p in args.wevtutil]
+               + [(f"clicks:{p}", iter_clicks(p)) for p in args.clicks]
+               + [(f"splunk:{p}", iter_splunk(p)) for p in args.splunk])
+    if not sources:
+        ap.error("give at least one --wevtutil, --clicks or --splunk source")
+    for label, _ in sources:
+        path = label.split(":", 1)[1]
+        if not os.path.exists(path):
+            print(f"[!] Not found: {path}")
+            sys.exit(1)
+
+    stats = {"events": Counter(), "late": Counter()}
+    correlator = Correlator(default_rules(args))
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    start = time.perf_counter()
+    try:
+        for alert in correlator.run(merged(sources, stats, args.reorder_seconds)):
+            out.write(json.dumps(alert) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"[+] {correlator.events:,} events in {elapsed:.2f}s "
+          f"({correlator.events / elapsed if elapsed else 0:,.0f} events/s)", file=sys.stderr)
+    for label, n in stats["events"].items():
+        late = stats["late"][label]
+        print(f"    {label}: {n:,}" + (f" (+{late:,} dropped: out of order beyond --reorder-seconds)" if late else ""), file=sys.stderr)
+    for rule in correlator.rules:
+        print(f"[+] {rule.name}: {rule.alerts} alert(s), peak join keys {rule.peak_keys:,}"
+              + (f", {rule.evicted:,} evicted at cap" if rule.evicted else ""), file=sys.stderr)
+    if args.out:
+        print(f"[+] Alerts written to: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,708 @@
+"""
+password_audit.py — Offline credential auditing engine
+------------------------------------------------------
+Audits NTLM hash dumps (pwdump / secretsdump "user:rid:LM:NT:::" or
+"user:NT") and plaintext test lists ("user:password") for:
+
+- Breached / common passwords: NT hashes looked up in a corpus built once
+  from a breach list (HIBP "HASH:count" NTLM export) or a wordlist
+- Reused credentials: accounts sharing one NT hash
+- Weak / patterned plaintext: length, character classes, keyboard walks,
+  sequences, repeats, word+year, username inside the password
+- Legacy storage: LM hashes present, blank passwords
+
+Corpus format (build-corpus):
+  corpus.bin        sorted, de-duplicated 16-byte NT hashes (external merge
+                    sort, so the input may be far larger than memory)
+  corpus.bin.idx    65,537 little-endian uint64 record offsets, one per
+                    2-byte hash prefix; a lookup is one mmap binary search
+                    inside its prefix bucket
+  corpus.bloom      optional Bloom filter (--bloom): an in-memory first check,
+                    or the only check when the sorted file is not shipped
+
+The audit splits the dump into byte ranges, one per worker process; each
+worker maps the corpus (shared page cache), scores plaintext in batches and
+spills (hash, account) pairs into hash-prefix buckets. Reuse groups are then
+built bucket by bucket in parallel, so no process ever holds the whole dump.
+
+Usage:
+  python password_audit.py build-corpus --hashes pwned-passwords-ntlm.txt -o corpus.bin --bloom corpus.bloom
+  python password_audit.py build-corpus --wordlist rockyou.txt -o corpus.bin
+  python password_audit.py audit ntds.dump --corpus corpus.bin --out audit/
+  python password_audit.py audit test-users.txt --plaintext --corpus corpus.bin --out audit/
+"""
+
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np  # optional: vectorized complexity scoring
+except ImportError:
+    np = None
+
+RECORD = 16
+PREFIX_BUCKETS = 1 << 16
+EMPTY_LM = "aad3b435b51404eeaad3b435b51404ee"
+EMPTY_NT = "31d6cfe0d16ae931b73c59d7e0c089c0"
+HEX32_RE = re.compile(r"^[0-9a-fA-F]{32}$")
+
+MASK64 = (1 << 64) - 1
+BLOOM_MAGIC = b"PWBLOOM1"
+BLOOM_HEADER = struct.Struct("<8sQI")
+
+DEFAULT_CHUNK_RECORDS = 4_000_000     # hashes per sorted run while building (64 MB)
+DEFAULT_REUSE_BUCKETS = 256
+SCORE_BATCH = 4096
+WEAK_SCORE = 50
+MIN_LENGTH = 12
+
+
+# ---- NTLM ----
+def _md4_py(data):
+    """MD4 (RFC 1320), for Python builds whose OpenSSL no longer ships it."""
+    def rol(x, n):
+        x &= 0xFFFFFFFF
+        return ((x << n) | (x >> (32 - n))) & 0xFFFFFFFF
+
+    msg = bytearray(data)
+    bit_len = (8 * len(data)) & 0xFFFFFFFFFFFFFFFF
+    msg.append(0x80)
+    msg.extend(b"\0" * ((56 - len(msg) % 64) % 64))
+    msg.extend(struct.pack("<Q", bit_len))
+    a, b, c, d = 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476
+    for off in range(0, len(msg), 64):
+        x = struct.unpack("<16I", msg[off:off + 64])
+        aa, bb, cc, dd = a, b, c, d
+        for i in (0, 4, 8, 12):
+            a = rol(a + ((b & c) | (~b & d)) + x[i], 3)
+            d = rol(d + ((a & b) | (~a & c)) + x[i + 1], 7)
+            c = rol(c + ((d & a) | (~d & b)) + x[i + 2], 11)
+            b = rol(b + ((c & d) | (~c & a)) + x[i + 3], 19)
+        for i in (0, 1, 2, 3):
+            a = rol(a + ((b & c) | (b & d) | (c & d)) + x[i] + 0x5A827999, 3)
+            d = rol(d + ((a & b) | (a & c) | (b & c)) + x[i + 4] + 0x5A827999, 5)
+            c = rol(c + ((d & a) | (d & b) | (a & b)) + x[i + 8] + 0x5A827999, 9)
+            b = rol(b + ((c & d) | (c & a) | (d & a)) + x[i + 12] + 0x5A827999, 13)
+        for i in (0, 2, 1, 3):
+            a = rol(a + (b ^ c ^ d) + x[i] + 0x6ED9EBA1, 3)
+            d = rol(d + (a ^ b ^ c) + x[i + 8] + 0x6ED9EBA1, 9)
+            c = rol(c + (d ^ a ^ b) + x[i + 4] + 0x6ED9EBA1, 11)
+            b = rol(b + (c ^ d ^ a) + x[i + 12] + 0x6ED9EBA1, 15)
+        a, b, c, d = (a + aa) & 0xFFFFFFFF, (b + bb) & 0xFFFFFFFF, (c + cc) & 0xFFFFFFFF, (d + dd) & 0xFFFFFFFF
+    return struct.pack("<4I", a, b, c, d)
+
+try:
+    hashlib.new("md4", b"")
+    def _md4(data):
+        return hashlib.new("md4", data).digest()
+except ValueError:
+    _md4 = _md4_py
+
+def ntlm(password):
+    """NT hash (16 bytes) of a plaintext password."""
+    return _md4(password.encode("utf-16-le"))
+
+
+# ---- Sorted corpus (mmap) ----
+def index_path(corpus):
+    return corpus + ".idx"
+
+def build_prefix_index(mm, count):
+    """Record offset of the first hash for every 2-byte prefix (plus the end)."""
+    idx = array("Q", [0]) * (PREFIX_BUCKETS + 1)
+    pos = 0
+    for p in range(PREFIX_BUCKETS):
+        idx[p] = pos
+        # advance to the first record with prefix > p
+        lo, hi = pos, count
+        key = (p + 1).to_bytes(2, "big") if p + 1 < PREFIX_BUCKETS else None
+        if key is None:
+            pos = count
+            continue
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[mid * RECORD:mid * RECORD + 2] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        pos = lo
+    idx[PREFIX_BUCKETS] = count
+    return idx
+
+class SortedCorpus:
+    """Read-only view of a corpus.bin file; lookups never load the file into memory."""
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        if size % RECORD:
+            raise ValueError(f"{path}: size is not a multiple of {RECORD} bytes")
+        self.count = size // RECORD
+        self._f = open(path, "rb")
+        self.mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.index = self._load_index()
+
+    def _load_index(self):
+        idx = array("Q")
+        try:
+            with open(index_path(self.path), "rb") as f:
+                idx.frombytes(f.read())
+        except OSError:
+            pass
+        if len(idx) != PREFIX_BUCKETS + 1 or idx[-1] != self.count:
+            idx = build_prefix_index(self.mm, self.count)
+        return idx
+
+    def __contains__(self, digest):
+        p = (digest[0] << 8) | digest[1]
+        lo, hi = self.index[p], self.index[p + 1]
+        mm = self.mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            rec = mm[mid * RECORD:(mid + 1) * RECORD]
+            if rec < digest:
+                lo = mid + 1
+            elif rec > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._f.close()
+
+
+# ---- Bloom filter ----
+class BloomFilter:
+    """
+    Bit array over NT hashes. The digests are already uniformly random, so
+    the k probe positions come from double hashing two 64-bit halves.
+    """
+
+    def __init__(self, bits, k, data=None):
+        self.bits = bits
+        self.k = k
+        self.data = data if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n, fp_rate):
+        n = max(1, n)
+        bits = max(64, int(-n * math.log(fp_rate) / (math.log(2) ** 2)))
+        k = max(1, round(bits / n * math.log(2)))
+        return cls(bits, k)
+
+    def _positions(self, digest):
+        # 64-bit wraparound, so the numpy path below probes the same bits
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bits = self.bits
+        return [((h1 + i * h2) & MASK64) % bits for i in range(self.k)]
+
+    def add(self, digest):
+        data = self.data
+        for pos in self._positions(digest):
+            data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest):
+        data = self.data
+        return all(data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def _np_positions(self, records):
+        halves = np.frombuffer(records, dtype="<u8").reshape(-1, 2)
+        h1, h2 = halves[:, 0], halves[:, 1] | np.uint64(1)
+        steps = np.arange(self.k, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.bits)
+
+    def add_many(self, records):
+        """Add concatenated 16-byte digests (e.g. a slice of corpus.bin)."""
+        if np is None:
+            for i in range(0, len(records), RECORD):
+                self.add(records[i:i + RECORD])
+            return
+        pos = self._np_positions(records).ravel()
+        view = np.frombuffer(self.data, dtype=np.uint8)
+        np.bitwise_or.at(view, (pos >> np.uint64(3)).astype(np.intp),
+                         np.left_shift(1, (pos & np.uint64(7)).astype(np.uint8)).astype(np.uint8))
+
+    def contains_many(self, digests):
+        """Membership for a batch of digests, as a list of bools."""
+        if np is None or not digests:
+            return [d in self for d in digests]
+        pos = self._np_positions(b"".join(digests))
+        view = np.frombuffer(self.data, dtype=np.uint8)
+        hits = view[(pos >> np.uint64(3)).astype(np.intp)] & np.left_shift(1, (pos & np.uint64(7)).astype(np.uint8))
+        return hits.astype(bool).all(axis=1).tolist()
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.bits, self.k))
+            f.write(self.data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, bits, k = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+            if magic != BLOOM_MAGIC:
+                raise ValueError(f"{path}: not a password_audit Bloom filter")
+            return cls(bits, k, bytearray(f.read()))
+
+
+# ---- Building the corpus ----
+def _parse_hash_line(line):
+    """HIBP NTLM export line 'HASH:count' (or a bare hash) -> 16 bytes, or None."""
+    h = line.split(":", 1)[0].strip()
+    return bytes.fromhex(h) if len(h) == 32 and HEX32_RE.match(h) else None
+
+def _hash_words(lines):
+    return [ntlm(w) for w in lines if w]
+
+def _iter_input_chunks(path, lines_per_chunk, wordlist):
+    with open(path, "r", encoding="utf-8", errors="ignore" if wordlist else "strict") as f:
+        chunk = []
+        for line in f:
+            chunk.append(line.rstrip("\r\n") if wordlist else line)
+            if len(chunk) >= lines_per_chunk:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _bounded_map(pool, fn, items, window):
+    """pool.map that keeps at most `window` tasks in flight (Executor.map queues everything up front)."""
+    pending = []
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for fut in pending:
+        yield fut.result()
+
+def _write_run(digests, tmpdir, n):
+    digests.sort()
+    path = os.path.join(tmpdir, f"run-{n:05d}.bin")
+    with open(path, "wb") as f:
+        f.write(b"".join(digests))
+    return path
+
+def _iter_run(path, buffer_records=65536):
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(RECORD * buffer_records)
+            if not buf:
+                return
+            for i in range(0, len(buf), RECORD):
+                yield buf[i:i + RECORD]
+
+def build_corpus(inputs, out, wordlist=False, bloom=None, fp_rate=0.001, workers=1,
+                 chunk_records=DEFAULT_CHUNK_RECORDS):
+    """
+    Sorted, de-duplicated corpus from hash lists or wordlists (hashed across
+    `workers` processes). Returns the number of distinct hashes written.
+    """
+    tmpdir = tempfile.mkdtemp(prefix="pwaudit-build-", dir=os.path.dirname(os.path.abspath(out)))
+    runs = []
+    try:
+        pending = []
+        pool = ProcessPoolExecutor(max_workers=workers) if wordlist and workers > 1 else None
+        try:
+            for path in inputs:
+                if wordlist:
+                    chunks = _iter_input_chunks(path, max(1, chunk_records // max(1, workers * 4)), True)
+                    batches = _bounded_map(pool, _hash_words, chunks, workers * 2) if pool else map(_hash_words, chunks)
+                else:
+                    batches = ([d for d in map(_parse_hash_line, chunk) if d]
+                               for chunk in _iter_input_chunks(path, chunk_records, False))
+                for digests in batches:
+                    pending.extend(digests)
+                    if len(pending) >= chunk_records:
+                        runs.append(_write_run(pending, tmpdir, len(runs)))
+                        pending = []
+        finally:
+            if pool:
+                pool.shutdown()
+        if pending or not runs:
+            runs.append(_write_run(pending, tmpdir, len(runs)))
+
+        # k-way merge of the sorted runs, dropping duplicates
+        count, last = 0, None
+        tmp_out = out + ".tmp"
+        with open(tmp_out, "wb") as f:
+            buf = []
+            for digest in heapq.merge(*(_iter_run(r) for r in runs)):
+                if digest == last:
+                    continue
+                buf.append(digest)
+                last = digest
+                count += 1
+                if len(buf) >= 65536:
+                    f.write(b"".join(buf))
+                    buf = []
+            f.write(b"".join(buf))
+        os.replace(tmp_out, out)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    corpus = SortedCorpus(out)
+    try:
+        with open(index_path(out), "wb") as f:
+            f.write(corpus.index.tobytes())
+        if bloom:
+            bf = BloomFilter.for_capacity(count, fp_rate)
+            with open(out, "rb") as f:
+                for block in iter(lambda: f.read(RECORD * 65536), b""):
+                    bf.add_many(block)
+            bf.save(bloom)
+    finally:
+        corpus.close()
+    return count
+
+
+# ---- Complexity scoring ----
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm", "1234567890", "qazwsxedc")
+WALKS = tuple({row[i:i + 4] for row in KEYBOARD_ROWS for i in range(len(row) - 3)}
+              | {row[::-1][i:i + 4] for row in KEYBOARD_ROWS for i in range(len(row) - 3)})
+WALK_RE = re.compile("|".join(map(re.escape, sorted(WALKS))))
+SEQUENCE_RE = re.compile(r"(?:abcd|bcde|cdef|defg|0123|1234|2345|3456|4567|5678|6789|9876|8765|7654|6543|5432|4321)")
+REPEAT_RE = re.compile(r"(.)\1\1")
+WORD_YEAR_RE = re.compile(r"^[A-Za-z]+[!@#$.]?(?:19|20)\d\d[!@#$.]?$|^[A-Za-z]+\d{1,3}[!@#$.]?$")
+COMMON_WORDS_RE = re.compile(r"password|passw0rd|welcome|letmein|admin|qwerty|summer|winter|spring|autumn|fall"
+                             r"|monkey|dragon|iloveyou|changeme|company|football|baseball")
+CLASS_RES = (re.compile(r"[a-z]"), re.compile(r"[A-Z]"), re.compile(r"\d"), re.compile(r"[^A-Za-z0-9]"))
+
+def score_batch(passwords, users=None):
+    """
+    Complexity scores (0-100) and issue lists for a batch of plaintext passwords.
+    Features are extracted per column over the whole batch; with numpy the
+    score is one vector expression.
+    """
+    users = users or [None] * len(passwords)
+    lowered = [p.lower() for p in passwords]
+    lengths = [len(p) for p in passwords]
+    classes = [sum(1 for rx in CLASS_RES if rx.search(p)) for p in passwords]
+    walks = [bool(WALK_RE.search(lp)) for lp in lowered]
+    seqs = [bool(SEQUENCE_RE.search(lp)) for lp in lowered]
+    repeats = [bool(REPEAT_RE.search(p)) for p in passwords]
+    word_year = [bool(WORD_YEAR_RE.match(p)) for p in passwords]
+    common = [bool(COMMON_WORDS_RE.search(lp)) for lp in lowered]
+    has_user = [bool(u) and len(u) >= 3 and u.lower() in lp for u, lp in zip(users, lowered)]
+
+    if np is not None:
+        length_pts = np.minimum(np.asarray(lengths), 20) * 3
+        penalty = (np.asarray(walks, dtype=int) + np.asarray(seqs, dtype=int) + np.asarray(repeats, dtype=int)
+                   + np.asarray(word_year, dtype=int)) * 10 + (np.asarray(common, dtype=int)
+                                                               + np.asarray(has_user, dtype=int)) * 20
+        scores = np.clip(length_pts + np.asarray(classes) * 10 - penalty, 0, 100).tolist()
+    else:
+        scores = [max(0, min(100, min(n, 20) * 3 + c * 10 - (w + s + r + y) * 10 - (m + u) * 20))
+                  for n, c, w, s, r, y, m, u in zip(lengths, classes, walks, seqs, repeats, word_year, common, has_user)]
+
+    results = []
+    for i, score in enumerate(scores):
+        issues = []
+        if 0 < lengths[i] < MIN_LENGTH:
+            issues.append("short")
+        if classes[i] < 3:
+            issues.append("few_character_classes")
+        if walks[i]:
+            issues.append("keyboard_walk")
+        if seqs[i]:
+            issues.append("sequence")
+        if repeats[i]:
+            issues.append("repeated_characters")
+        if word_year[i]:
+            issues.append("word_plus_digits")
+        if common[i]:
+            issues.append("common_word")
+        if has_user[i]:
+            issues.append("contains_username")
+        results.append((int(score), issues))
+    return results
+
+
+# ---- Dump parsing ----
+def parse_dump_line(line, plaintext, lineno):
+    """
+    -> (account, nt_digest, lm_hex, password) or None.
+    password is None for hash dumps; account is "line:N" (N = line number in the
+    dump) for bare passwords.
+    """
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    if plaintext:
+        user, sep, pw = line.partition(":")
+        if not sep:
+            user, pw = f"line:{lineno}", line
+        return user, ntlm(pw), None, pw
+    parts = line.split(":")
+    if len(parts) >= 4 and HEX32_RE.match(parts[3]):
+        return parts[0], bytes.fromhex(parts[3]), parts[2].lower(), None
+    if len(parts) >= 2 and HEX32_RE.match(parts[1]):
+        return parts[0], bytes.fromhex(parts[1]), None, None
+    return None
+
+def split_ranges(path, parts):
+    """Byte ranges of `path`, each starting at a line boundary."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return [(0, 0)]
+    step = max(1, size // parts)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(i * step)
+            f.readline()
+            pos = f.tell()
+            if pos >= size or pos <= bounds[-1]:
+                continue
+            bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def first_line_numbers(path, ranges, chunk=1 << 20):
+    """1-based line number of the first line of each (start, end) range from split_ranges()."""
+    numbers, lines, pos = [], 1, 0
+    with open(path, "rb") as f:
+        for start, _ in ranges:
+            while pos < start:
+                data = f.read(min(chunk, start - pos))
+                if not data:
+                    break
+                lines += data.count(b"\n")
+                pos += len(data)
+            numbers.append(lines)
+    return numbers
+
+
+# ---- Audit workers ----
+FINDING_COLUMNS = ("account", "nt_hash_prefix", "breached", "score", "issues")
+
+def _audit_range(job):
+    """Worker: audit lines in [start, end) of the dump; spill reuse pairs into buckets."""
+    (path, start, end, part, first_line, plaintext, corpus_path, bloom_path, tmpdir, buckets) = job
+    corpus = SortedCorpus(corpus_path) if corpus_path else None
+    bloom = BloomFilter.load(bloom_path) if bloom_path else None
+    stats = Counter()
+    bucket_files = {}
+    findings_path = os.path.join(tmpdir, f"findings-{part:04d}.csv")
+
+    def bucket_writer(b):
+        f = bucket_files.get(b)
+        if f is None:
+            f = bucket_files[b] = open(os.path.join(tmpdir, f"bucket-{b:04d}-{part:04d}.tsv"), "w", encoding="utf-8")
+        return f
+
+    batch = []
+
+    def flush(writer):
+        scores = score_batch([e[3] for e in batch], [e[0] for e in batch]) if plaintext else [None] * len(batch)
+        # Bloom first for the whole batch; only its hits go to the sorted corpus
+        maybe = bloom.contains_many([e[1] for e in batch]) if bloom is not None else [True] * len(batch)
+        for (account, digest, lm, pw), scored, candidate in zip(batch, scores, maybe):
+            issues = []
+            breached = False
+            if candidate and (bloom is not None or corpus is not None):
+                breached = corpus is None or digest in corpus
+            if breached:
+                issues.append("breached")
+            hexd = digest.hex()
+            if hexd == EMPTY_NT:
+                issues.append("blank_password")
+            if lm and lm != EMPTY_LM:
+                issues.append("lm_hash_stored")
+            score = ""
+            if scored is not None:
+                score = scored[0]
+                issues.extend(scored[1])
+                if score < WEAK_SCORE:
+                    issues.append("weak")
+            for issue in issues:
+                stats[issue] += 1
+            stats["accounts"] += 1
+            if issues:
+                stats["flagged"] += 1
+                writer.writerow((account, hexd[:8], int(breached), score, ";".join(issues)))
+            bucket_writer(digest[0] * buckets // 256).write(f"{hexd}\t{account}\n")
+        batch.clear()
+
+    try:
+        with open(findings_path, "w", encoding="utf-8", newline="") as out, \
+                open(path, "rb") as f:
+            writer = csv.writer(out)
+            f.seek(start)
+            pos = start
+            lineno = first_line
+            while pos < end:
+                raw = f.readline()
+                if not raw:
+                    break
+                pos += len(raw)
+                entry = parse_dump_line(raw.decode("utf-8", errors="replace"), plaintext, lineno)
+                lineno += 1
+                if entry is None:
+                    stats["skipped_lines"] += 1
+                    continue
+                batch.append(entry)
+                if len(batch) >= SCORE_BATCH:
+                    flush(writer)
+            if batch:
+                flush(writer)
+    finally:
+        for fh in bucket_files.values():
+            fh.close()
+        if corpus is not None:
+            corpus.close()
+    return stats, findings_path
+
+def _reuse_bucket(job):
+    """Worker: group one hash bucket from every part file; returns groups with >1 account."""
+    tmpdir, b = job
+    groups = {}
+    prefix = f"bucket-{b:04d}-"
+    for name in sorted(os.listdir(tmpdir)):
+        if not name.startswith(prefix):
+            continue
+        with open(os.path.join(tmpdir, name), "r", encoding="utf-8") as f:
+            for line in f:
+                h, _, account = line.rstrip("\n").partition("\t")
+                groups.setdefault(h, []).append(account)
+    return [(h, accounts) for h, accounts in groups.items() if len(accounts) > 1]
+
+def audit(dump, out_dir, plaintext=False, corpus=None, bloom=None, workers=1,
+          buckets=DEFAULT_REUSE_BUCKETS, top=20):
+    """Run the audit; writes findings.csv, reuse.csv and summary.json to out_dir. Returns the summary."""
+    os.makedirs(out_dir, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(prefix="pwaudit-", dir=out_dir)
+    ranges = split_ranges(dump, max(1, workers * 4))
+    # Bare passwords are labelled "line:N" by their line in the dump; hash dumps have account names
+    first_lines = first_line_numbers(dump, ranges) if plaintext else [0] * len(ranges)
+    jobs = [(dump, s, e, i, n, plaintext, corpus, bloom, tmpdir, buckets)
+            for i, ((s, e), n) in enumerate(zip(ranges, first_lines))]
+    stats = Counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_audit_range, jobs))
+            with open(os.path.join(out_dir, "findings.csv"), "w", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerow(FINDING_COLUMNS)
+                for part_stats, path in parts:
+                    stats.update(part_stats)
+                    with open(path, "r", encoding="utf-8") as part:
+                        shutil.copyfileobj(part, f)
+
+            reuse_groups = reuse_accounts = 0
+            largest = []
+            with open(os.path.join(out_dir, "reuse.csv"), "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(("nt_hash_prefix", "accounts", "members"))
+                for groups in pool.map(_reuse_bucket, [(tmpdir, b) for b in range(buckets)]):
+                    for h, accounts in groups:
+                        reuse_groups += 1
+                        reuse_accounts += len(accounts)
+                        writer.writerow((h[:8], len(accounts), ";".join(accounts)))
+                        entry = (len(accounts), h[:8], accounts[:10])
+                        if len(largest) < top:
+                            heapq.heappush(largest, entry)
+                        elif entry > largest[0]:
+                            heapq.heapreplace(largest, entry)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    summary = {
+        "dump": dump,
+        "mode": "plaintext" if plaintext else "hashes",
+        "accounts": stats["accounts"],
+        "flagged": stats["flagged"],
+        "skipped_lines": stats["skipped_lines"],
+        "issues": {k: v for k, v in sorted(stats.items())
+                   if k not in ("accounts", "flagged", "skipped_lines")},
+        "reuse": {
+            "groups": reuse_groups,
+            "accounts": reuse_accounts,
+            "largest": [{"nt_hash_prefix": h, "accounts": n, "sample": sample}
+                        for n, h, sample in sorted(largest, reverse=True)],
+        },
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline password / NTLM hash audit.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build-corpus", help="Build the sorted hash corpus (and optional Bloom filter)")
+    src = b.add_mutually_exclusive_group(required=True)
+    src.add_argument("--hashes", nargs="+", help="NTLM hash lists (HIBP 'HASH:count' or one hash per line)")
+    src.add_argument("--wordlist", nargs="+", help="Plaintext wordlists (hashed to NTLM)")
+    b.add_argument("-o", "--out", required=True, help="Output corpus file (e.g. corpus.bin)")
+    b.add_argument("--bloom", help="Also write a Bloom filter here")
+    b.add_argument("--fp-rate", type=float, default=0.001, help="Bloom false-positive rate (default: 0.001)")
+    b.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes for --wordlist")
+    b.add_argument("--chunk-records", type=int, default=DEFAULT_CHUNK_RECORDS,
+                   help=f"Hashes per in-memory sorted run (default: {DEFAULT_CHUNK_RECORDS:,})")
+
+    a = sub.add_parser("audit", help="Audit a hash dump or plaintext list")
+    a.add_argument("dump", help="pwdump/secretsdump file, 'user:NT' lines, or 'user:password' with --plaintext")
+    a.add_argument("--plaintext", action="store_true", help="Input is user:password (or one password per line)")
+    a.add_argument("--corpus", help="Sorted corpus from build-corpus")
+    a.add_argument("--bloom", help="Bloom filter from build-corpus (checked first; alone it means 'probably')")
+    a.add_argument("--out", default="password-audit", help="Output directory (default: password-audit)")
+    a.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    a.add_argument("--buckets", type=int, default=DEFAULT_REUSE_BUCKETS, help="Reuse grouping partitions")
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build-corpus":
+        inputs = args.hashes or args.wordlist
+        for path in inputs:
+            if not os.path.isfile(path):
+                print(f"[!] Input not found: {path}")
+                sys.exit(1)
+        count = build_corpus(inputs, args.out, wordlist=bool(args.wordlist), bloom=args.bloom,
+                             fp_rate=args.fp_rate, workers=args.workers, chunk_records=args.chunk_records)
+        print(f"[+] Corpus: {count:,} distinct hashes -> {args.out} ({time.perf_counter() - start:.1f}s)")
+        if args.bloom:
+            print(f"[+] Bloom filter ({args.fp_rate:g} FP rate) -> {args.bloom}")
+        return
+
+    if not os.path.isfile(args.dump):
+        print(f"[!] Input not found: {args.dump}")
+        sys.exit(1)
+    if not args.corpus and not args.bloom:
+        print("[i] No --corpus/--bloom given: breach checks skipped")
+    summary = audit(args.dump, args.out, args.plaintext, args.corpus, args.bloom, args.workers, args.buckets)
+    elapsed = time.perf_counter() - start
+    print(f"[+] {summary['accounts']:,} accounts audited in {elapsed:.1f}s "
+          f"({summary['accounts'] / elapsed if elapsed else 0:,.0f}/s), {summary['flagged']:,} flagged")
+    for issue, n in sorted(summary["issues"].items(), key=lambda kv: -kv[1]):
+        print(f"    {issue:<24} {n:,}")
+    reuse = summary["reuse"]
+    print(f"[+] Reuse: {reuse['groups']:,} shared hashes across {reuse['accounts']:,} accounts")
+    for g in reuse["largest"][:5]:
+        print(f"    {g['nt_hash_prefix']}…  {g['accounts']:,} accounts  e.g. {', '.join(g['sample'][:3])}")
+    print(f"[+] Reports: {os.path.join(args.out, 'findings.csv')}, reuse.csv, summary.json")
+
+
+if __name__ == "__main__":
+    main()
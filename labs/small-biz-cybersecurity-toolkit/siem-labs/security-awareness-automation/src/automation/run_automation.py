@@ -1,21 +1,44 @@
+import argparse
 import csv
-import os
+import hashlib
 import json
+import os
+import sys
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from typing import Optional
 
 # Determine important directories
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))
 EVIDENCE_LOG_DIR = os.path.join(PROJECT_ROOT, "evidence", "logs")
 
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from click_journal import (  # noqa: E402
+    iter_events as iter_journal, iter_file as iter_click_file,
+    list_segments, read_from, read_index,
+)
+from click_store import ClickStore  # noqa: E402
+
+# Repo-wide instrumentation (--profile)
+SHARED_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "..", "..", "..", "..", "shared"))
+sys.path.insert(0, SHARED_DIR)
+from instrumentation import add_profile_args, profile_session  # noqa: E402
+
 # Log file paths
 CLICK_LOG = os.path.join(EVIDENCE_LOG_DIR, "click-events.csv")
 CLICK_JSONL = os.path.join(EVIDENCE_LOG_DIR, "click-events.jsonl")
+CLICK_JOURNAL_DIR = os.path.join(EVIDENCE_LOG_DIR, "click-journal")
 ACTIONS_LOG = os.path.join(EVIDENCE_LOG_DIR, "sent-actions.log")
 METRICS_CSV = os.path.join(EVIDENCE_LOG_DIR, "metrics-summary.csv")
+STATE_PATH = os.path.join(EVIDENCE_LOG_DIR, "automation-state.json")
 
 WINDOW_DAYS = 30
+STATE_VERSION = 1
+HEAD_BYTES = 4096
+
+# Action level by clicks in the window (see decision-matrix.md)
+LEVELS = {0: None, 1: "TRAINING_SENT"}
+ESCALATED = "ESCALATED"
 
 def parse_iso(ts: str) -> datetime:
     """Parse an ISO timestamp with timezone."""
@@ -25,35 +48,54 @@ def ensure_paths() -> None:
     """Ensure the evidence directory exists."""
     os.makedirs(EVIDENCE_LOG_DIR, exist_ok=True)
 
+def _jsonl_click(event: dict, cutoff: datetime):
+    """Normalize one JSON click event; None if malformed or before the cutoff."""
+    ts_str = event.get("timestamp_utc")
+    if not ts_str:
+        return None
+    try:
+        ts = parse_iso(ts_str)
+    except Exception:
+        return None
+    if ts < cutoff:
+        return None
+    return {
+        "ts": ts,
+        "user": event.get("user", "unknown"),
+        "campaign": event.get("campaign", "sim-000"),
+    }
+
+def click_sources(db: Optional[str] = None) -> list:
+    """Click logs that load_clicks_since() will read, in read order."""
+    if db:
+        return [db]
+    sources = [p for p in (CLICK_JOURNAL_DIR, CLICK_JSONL) if os.path.exists(p)]
+    if not sources and os.path.exists(CLICK_LOG):
+        sources.append(CLICK_LOG)
+    return sources
+
 def load_clicks_since(cutoff: datetime):
-    """Load click events occurring at or after the cutoff from JSONL or CSV."""
+    """Load click events occurring at or after the cutoff.
+
+    Reads the server's click journal (sealed segments older than the cutoff
+    are skipped via their sidecar index) plus the legacy JSONL log; the CSV
+    is only used when neither exists. JSONL files are binary-searched to the
+    cutoff, so only the window is decoded, not all history.
+    """
     ensure_paths()
+    sources = click_sources()
     clicks = []
-    # Prefer JSONL if available
-    if os.path.exists(CLICK_JSONL):
-        with open(CLICK_JSONL, "r", encoding="utf-8") as f_jsonl:
-            for line in f_jsonl:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    event = json.loads(line)
-                except Exception:
-                    continue
-                ts_str = event.get("timestamp_utc")
-                if not ts_str:
-                    continue
-                try:
-                    ts = parse_iso(ts_str)
-                except Exception:
-                    continue
-                if ts >= cutoff:
-                    clicks.append({
-                        "ts": ts,
-                        "user": event.get("user", "unknown"),
-                        "campaign": event.get("campaign", "sim-000"),
-                    })
-    elif os.path.exists(CLICK_LOG):
+    if CLICK_JOURNAL_DIR in sources:
+        for event in iter_journal(CLICK_JOURNAL_DIR, since=cutoff):
+            click = _jsonl_click(event, cutoff)
+            if click:
+                clicks.append(click)
+    if CLICK_JSONL in sources:
+        for event in iter_click_file(CLICK_JSONL, since=cutoff):
+            click = _jsonl_click(event, cutoff)
+            if click:
+                clicks.append(click)
+    if CLICK_LOG in sources:
         # Fallback to CSV
         with open(CLICK_LOG, "r", encoding="utf-8") as f_csv:
             reader = csv.DictReader(f_csv)
@@ -97,45 +139,202 @@ def write_metrics(total_clicks: int, unique_users: int, repeat_users: int, by_ca
         for camp, cnt in sorted(by_campaign.items(), key=lambda x: x[0]):
             w.writerow([camp, cnt])
 
-def main() -> None:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=WINDOW_DAYS)
-    clicks = load_clicks_since(cutoff)
+# -- Incremental state -------------------------------------------------------
+# Per-user and per-campaign click counts by UTC day, the last click per user,
+# the action level already taken per user, and a byte cursor per click file.
+# Each run folds in only the lines appended since the cursors, expires days
+# that left the window and emits actions only when a user moves up a level.
+
+def new_state() -> dict:
+    return {"version": STATE_VERSION, "cursors": {}, "user_days": {}, "campaign_days": {},
+            "last_click": {}, "levels": {}}
+
+def load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return new_state()
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != STATE_VERSION:
+        return new_state()
+    return state
+
+def save_state(path: str, state: dict) -> None:
+    """Write the state file atomically so a crash never leaves half a snapshot."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, path)
+
+def reset_counts(state: dict) -> None:
+    """Forget counts and cursors but keep the action levels already taken."""
+    levels = state["levels"]
+    state.update(new_state())
+    state["levels"] = levels
+
+def file_head(path: str, length: int = HEAD_BYTES) -> str:
+    """Hash of the first `length` bytes of a file, to notice it was replaced under the cursor."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+def level_for(count: int):
+    return LEVELS.get(count, ESCALATED)
+
+def fold_click(state: dict, click: dict) -> None:
+    day = click["ts"].astimezone(timezone.utc).date().isoformat()
+    user, campaign = click["user"], click["campaign"]
+    days = state["user_days"].setdefault(user, {})
+    days[day] = days.get(day, 0) + 1
+    camp = state["campaign_days"].setdefault(campaign, {})
+    camp[day] = camp.get(day, 0) + 1
+    ts = click["ts"].isoformat()
+    last = state["last_click"].get(user)
+    if last is None or parse_iso(last[0]) <= click["ts"]:
+        state["last_click"][user] = [ts, campaign]
+
+def expire(state: dict, first_day: str) -> None:
+    """Drop day buckets before `first_day` (YYYY-MM-DD) and users left with none."""
+    for table in ("user_days", "campaign_days"):
+        for key in list(state[table]):
+            days = {d: n for d, n in state[table][key].items() if d >= first_day}
+            if days:
+                state[table][key] = days
+            else:
+                del state[table][key]
+    for user in list(state["last_click"]):
+        if user not in state["user_days"]:
+            del state["last_click"][user]
 
-    # Aggregate clicks by user and campaign
-    clicks_by_user = defaultdict(list)
-    clicks_by_campaign = defaultdict(int)
+def _read_cursor(state: dict, path: str, cutoff: datetime, seen: set) -> list:
+    """New clicks in one JSONL file since its stored cursor."""
+    seen.add(path)
+    size = os.path.getsize(path)
+    cursor = state["cursors"].get(path)
+    # Compare the same prefix that was hashed last time: a small file that has
+    # grown since is still the same file.
+    if cursor and (size < cursor["offset"]
+                   or file_head(path, cursor.get("head_len", HEAD_BYTES)) != cursor["head"]):
+        raise ValueError(f"{path} was truncated or replaced")
+    offset = cursor["offset"] if cursor else 0
+    if offset == size:
+        return []
+    events, offset = read_from(path, offset, since=None if cursor else cutoff)
+    head_len = min(offset, HEAD_BYTES)
+    state["cursors"][path] = {"offset": offset, "head": file_head(path, head_len), "head_len": head_len}
+    return [c for c in (_jsonl_click(e, cutoff) for e in events) if c]
 
+def store_key(db: str) -> str:
+    return "sqlite:" + os.path.abspath(db)
+
+def _read_store(state: dict, db: str, cutoff: datetime, seen: set) -> list:
+    """New clicks in the SQLite click store (server --backend sqlite) since the stored row id."""
+    key = store_key(db)
+    seen.add(key)
+    store = ClickStore(db)
+    try:
+        cursor = state["cursors"].get(key)
+        if cursor and store.max_id() < cursor["id"]:
+            raise ValueError(f"{db} was replaced")
+        rows = store.clicks_after(cursor["id"] if cursor else 0, since=None if cursor else cutoff)
+        last_id = rows[-1][0] if rows else (cursor["id"] if cursor else 0)
+    finally:
+        store.close()
+    state["cursors"][key] = {"id": last_id}
+    return [c for c in (_jsonl_click(e, cutoff) for _, e in rows) if c]
+
+def new_clicks(state: dict, cutoff: datetime, db: Optional[str] = None) -> list:
+    """Clicks appended to the journal / legacy JSONL (or the SQLite store) since the last run."""
+    # Counts folded from one kind of source must not be topped up from the other
+    if any(p.startswith("sqlite:") != bool(db) or (db and p != store_key(db)) for p in state["cursors"]):
+        raise ValueError("click source changed since the last run")
+    if db:
+        seen = set()
+        clicks = _read_store(state, db, cutoff, seen)
+        state["cursors"] = {p: c for p, c in state["cursors"].items() if p in seen}
+        return clicks
+    sources = click_sources()
+    if CLICK_LOG in sources:
+        # Sample CSV only: small and rewritten by hand, so always recount it
+        reset_counts(state)
+        return load_clicks_since(cutoff)
+    clicks, seen = [], set()
+    for segment in list_segments(CLICK_JOURNAL_DIR):
+        idx = read_index(segment) or {}
+        max_ts = idx.get("max_ts")
+        if idx.get("sealed") and segment not in state["cursors"] and max_ts and parse_iso(max_ts) < cutoff:
+            continue
+        clicks.extend(_read_cursor(state, segment, cutoff, seen))
+    if CLICK_JSONL in sources:
+        clicks.extend(_read_cursor(state, CLICK_JSONL, cutoff, seen))
+    # Forget cursors of files no longer on disk (segments or the JSONL deleted by hand;
+    # the journal itself never deletes anything)
+    state["cursors"] = {p: c for p, c in state["cursors"].items() if p in seen}
+    return clicks
+
+def update_state(state: dict, cutoff: datetime, db: Optional[str] = None) -> int:
+    """Fold new clicks into `state` and expire old days. Returns clicks folded."""
+    try:
+        clicks = new_clicks(state, cutoff, db)
+    except ValueError as e:
+        print(f"[!] {e}; recounting the window")
+        reset_counts(state)
+        clicks = new_clicks(state, cutoff, db)
     for c in clicks:
-        clicks_by_user[c["user"]].append(c)
-        clicks_by_campaign[c["campaign"]] += 1
-
-    # Apply training/escalation rules
-    repeat_users = 0
-    for user, events in clicks_by_user.items():
-        events = sorted(events, key=lambda x: x["ts"])
-        count = len(events)
-        last_campaign = events[-1]["campaign"] if events else "sim-000"
-
-        if count == 1:
-            append_action(f"TRAINING_SENT user={user} campaign={last_campaign} clicks_30d={count}")
-        elif count >= 2:
-            repeat_users += 1
-            append_action(f"ESCALATED user={user} campaign={last_campaign} clicks_30d={count}")
-
-    # Write metrics summary
+        fold_click(state, c)
+    expire(state, cutoff.date().isoformat())
+    return len(clicks)
+
+def apply_actions(state: dict) -> int:
+    """Log actions for users whose level went up since the last run. Returns actions sent."""
+    sent = 0
+    levels = state["levels"]
+    for user in sorted(set(levels) | set(state["user_days"])):
+        count = sum(state["user_days"].get(user, {}).values())
+        level, previous = level_for(count), levels.get(user)
+        if level is not None and level != previous and (previous is None or level == ESCALATED):
+            campaign = state["last_click"].get(user, [None, "sim-000"])[1]
+            append_action(f"{level} user={user} campaign={campaign} clicks_30d={count}")
+            sent += 1
+        if level is None:
+            levels.pop(user, None)
+        else:
+            levels[user] = level
+    return sent
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply training/escalation rules to phishing-simulation clicks.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the saved state and recount the window (actions are re-sent)")
+    parser.add_argument("--db", default=None,
+                        help="Read clicks from this SQLite click store (server --backend sqlite) "
+                             "instead of the journal / JSONL logs")
+    add_profile_args(parser)
+    args = parser.parse_args()
+    with profile_session(args, "run-automation"):
+        run(args)
+
+def run(args) -> None:
+    ensure_paths()
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=WINDOW_DAYS)
+    state = new_state() if args.rebuild else load_state(STATE_PATH)
+    folded = update_state(state, cutoff, args.db)
+    sent = apply_actions(state)
+
+    by_user = {u: sum(days.values()) for u, days in state["user_days"].items()}
     write_metrics(
-        total_clicks=len(clicks),
-        unique_users=len(clicks_by_user),
-        repeat_users=repeat_users,
-        by_campaign=dict(clicks_by_campaign)
+        total_clicks=sum(by_user.values()),
+        unique_users=len(by_user),
+        repeat_users=sum(1 for n in by_user.values() if n >= 2),
+        by_campaign={c: sum(days.values()) for c, days in state["campaign_days"].items()},
     )
+    save_state(STATE_PATH, state)
 
-    # Log summary paths
-    log_src = CLICK_JSONL if os.path.exists(CLICK_JSONL) else CLICK_LOG
     print("[+] Automation run complete")
-    print(f"[+] Read clicks from:  {log_src}")
+    print(f"[+] Read clicks from:  {', '.join(click_sources(args.db)) or '(no click logs found)'}")
+    print(f"[+] New clicks folded: {folded}, actions sent: {sent}")
     print(f"[+] Wrote actions to:  {ACTIONS_LOG}")
     print(f"[+] Wrote metrics to:  {METRICS_CSV}")
+    print(f"[+] State saved to:    {STATE_PATH}")
 
 if __name__ == "__main__":
     main()
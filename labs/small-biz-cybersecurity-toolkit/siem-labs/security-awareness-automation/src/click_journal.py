@@ -0,0 +1,375 @@
+"""Rotating, crash-safe journal for click events.
+
+Click events are appended to numbered JSONL segments in a journal directory:
+
+    evidence/logs/click-journal/
+        clicks-000001.jsonl      sealed segment
+        clicks-000001.idx.json   {"min_ts", "max_ts", "count", "bytes", "sealed": true}
+        clicks-000002.jsonl      active segment
+        clicks-000002.idx.json   updated after every committed batch
+
+- A batch is serialized first and written with one write() call, so lines
+  from different batches never interleave.
+- The fsync policy decides durability: "always" (fsync every batch),
+  "interval" (group commit: fsync at most every N seconds) or "never".
+  Under "interval" the writer also calls sync() when idle, so the last batch
+  before a quiet spell is not left unsynced until the next click.
+- On open, a torn last line of the active segment (crash mid-write) is
+  truncated and the segment's sidecar index is rebuilt from its content.
+- Segments rotate by size or age; readers use the sidecar min/max timestamps
+  to skip whole sealed segments outside their time window.
+- Within a file, readers binary-search the (append-ordered) timestamps to
+  seek straight to their window, and reject older lines by comparing the raw
+  timestamp prefix before paying for json.loads().
+
+Used by the landing page server (writer) and run_automation.py (reader).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+SEGMENT_RE = re.compile(r"^clicks-(\d{6})\.jsonl$")
+FSYNC_POLICIES = ("always", "interval", "never")
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 24 * 3600
+DEFAULT_FSYNC = "interval"
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+# Clicks are stamped in request threads and queued, so a file is only *nearly*
+# time-ordered; seeks land this far before the requested time to be safe.
+SEEK_SKEW_SECONDS = 60
+TS_RE = re.compile(rb'"timestamp_utc":\s*"([^"]+)"')
+
+
+def segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"clicks-{number:06d}.jsonl")
+
+
+def index_path(segment: str) -> str:
+    return segment[: -len(".jsonl")] + ".idx.json"
+
+
+def list_segments(directory: str) -> list:
+    """Segment paths in write order."""
+    if not os.path.isdir(directory):
+        return []
+    numbered = []
+    for name in os.listdir(directory):
+        m = SEGMENT_RE.match(name)
+        if m:
+            numbered.append((int(m.group(1)), os.path.join(directory, name)))
+    return [p for _, p in sorted(numbered)]
+
+
+def read_index(segment: str) -> Optional[dict]:
+    try:
+        with open(index_path(segment), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(segment: str, index: dict) -> None:
+    """Replace the sidecar atomically (never leaves a half-written index)."""
+    path = index_path(segment)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+def _parse_ts(ts: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scan_segment(segment: str) -> dict:
+    """Rebuild a sidecar index from segment content."""
+    index = {"min_ts": None, "max_ts": None, "count": 0, "bytes": 0, "sealed": False,
+             "created": os.path.getmtime(segment)}
+    lo = hi = None
+    with open(segment, "rb") as f:
+        for raw in f:
+            index["bytes"] += len(raw)
+            try:
+                ts = _parse_ts(json.loads(raw).get("timestamp_utc"))
+            except ValueError:
+                continue
+            index["count"] += 1
+            if ts is not None:
+                lo = ts if lo is None or ts < lo else lo
+                hi = ts if hi is None or ts > hi else hi
+    index["min_ts"] = lo.isoformat() if lo else None
+    index["max_ts"] = hi.isoformat() if hi else None
+    return index
+
+
+class ClickJournal:
+    """Append-only writer over rotating segments. Thread-safe."""
+
+    def __init__(self, directory: str,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+                 fsync: str = DEFAULT_FSYNC,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment = None
+        self._index: dict = {}
+        self._lo = self._hi = None
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        os.makedirs(directory, exist_ok=True)
+        self._open_active()
+
+    # -- segment management -------------------------------------------------
+    def _open_active(self) -> None:
+        segments = list_segments(self.directory)
+        if segments:
+            last = segments[-1]
+            idx = read_index(last)
+            if not (idx and idx.get("sealed")):
+                self._recover(last)
+                self._attach(last)
+                return
+            number = int(SEGMENT_RE.match(os.path.basename(last)).group(1)) + 1
+        else:
+            number = 1
+        self._attach(segment_path(self.directory, number))
+
+    def _recover(self, segment: str) -> None:
+        """Drop a torn trailing line left by a crash mid-write."""
+        with open(segment, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                keep = data.rfind(b"\n") + 1
+                f.truncate(keep)
+
+    def _attach(self, segment: str) -> None:
+        exists = os.path.exists(segment)
+        self._segment = segment
+        self._file = open(segment, "ab")
+        if exists:
+            self._index = _scan_segment(segment)
+            created = (read_index(segment) or {}).get("created")
+            if created is not None:
+                self._index["created"] = created
+        else:
+            self._index = {"min_ts": None, "max_ts": None, "count": 0, "bytes": 0,
+                           "sealed": False, "created": time.time()}
+        self._lo = _parse_ts(self._index["min_ts"]) if self._index["min_ts"] else None
+        self._hi = _parse_ts(self._index["max_ts"]) if self._index["max_ts"] else None
+        write_index(segment, self._index)
+
+    def _should_rotate(self) -> bool:
+        if self._index["count"] == 0:
+            return False
+        too_big = self._index["bytes"] >= self.max_bytes
+        too_old = time.time() - self._index["created"] >= self.max_age_seconds
+        return too_big or too_old
+
+    def _seal(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._index["sealed"] = True
+        write_index(self._segment, self._index)
+
+    def _rotate(self) -> None:
+        self._seal()
+        number = int(SEGMENT_RE.match(os.path.basename(self._segment)).group(1)) + 1
+        self._attach(segment_path(self.directory, number))
+
+    # -- writing ------------------------------------------------------------
+    def append_batch(self, events: Iterable[dict]) -> int:
+        """Commit a batch of events with a single write. Returns the count written."""
+        lines = []
+        batch_lo = batch_hi = None
+        for event in events:
+            lines.append(json.dumps(event, separators=(",", ":")) + "\n")
+            ts = _parse_ts(event.get("timestamp_utc"))
+            if ts is not None:
+                batch_lo = ts if batch_lo is None or ts < batch_lo else batch_lo
+                batch_hi = ts if batch_hi is None or ts > batch_hi else batch_hi
+        if not lines:
+            return 0
+        payload = "".join(lines).encode("utf-8")
+
+        with self._lock:
+            if self._should_rotate():
+                self._rotate()
+            self._file.write(payload)
+            self._file.flush()
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self._last_sync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+                self._unsynced = False
+            else:
+                self._unsynced = True
+            if batch_lo is not None:
+                self._lo = batch_lo if self._lo is None else min(self._lo, batch_lo)
+                self._hi = batch_hi if self._hi is None else max(self._hi, batch_hi)
+            self._index.update(
+                min_ts=self._lo.isoformat() if self._lo else None,
+                max_ts=self._hi.isoformat() if self._hi else None,
+                count=self._index["count"] + len(lines),
+                bytes=self._index["bytes"] + len(payload),
+            )
+            write_index(self._segment, self._index)
+        return len(lines)
+
+    def append(self, event: dict) -> None:
+        self.append_batch([event])
+
+    def sync(self) -> bool:
+        """fsync batches the interval policy has held back once the interval has passed.
+
+        Meant to be called periodically (the click writer does so when its queue
+        is idle). Returns True when an fsync was issued.
+        """
+        with self._lock:
+            if not self._unsynced or self._file is None or self._file.closed:
+                return False
+            now = time.monotonic()
+            if now - self._last_sync < self.fsync_interval:
+                return False
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+            self._unsynced = False
+            return True
+
+    def close(self) -> None:
+        """Flush and fsync the active segment (it stays open for the next run)."""
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                write_index(self._segment, self._index)
+
+
+def _line_start(f, pos: int) -> int:
+    """Offset of the first line starting at or after `pos`."""
+    if pos == 0:
+        return 0
+    f.seek(pos - 1)
+    f.readline()
+    return f.tell()
+
+
+def _first_ts(f, start: int) -> Optional[datetime]:
+    """Timestamp of the first timestamped line at or after `start`."""
+    f.seek(start)
+    for line in iter(f.readline, b""):
+        m = TS_RE.search(line)
+        ts = _parse_ts(m.group(1).decode("ascii", "replace")) if m else None
+        if ts is not None:
+            return ts
+    return None
+
+
+def seek_since(f, since: datetime, skew_seconds: float = SEEK_SKEW_SECONDS) -> int:
+    """Binary-search an append-ordered JSONL file (opened "rb") by timestamp.
+
+    Returns the offset of the first line stamped at or after
+    `since - skew_seconds`; O(log size) seeks instead of a full scan.
+    """
+    target = since - timedelta(seconds=skew_seconds)
+    f.seek(0, os.SEEK_END)
+    lo, hi = 0, f.tell()
+    while lo < hi:
+        mid = (lo + hi) // 2
+        ts = _first_ts(f, _line_start(f, mid))
+        if ts is None or ts >= target:
+            hi = mid
+        else:
+            lo = mid + 1
+    return _line_start(f, lo)
+
+
+def iter_file(path: str, since: Optional[datetime] = None) -> Iterator[dict]:
+    """Yield events from one JSONL file, seeking past everything before `since`.
+
+    Lines whose UTC timestamp is older than `since` (to the second) are
+    dropped on the raw bytes, without decoding them. A few events from just
+    before `since` may still be yielded; callers apply the exact cutoff.
+    """
+    prefix = settled = None
+    if since is not None:
+        utc = since.astimezone(timezone.utc)
+        prefix = utc.isoformat()[:19].encode("ascii")
+        # Past since + skew the file is in order: stop checking lines
+        settled = (utc + timedelta(seconds=SEEK_SKEW_SECONDS)).isoformat()[:19].encode("ascii")
+    with open(path, "rb") as f:
+        if since is not None:
+            f.seek(seek_since(f, since))
+        for line in f:
+            if prefix is not None:
+                m = TS_RE.search(line)
+                raw = m.group(1) if m else b""
+                if raw.endswith(b"+00:00") or raw.endswith(b"Z"):
+                    if raw[:19] < prefix:
+                        continue
+                    if raw[:19] >= settled:
+                        prefix = None
+            try:
+                yield json.loads(line.decode("utf-8"))  # str decodes faster than bytes
+            except ValueError:
+                continue  # blank line or torn tail of a segment still being written
+
+
+def read_from(path: str, offset: int = 0, since: Optional[datetime] = None) -> tuple:
+    """Events in the complete lines after byte `offset` -> (events, new_offset).
+
+    For resumable readers: the returned offset stops before a torn last line,
+    so a partially written event is picked up whole on the next call. With
+    offset 0 and `since`, the read starts at seek_since() instead.
+    """
+    events = []
+    with open(path, "rb") as f:
+        if offset == 0 and since is not None:
+            offset = seek_since(f, since)
+        f.seek(offset)
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                events.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                continue
+    return events, offset
+
+
+def iter_events(directory: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Iterator[dict]:
+    """Yield journal events, skipping sealed segments entirely outside [since, until)."""
+    for segment in list_segments(directory):
+        idx = read_index(segment)
+        if idx and idx.get("sealed"):
+            hi = _parse_ts(idx.get("max_ts")) if idx.get("max_ts") else None
+            lo = _parse_ts(idx.get("min_ts")) if idx.get("min_ts") else None
+            if since is not None and hi is not None and hi < since:
+                continue
+            if until is not None and lo is not None and lo >= until:
+                continue
+            if since is not None and lo is not None and lo >= since:
+                yield from iter_file(segment)
+                continue
+        yield from iter_file(segment, since)
@@ -0,0 +1,356 @@
+"""SQLite click store and campaign metrics for multi-tenant simulations.
+
+One database holds clicks for every client org running a simulation:
+
+    clicks(org, campaign, user, ts, timestamp_utc, client_ip, user_agent, path)
+        idx_clicks_campaign_ts  (org, campaign, ts)   per-campaign metrics
+        idx_clicks_user_ts      (org, user, ts)       per-user / repeat-clicker queries
+    campaigns(org, campaign, sent_at, recipients)     send time + audience size
+    imports(path, offset, head, head_len)             JSONL migration cursors
+
+- WAL mode: the landing page server commits batches while reports read.
+- ClickStore.append_batch() has the same contract as ClickJournal's, so the
+  server's background writer can commit to either (--backend sqlite).
+- Metrics are answered from the indexes: click-through per campaign,
+  time-to-first-click distribution, repeat clickers in a window.
+
+Usage:
+    python src/click_store.py migrate                       # journal + click-events.jsonl
+    python src/click_store.py campaign --org acme --campaign sim-001 \\
+        --sent-at 2026-02-06T03:00:00+00:00 --recipients 250
+    python src/click_store.py ctr --org acme
+    python src/click_store.py time-to-click --org acme --campaign sim-001
+    python src/click_store.py repeat --org acme --days 30
+"""
+
+import argparse
+import csv
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from click_journal import list_segments, read_from
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LOG_DIR = os.path.join(PROJECT_ROOT, "evidence", "logs")
+DB_PATH = os.path.join(LOG_DIR, "clicks.sqlite")
+JOURNAL_DIR = os.path.join(LOG_DIR, "click-journal")
+LEGACY_JSONL = os.path.join(LOG_DIR, "click-events.jsonl")
+
+DEFAULT_ORG = "default"
+HEAD_BYTES = 4096
+# Upper bounds (seconds) of the time-to-click histogram buckets
+TTC_BUCKETS = (60, 300, 900, 3600, 4 * 3600, 24 * 3600, 7 * 24 * 3600)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clicks (
+    id INTEGER PRIMARY KEY,
+    org TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    user TEXT NOT NULL,
+    ts REAL NOT NULL,
+    timestamp_utc TEXT NOT NULL,
+    client_ip TEXT,
+    user_agent TEXT,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clicks_campaign_ts ON clicks(org, campaign, ts);
+CREATE INDEX IF NOT EXISTS idx_clicks_user_ts ON clicks(org, user, ts);
+CREATE TABLE IF NOT EXISTS campaigns (
+    org TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    sent_at REAL,
+    recipients INTEGER,
+    PRIMARY KEY (org, campaign)
+);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    head TEXT NOT NULL,
+    head_len INTEGER
+);
+"""
+
+INSERT_CLICK = ("INSERT INTO clicks (org, campaign, user, ts, timestamp_utc, client_ip, user_agent, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def _epoch(ts: str) -> Optional[float]:
+    try:
+        dt = datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def _head(path: str, length: int) -> str:
+    """Hash of the first `length` bytes of a file, to notice it was replaced since the last import."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def click_row(event: dict) -> Optional[tuple]:
+    """Click event dict (server / JSONL schema) -> clicks row, or None if it has no usable timestamp."""
+    ts_str = event.get("timestamp_utc")
+    ts = _epoch(ts_str)
+    if ts is None:
+        return None
+    return (
+        event.get("org") or DEFAULT_ORG,
+        event.get("campaign") or "sim-000",
+        event.get("user") or "unknown",
+        ts,
+        ts_str,
+        event.get("client_ip"),
+        event.get("user_agent"),
+        event.get("path"),
+    )
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (rank = ceil(pct/100 * n))."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ClickStore:
+    """SQLite-backed click storage. One connection, serialized by a lock (thread-safe)."""
+
+    def __init__(self, path: str = DB_PATH) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a commit survives an application crash; only an OS
+        # crash can lose the last transactions (same trade-off as fsync=interval)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(imports)")}
+        if "head_len" not in columns:  # databases created before head_len was recorded
+            self._conn.execute("ALTER TABLE imports ADD COLUMN head_len INTEGER")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- writing ------------------------------------------------------------
+    def append_batch(self, events: Iterable[dict]) -> int:
+        """Insert a batch of click events in one transaction. Returns the count written."""
+        rows = [r for r in map(click_row, events) if r is not None]
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(INSERT_CLICK, rows)
+        return len(rows)
+
+    def append(self, event: dict) -> None:
+        self.append_batch([event])
+
+    def set_campaign(self, org: str, campaign: str, sent_at: Optional[str] = None,
+                     recipients: Optional[int] = None) -> None:
+        """Record (or update) when a campaign was sent and to how many recipients."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO campaigns (org, campaign, sent_at, recipients) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(org, campaign) DO UPDATE SET "
+                "sent_at = COALESCE(excluded.sent_at, sent_at), "
+                "recipients = COALESCE(excluded.recipients, recipients)",
+                (org, campaign, _epoch(sent_at) if sent_at else None, recipients),
+            )
+
+    def import_jsonl(self, path: str, batch_size: int = 5000) -> int:
+        """Import clicks appended to a JSONL file since its last import. Returns rows inserted."""
+        size = os.path.getsize(path)
+        with self._lock:
+            row = self._conn.execute("SELECT offset, head, head_len FROM imports WHERE path = ?",
+                                     (path,)).fetchone()
+        # Hash the same prefix as last time, so a segment that has grown since is still recognised
+        unchanged = (row is not None and row[0] <= size
+                     and _head(path, HEAD_BYTES if row[2] is None else row[2]) == row[1])
+        offset = row[0] if unchanged else 0
+        if row is not None and not unchanged:
+            print(f"[!] {path} changed since its last import; importing it again from the start")
+        events, offset = read_from(path, offset)
+        inserted = 0
+        for i in range(0, len(events), batch_size):
+            inserted += self.append_batch(events[i:i + batch_size])
+        head_len = min(offset, HEAD_BYTES)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO imports (path, offset, head, head_len) VALUES (?, ?, ?, ?)",
+                               (path, offset, _head(path, head_len), head_len))
+        return inserted
+
+    def migrate(self, journal_dir: str = JOURNAL_DIR, legacy_jsonl: str = LEGACY_JSONL) -> dict:
+        """Import the click journal and legacy JSONL. Re-running only picks up new lines."""
+        counts = {}
+        for path in list_segments(journal_dir) + ([legacy_jsonl] if os.path.exists(legacy_jsonl) else []):
+            counts[path] = self.import_jsonl(path)
+        return counts
+
+    # -- metrics ------------------------------------------------------------
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def campaign_ctr(self, org: Optional[str] = None) -> list:
+        """Per-campaign clicks, unique clickers and click-through rate.
+
+        Returns [{org, campaign, recipients, clicks, unique_clickers, ctr}];
+        ctr is None when the campaign's recipient count is unknown.
+        """
+        sql = ("SELECT c.org, c.campaign, COUNT(*), COUNT(DISTINCT c.user), k.recipients "
+               "FROM clicks c LEFT JOIN campaigns k ON k.org = c.org AND k.campaign = c.campaign ")
+        params: tuple = ()
+        if org is not None:
+            sql += "WHERE c.org = ? "
+            params = (org,)
+        sql += "GROUP BY c.org, c.campaign ORDER BY c.org, c.campaign"
+        out = []
+        for o, campaign, clicks, unique, recipients in self._query(sql, params):
+            out.append({
+                "org": o, "campaign": campaign, "recipients": recipients, "clicks": clicks,
+                "unique_clickers": unique,
+                "ctr": round(unique / recipients, 4) if recipients else None,
+            })
+        return out
+
+    def time_to_click(self, org: str, campaign: str, buckets: tuple = TTC_BUCKETS) -> dict:
+        """Distribution of seconds from send to each user's first click.
+
+        Uses the campaign's recorded sent_at, else its earliest click.
+        """
+        row = self._query("SELECT sent_at FROM campaigns WHERE org = ? AND campaign = ?", (org, campaign))
+        sent_at = row[0][0] if row and row[0][0] is not None else None
+        firsts = [r[0] for r in self._query(
+            "SELECT MIN(ts) FROM clicks WHERE org = ? AND campaign = ? GROUP BY user", (org, campaign))]
+        if not firsts:
+            return {"org": org, "campaign": campaign, "sent_at": None, "users": 0, "histogram": []}
+        if sent_at is None:
+            sent_at = min(firsts)
+        delays = sorted(max(0.0, t - sent_at) for t in firsts)
+
+        histogram, lower, i = [], 0, 0
+        for upper in tuple(buckets) + (None,):
+            n = 0
+            while i < len(delays) and (upper is None or delays[i] < upper):
+                n += 1
+                i += 1
+            histogram.append({"from_s": lower, "to_s": upper, "users": n})
+            lower = upper
+        return {
+            "org": org, "campaign": campaign, "sent_at": _iso(sent_at), "users": len(delays),
+            "p50_s": percentile(delays, 50), "p90_s": percentile(delays, 90), "max_s": delays[-1],
+            "histogram": histogram,
+        }
+
+    def clicks_after(self, last_id: int = 0, since: Optional[datetime] = None) -> list:
+        """Clicks inserted after row `last_id` (and at or after `since`) as [(id, event dict)], in insert order."""
+        sql = "SELECT id, org, campaign, user, timestamp_utc FROM clicks WHERE id > ? "
+        params: tuple = (last_id,)
+        if since is not None:
+            sql += "AND ts >= ? "
+            params += (since.timestamp(),)
+        return [(i, {"org": o, "campaign": c, "user": u, "timestamp_utc": t})
+                for i, o, c, u, t in self._query(sql + "ORDER BY id", params)]
+
+    def max_id(self) -> int:
+        return self._query("SELECT COALESCE(MAX(id), 0) FROM clicks")[0][0]
+
+    def repeat_clickers(self, org: str, since: datetime, min_clicks: int = 2) -> list:
+        """Users with at least `min_clicks` clicks since `since`: [{user, clicks, campaigns, first, last}]."""
+        rows = self._query(
+            "SELECT user, COUNT(*), COUNT(DISTINCT campaign), MIN(ts), MAX(ts) FROM clicks "
+            "WHERE org = ? AND ts >= ? GROUP BY user HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC, user",
+            (org, since.timestamp(), min_clicks))
+        return [{"user": u, "clicks": n, "campaigns": c, "first": _iso(lo), "last": _iso(hi)}
+                for u, n, c, lo, hi in rows]
+
+
+def emit(rows: list, as_csv: bool) -> None:
+    if not rows:
+        print("(no rows)")
+        return
+    if as_csv:
+        w = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+        return
+    for row in rows:
+        print("  " + "  ".join(f"{k}={v}" for k, v in row.items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite click store and campaign metrics.")
+    parser.add_argument("--db", default=DB_PATH, help=f"Database path (default: {DB_PATH})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("migrate", help="Import the click journal and click-events.jsonl (incremental)")
+
+    camp = sub.add_parser("campaign", help="Record a campaign's send time and recipient count")
+    camp.add_argument("--org", default=DEFAULT_ORG)
+    camp.add_argument("--campaign", required=True)
+    camp.add_argument("--sent-at", help="ISO timestamp, e.g. 2026-02-06T03:00:00+00:00")
+    camp.add_argument("--recipients", type=int)
+
+    ctr = sub.add_parser("ctr", help="Click-through per campaign")
+    ctr.add_argument("--org")
+    ctr.add_argument("--csv", action="store_true")
+
+    ttc = sub.add_parser("time-to-click", help="Send-to-first-click distribution for one campaign")
+    ttc.add_argument("--org", default=DEFAULT_ORG)
+    ttc.add_argument("--campaign", required=True)
+
+    rep = sub.add_parser("repeat", help="Users who clicked repeatedly in a window")
+    rep.add_argument("--org", default=DEFAULT_ORG)
+    rep.add_argument("--days", type=int, default=30)
+    rep.add_argument("--min-clicks", type=int, default=2)
+    rep.add_argument("--csv", action="store_true")
+
+    args = parser.parse_args()
+    store = ClickStore(args.db)
+    try:
+        if args.cmd == "migrate":
+            start = time.perf_counter()
+            counts = store.migrate()
+            for path, n in counts.items():
+                print(f"  - {os.path.relpath(path, PROJECT_ROOT)}: {n} new clicks")
+            print(f"[+] Imported {sum(counts.values())} clicks into {args.db} in {time.perf_counter() - start:.2f}s")
+        elif args.cmd == "campaign":
+            store.set_campaign(args.org, args.campaign, args.sent_at, args.recipients)
+            print(f"[+] Recorded {args.org}/{args.campaign}")
+        elif args.cmd == "ctr":
+            emit(store.campaign_ctr(args.org), args.csv)
+        elif args.cmd == "time-to-click":
+            result = store.time_to_click(args.org, args.campaign)
+            if not result["users"]:
+                print("(no clicks)")
+                return
+            print(f"[+] {result['users']} users, sent {result['sent_at']}, "
+                  f"p50={result['p50_s']:.0f}s p90={result['p90_s']:.0f}s max={result['max_s']:.0f}s")
+            for b in result["histogram"]:
+                span = f"{b['from_s']}-{b['to_s']}s" if b["to_s"] is not None else f">= {b['from_s']}s"
+                print(f"  {span:>14}: {b['users']}")
+        else:
+            since = datetime.now(timezone.utc) - timedelta(days=args.days)
+            emit(store.repeat_clickers(args.org, since, args.min_clicks), args.csv)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Load test for the landing page server.
+
+Simulates a campaign email landing in many inboxes at once: N concurrent
+clients hit /click with distinct users and the script reports throughput and
+request latency percentiles.
+
+Usage:
+    python src/landing-page/server.py                    # in another terminal
+    python src/landing-page/load_test.py --requests 2000 --concurrency 100
+"""
+
+import argparse
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from click_store import percentile  # noqa: E402
+
+
+def hit(url: str, timeout: float) -> tuple:
+    """Perform one GET. Returns (latency_seconds, ok)."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent click load test for the landing page server.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000, help="Total clicks to send (default: 2000)")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients (default: 100)")
+    parser.add_argument("--campaign", default="load-test")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    urls = [f"{args.base_url}/click?user=user{i:05d}&campaign={args.campaign}" for i in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda u: hit(u, args.timeout), urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(lat for lat, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+
+    print(f"[+] {args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s total")
+    print(f"[+] Throughput: {args.requests / elapsed:,.0f} req/s, errors: {errors}")
+    if latencies:
+        print("[+] Latency (ms): "
+              + "  ".join(f"p{p}={percentile(latencies, p) * 1000:.1f}" for p in (50, 90, 95, 99))
+              + f"  max={latencies[-1] * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime, timezone
+import argparse
 import os
 import json
+import queue
+import signal
+import sys
+import threading
+import time
 
 # Base paths for the landing page server. BASE_DIR is the directory of this file,
 # PROJECT_ROOT is two levels up (so that ``evidence`` sits alongside ``src``),
@@ -14,6 +20,20 @@ CLICK_LOG_PATH = os.path.join(LOG_DIR, "click-events.csv")
 # Path for the SIEM report; JSON Lines is a common SIEM ingestion format
 SIEM_REPORT_PATH = os.path.join(LOG_DIR, "click-events.jsonl")
 INDEX_PATH = os.path.join(BASE_DIR, "index.html")
+# Rotating click journal (segments + sidecar indexes), see src/click_journal.py
+JOURNAL_DIR = os.path.join(LOG_DIR, "click-journal")
+
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from click_journal import ClickJournal, FSYNC_POLICIES, DEFAULT_FSYNC  # noqa: E402
+from click_store import ClickStore, DB_PATH  # noqa: E402
+
+# Click writer defaults: flush at least this often, or as soon as this many
+# events are waiting.
+FLUSH_INTERVAL_SECONDS = 0.5
+FLUSH_BATCH_SIZE = 500
+# A batch the sink rejects is retried this many times (backing off by the flush
+# interval) before it is appended to the legacy JSONL log instead
+WRITE_ATTEMPTS = 3
 
 def ensure_log_file() -> None:
     """Ensure the log directory and output files exist.
@@ -30,23 +50,173 @@ def ensure_log_file() -> None:
     if not os.path.exists(SIEM_REPORT_PATH):
         open(SIEM_REPORT_PATH, "a", encoding="utf-8").close()
 
-def append_click_event(user: str, campaign: str, client_ip: str, user_agent: str, path: str) -> None:
-    """Append a click event to the SIEM report (JSON Lines)."""
-    ensure_log_file()
-    ts = datetime.now(timezone.utc).isoformat()
-    event = {
-        "timestamp_utc": ts,
+def make_click_event(user: str, campaign: str, client_ip: str, user_agent: str, path: str,
+                     org: str = "default") -> dict:
+    """Build a click event stamped with the current UTC time."""
+    return {
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        "org": org,
         "user": user,
         "campaign": campaign,
         "client_ip": client_ip,
         "user_agent": user_agent,
         "path": path,
     }
+
+def append_click_event(user: str, campaign: str, client_ip: str, user_agent: str, path: str,
+                       org: str = "default") -> None:
+    """Append a click event to the SIEM report (JSON Lines)."""
+    ensure_log_file()
+    event = make_click_event(user, campaign, client_ip, user_agent, path, org)
     # Write event as a JSON object on its own line. This format is ingestible by many SIEMs.
     with open(SIEM_REPORT_PATH, "a", encoding="utf-8") as f_jsonl:
         json.dump(event, f_jsonl)
         f_jsonl.write("\n")
 
+def append_events_jsonl(events: list) -> None:
+    """Append already-built click events to the SIEM report (JSON Lines) in one write."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(SIEM_REPORT_PATH, "a", encoding="utf-8") as f_jsonl:
+        f_jsonl.write("".join(json.dumps(e) + "\n" for e in events))
+
+class ClickWriter:
+    """Single background writer for click events.
+
+    Request threads only enqueue; one thread drains the queue and commits whole
+    batches to the sink (one journal write or one SQLite transaction per
+    batch), so concurrent clicks never interleave and nothing is reopened per click.
+
+    A failing sink (disk full, permissions) does not stop the writer: the batch
+    is retried, then appended to the legacy JSONL log, and only dropped (and
+    counted) if that fails too. stats() feeds /healthz.
+    """
+
+    def __init__(self, sink: "ClickJournal | ClickStore",
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = FLUSH_BATCH_SIZE) -> None:
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[dict | None]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="click-writer", daemon=True)
+        self.written = 0
+        self.failures = 0
+        self.fallback = 0
+        self.dropped = 0
+        self.last_error: "str | None" = None
+        self.healthy = True
+
+    def start(self) -> "ClickWriter":
+        self._thread.start()
+        return self
+
+    def submit(self, event: dict) -> None:
+        self._queue.put(event)
+
+    def close(self) -> None:
+        """Flush everything still queued, stop the writer thread and close the sink."""
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._idle_sync()
+                continue
+            # Drain whatever else is already waiting, up to one batch
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = item is None
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self.written += self.sink.append_batch(batch)
+                self.healthy = True
+                return
+            except Exception as e:
+                self.failures += 1
+                self.healthy = False
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[!] Click writer: {self.last_error} (attempt {attempt}/{WRITE_ATTEMPTS}, "
+                      f"{len(batch)} clicks)", file=sys.stderr)
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(self.flush_interval * attempt)
+        try:
+            append_events_jsonl(batch)
+            self.fallback += len(batch)
+            print(f"[!] Click writer: wrote {len(batch)} clicks to {SIEM_REPORT_PATH} instead", file=sys.stderr)
+        except OSError as e:
+            self.dropped += len(batch)
+            print(f"[!] Click writer: dropped {len(batch)} clicks ({type(e).__name__}: {e})", file=sys.stderr)
+
+    def _idle_sync(self) -> None:
+        # Interval fsync only runs on append; give a quiet journal its timed sync
+        sync = getattr(self.sink, "sync", None)
+        if sync is None:
+            return
+        try:
+            sync()
+        except OSError as e:
+            self.failures += 1
+            self.healthy = False
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[!] Click writer: sync failed ({self.last_error})", file=sys.stderr)
+
+    def stats(self) -> dict:
+        return {
+            "status": "ok" if self.healthy else "degraded",
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "write_failures": self.failures,
+            "written_to_fallback": self.fallback,
+            "dropped": self.dropped,
+            "last_error": self.last_error,
+        }
+
+class PageCache:
+    """Keep a file's bytes in memory; reload only when its mtime/size change."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._key = None
+        self._data = b""
+
+    def get(self) -> bytes:
+        st = os.stat(self.path)  # raises FileNotFoundError like open() did
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    with open(self.path, "rb") as f:
+                        self._data = f.read()
+                    self._key = key
+        return self._data
+
+class LandingPageServer(ThreadingHTTPServer):
+    """Thread-per-request server with a listen backlog sized for click bursts."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+# Set by main(); when None the handler falls back to direct appends
+CLICK_WRITER: "ClickWriter | None" = None
+PAGE_CACHE = PageCache(INDEX_PATH)
+
 class Handler(BaseHTTPRequestHandler):
     """Simple HTTP handler that serves a landing page and logs click events."""
 
@@ -59,26 +229,42 @@ class Handler(BaseHTTPRequestHandler):
             self._serve_file(INDEX_PATH, content_type="text/html; charset=utf-8")
             return
 
-        # Handle click events. The query string may include ``user`` and ``campaign``.
+        # Handle click events. The query string may include ``user``, ``campaign`` and ``org``.
         if parsed.path == "/click":
             user = (qs.get("user", ["unknown"])[0] or "unknown").strip()
             campaign = (qs.get("campaign", ["sim-000"])[0] or "sim-000").strip()
+            org = (qs.get("org", ["default"])[0] or "default").strip()
 
             client_ip = self.client_address[0]
             user_agent = self.headers.get("User-Agent", "unknown")
 
-            append_click_event(
-                user=user,
-                campaign=campaign,
-                client_ip=client_ip,
-                user_agent=user_agent,
-                path=self.path,
-            )
+            if CLICK_WRITER is not None:
+                CLICK_WRITER.submit(make_click_event(user, campaign, client_ip, user_agent, self.path, org))
+            else:
+                append_click_event(
+                    user=user,
+                    campaign=campaign,
+                    client_ip=client_ip,
+                    user_agent=user_agent,
+                    path=self.path,
+                    org=org,
+                )
 
             # After logging, display the same landing page to the visitor
             self._serve_file(INDEX_PATH, content_type="text/html; charset=utf-8")
             return
 
+        # Writer health: 503 while the click sink is failing
+        if parsed.path == "/healthz":
+            stats = CLICK_WRITER.stats() if CLICK_WRITER is not None else {"status": "ok", "writer": None}
+            body = json.dumps(stats).encode("utf-8")
+            self.send_response(200 if stats["status"] == "ok" else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
         # Fallback: return a 404 for any other paths
         self.send_response(404)
         self.send_header("Content-Type", "text/plain; charset=utf-8")
@@ -86,10 +272,13 @@ class Handler(BaseHTTPRequestHandler):
         self.wfile.write(b"Not found")
 
     def _serve_file(self, filepath: str, content_type: str) -> None:
-        """Helper to read a file from disk and send it as the HTTP response."""
+        """Helper to send a file as the HTTP response (landing page is cached in memory)."""
         try:
-            with open(filepath, "rb") as f:
-                data = f.read()
+            if filepath == PAGE_CACHE.path:
+                data = PAGE_CACHE.get()
+            else:
+                with open(filepath, "rb") as f:
+                    data = f.read()
             self.send_response(200)
             self.send_header("Content-Type", content_type)
             self.send_header("Content-Length", str(len(data)))
@@ -101,15 +290,63 @@ class Handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(b"Server misconfigured: file missing")
 
+def _raise_interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
 def main() -> None:
     """Start the HTTP server and print useful information to stdout."""
+    global CLICK_WRITER
+    parser = argparse.ArgumentParser(description="Phishing-simulation landing page + click logger.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--single-threaded", action="store_true",
+                        help="Use the original HTTPServer with a synchronous append per click")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL_SECONDS,
+                        help=f"Max seconds a click waits before being written (default: {FLUSH_INTERVAL_SECONDS})")
+    parser.add_argument("--backend", choices=("journal", "sqlite"), default="journal",
+                        help="Where the click writer commits batches (default: journal)")
+    parser.add_argument("--db", default=DB_PATH, help=f"SQLite database for --backend sqlite (default: {DB_PATH})")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=DEFAULT_FSYNC,
+                        help=f"Journal durability: fsync every batch, at most once per second, or never (default: {DEFAULT_FSYNC})")
+    parser.add_argument("--segment-mb", type=float, default=16.0, help="Rotate journal segments at this size (default: 16)")
+    parser.add_argument("--segment-hours", type=float, default=24.0, help="Rotate journal segments after this age (default: 24)")
+    args = parser.parse_args()
+
     ensure_log_file()
-    host = "127.0.0.1"
-    port = 8000
+    host, port = args.host, args.port
     print(f"[+] Landing page running: http://{host}:{port}/")
     print(f"[+] Click endpoint:       http://{host}:{port}/click?user=user01&campaign=sim-001")
-    print(f"[+] Logging to:           {CLICK_LOG_PATH}")
-    HTTPServer((host, port), Handler).serve_forever()
+
+    if args.single_threaded:
+        print(f"[+] Logging to:           {SIEM_REPORT_PATH}")
+        HTTPServer((host, port), Handler).serve_forever()
+        return
+
+    if args.backend == "sqlite":
+        print(f"[+] Logging to:           {args.db}")
+        # Clicks go only to SQLite; the journal-based automation run would see none
+        print(f"[!] Run automation with:  python src/automation/run_automation.py --db {args.db}")
+        sink = ClickStore(args.db)
+    else:
+        print(f"[+] Logging to:           {JOURNAL_DIR}")
+        sink = ClickJournal(
+            JOURNAL_DIR,
+            max_bytes=int(args.segment_mb * 1024 * 1024),
+            max_age_seconds=args.segment_hours * 3600,
+            fsync=args.fsync,
+        )
+    CLICK_WRITER = ClickWriter(sink, flush_interval=args.flush_interval).start()
+    server = LandingPageServer((host, port), Handler)
+    # Treat SIGTERM like Ctrl+C so queued clicks are flushed on shutdown
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        CLICK_WRITER.close()
+        print(f"[+] Flushed click log ({CLICK_WRITER.written} events this run)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+"""
+Columnar on-disk store for parsed logon events.
+
+Layout of a store directory:
+  manifest.json      row count, column types, format version
+  ts.i64             event time (UTC epoch seconds; UNDATED_TS if the event had none)
+  event_id.u16       4624 / 4625
+  account.u32        dictionary code -> dict_account.json
+  src_ip.u32         dictionary code -> dict_src_ip.json
+  host.u32           dictionary code -> dict_host.json
+
+Each column is a flat little-endian array, so it can be appended to and loaded
+with a single read (numpy.fromfile when numpy is installed, array.fromfile
+otherwise). manifest.json is written last and its row count is authoritative:
+bytes past it (a write interrupted before the manifest) are cut off before the
+next append. Strings are dictionary-encoded: a few thousand distinct accounts
+or IPs become small integer codes that group-bys can count directly.
+"""
+
+import json, os, sys
+from array import array
+from datetime import datetime, timezone
+
+try:
+    import numpy as np  # optional: vectorized loads and group-bys
+except ImportError:
+    np = None
+
+STORE_VERSION = 1
+
+# column -> (array typecode, numpy dtype)
+NUMERIC_COLUMNS = {
+    'ts': ('q', '<i8'),
+    'event_id': ('H', '<u2'),
+}
+DICT_COLUMNS = ('account', 'src_ip', 'host')
+CODE_TYPE = ('I', '<u4')
+# ts of events without a parseable time; time filters and histograms skip it
+UNDATED_TS = 0
+
+def column_path(store, name):
+    typecode = NUMERIC_COLUMNS.get(name, CODE_TYPE)[0]
+    suffix = {'q': 'i64', 'H': 'u16', 'I': 'u32'}[typecode]
+    return os.path.join(store, f"{name}.{suffix}")
+
+def dict_path(store, name):
+    return os.path.join(store, f"dict_{name}.json")
+
+def to_epoch(when):
+    """'2025-11-05T19:38:25.9080000Z' -> epoch seconds (UNDATED_TS if missing or unparseable)."""
+    if not when:
+        return UNDATED_TS
+    try:
+        dt = datetime.fromisoformat(when.strip())
+    except ValueError:
+        try:
+            dt = datetime.strptime(when.strip()[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return UNDATED_TS
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def _load_manifest(store):
+    path = os.path.join(store, "manifest.json")
+    if not os.path.exists(path):
+        return {'version': STORE_VERSION, 'rows': 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _load_dict(store, name):
+    path = dict_path(store, name)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _itemsize(name):
+    return array(NUMERIC_COLUMNS.get(name, CODE_TYPE)[0]).itemsize
+
+def _trim_columns(store, rows):
+    """Cut every column back to `rows` entries (drops the tail of an interrupted write)."""
+    for name in (*NUMERIC_COLUMNS, *DICT_COLUMNS):
+        path = column_path(store, name)
+        expected = rows * _itemsize(name)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < expected:
+            raise ValueError(f"Column {path} holds fewer rows than manifest.json ({size} < {expected} bytes)")
+        if size > expected:
+            os.truncate(path, expected)
+
+def write_events(store, events, append=True):
+    """
+    Encode parsed events (dicts from parser.parse_block) into the store.
+    With append=False any existing store contents are replaced.
+    Returns the number of rows written.
+    """
+    os.makedirs(store, exist_ok=True)
+    manifest = _load_manifest(store) if append else {'version': STORE_VERSION, 'rows': 0}
+    if manifest.get('version') != STORE_VERSION:
+        raise ValueError(f"Unsupported store version in {store}: {manifest.get('version')}")
+
+    if append:
+        _trim_columns(store, manifest.get('rows', 0))
+
+    values = {name: (_load_dict(store, name) if append else []) for name in DICT_COLUMNS}
+    codes = {name: {v: i for i, v in enumerate(vals)} for name, vals in values.items()}
+
+    cols = {name: array(NUMERIC_COLUMNS[name][0]) for name in NUMERIC_COLUMNS}
+    cols.update({name: array(CODE_TYPE[0]) for name in DICT_COLUMNS})
+
+    for ev in events:
+        cols['ts'].append(to_epoch(ev.get('when')))
+        cols['event_id'].append(int(ev.get('event_id') or 0))
+        for name in DICT_COLUMNS:
+            val = ev.get(name) or 'UNKNOWN'
+            code = codes[name].get(val)
+            if code is None:
+                code = codes[name][val] = len(values[name])
+                values[name].append(val)
+            cols[name].append(code)
+
+    mode = "ab" if append else "wb"
+    for name, arr in cols.items():
+        if sys.byteorder != "little":
+            arr.byteswap()
+        with open(column_path(store, name), mode) as f:
+            arr.tofile(f)
+
+    for name in DICT_COLUMNS:
+        _write_json(dict_path(store, name), values[name])
+
+    written = len(cols['ts'])
+    manifest['rows'] = manifest.get('rows', 0) + written
+    manifest['columns'] = {name: os.path.basename(column_path(store, name))
+                           for name in (*NUMERIC_COLUMNS, *DICT_COLUMNS)}
+    _write_json(os.path.join(store, "manifest.json"), manifest)
+    return written
+
+def load_store(store):
+    """
+    Load all columns. Returns (columns, dictionaries, rows) where columns are
+    numpy arrays if numpy is available, else array.array.
+    """
+    manifest = _load_manifest(store)
+    rows = manifest.get('rows', 0)
+    columns = {}
+    for name in (*NUMERIC_COLUMNS, *DICT_COLUMNS):
+        typecode, dtype = NUMERIC_COLUMNS.get(name, CODE_TYPE)
+        path = column_path(store, name)
+        if np is not None:
+            columns[name] = np.fromfile(path, dtype=dtype, count=rows) if rows else np.zeros(0, dtype=dtype)
+        else:
+            arr = array(typecode)
+            if rows:
+                with open(path, "rb") as f:
+                    arr.fromfile(f, rows)
+                if sys.byteorder != "little":
+                    arr.byteswap()
+            columns[name] = arr
+    dictionaries = {name: _load_dict(store, name) for name in DICT_COLUMNS}
+    return columns, dictionaries, rows
@@ -0,0 +1,186 @@
+"""
+dashboard.py — Streaming HTML dashboard renderer
+------------------------------------------------
+Renders the logon triage dashboard from a parser.summarize() result.
+
+- Templates are compiled once at import (string.Template) and the page is
+  written section by section, so nothing builds one giant string.
+- Every value that comes from the logs (account names, IPs, hosts) is HTML
+  escaped; the embedded JSON is escaped for a <script> context.
+- The top 10 rows of each table are rendered server-side (readable without
+  JavaScript); the full distributions ship as compact JSON arrays and are
+  paged/filtered client-side, so tens of thousands of distinct IPs cost a
+  few bytes per row instead of a <tr> each.
+- Hourly failed/successful counts are drawn as time-series panels.
+"""
+
+import json
+from html import escape
+from string import Template
+
+TOP_N = 10
+PAGE_SIZE = 25
+
+# (summary key, title, first column header, element id)
+TABLES = (
+    ('failed_by_ip', "Source IPs (Failed 4625)", "Source IP", "failed-ip"),
+    ('failed_by_user', "Targeted Accounts (Failed 4625)", "Account", "failed-user"),
+    ('success_by_user', "Accounts (Successful 4624)", "Account", "success-user"),
+)
+SERIES = (
+    ('failed_by_hour', "Failed logons per hour (4625)", "#d00000"),
+    ('success_by_hour', "Successful logons per hour (4624)", "#2d6a4f"),
+)
+
+HEAD = Template("""<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>$title</title>
+  <style>
+    body { font-family: Arial, sans-serif; margin: 24px; color: #222; }
+    table { border-collapse: collapse; min-width: 360px; }
+    th, td { border: 1px solid #999; padding: 4px 8px; text-align: left; }
+    .pager { margin: 6px 0 18px 0; }
+    .pager input { width: 200px; }
+    svg { border: 1px solid #ddd; background: #fafafa; }
+  </style>
+</head>
+<body>
+  <h1>$title</h1>
+
+  <h2>Totals</h2>
+  <p><strong>Failed logons (4625):</strong> $failed_total</p>
+  <p><strong>Successful logons (4624):</strong> $success_total</p>
+""")
+
+SERIES_PANEL = Template("""
+  <h2>$title</h2>
+  <div class="series" id="$id" data-key="$key" data-color="$color"><p>$fallback</p></div>
+""")
+
+TABLE_OPEN = Template("""
+  <h2>$title</h2>
+  <p>$distinct distinct values (top $top shown; full list is paged below when JavaScript is enabled)</p>
+  <table border="1" cellpadding="4" id="$id" data-key="$key">
+    <thead><tr><th>$header</th><th>Count</th></tr></thead>
+    <tbody>
+""")
+TABLE_ROW = Template("      <tr><td>$item</td><td>$count</td></tr>\n")
+TABLE_CLOSE = "    </tbody>\n  </table>\n"
+
+# Data is emitted as <script type="application/json"> and rendered by this
+# script; it never goes through innerHTML, so values stay inert text.
+SCRIPT = Template("""
+  <script type="application/json" id="dashboard-data">$data</script>
+  <script>
+  (function () {
+    var data = JSON.parse(document.getElementById("dashboard-data").textContent);
+    var PAGE = $page_size;
+
+    function cell(tr, text) { var td = document.createElement("td"); td.textContent = text; tr.appendChild(td); }
+
+    document.querySelectorAll("table[data-key]").forEach(function (table) {
+      var rows = data.tables[table.dataset.key] || [];
+      var tbody = table.tBodies[0], page = 0, view = rows;
+      var pager = document.createElement("div"); pager.className = "pager";
+      var filter = document.createElement("input"); filter.placeholder = "filter...";
+      var prev = document.createElement("button"); prev.textContent = "< prev";
+      var next = document.createElement("button"); next.textContent = "next >";
+      var info = document.createElement("span");
+      [filter, prev, next, info].forEach(function (el) { pager.appendChild(el); pager.appendChild(document.createTextNode(" ")); });
+      table.parentNode.insertBefore(pager, table.nextSibling);
+
+      function draw() {
+        var pages = Math.max(1, Math.ceil(view.length / PAGE));
+        page = Math.min(Math.max(page, 0), pages - 1);
+        while (tbody.firstChild) { tbody.removeChild(tbody.firstChild); }
+        view.slice(page * PAGE, (page + 1) * PAGE).forEach(function (r) {
+          var tr = document.createElement("tr"); cell(tr, r[0]); cell(tr, r[1]); tbody.appendChild(tr);
+        });
+        info.textContent = "page " + (page + 1) + " / " + pages + " (" + view.length + " rows)";
+      }
+      filter.oninput = function () {
+        var q = filter.value.toLowerCase();
+        view = q ? rows.filter(function (r) { return String(r[0]).toLowerCase().indexOf(q) >= 0; }) : rows;
+        page = 0; draw();
+      };
+      prev.onclick = function () { page--; draw(); };
+      next.onclick = function () { page++; draw(); };
+      draw();
+    });
+
+    var NS = "http://www.w3.org/2000/svg";
+    document.querySelectorAll("div.series").forEach(function (div) {
+      var pts = data.series[div.dataset.key] || [];
+      if (!pts.length) { return; }
+      var w = 900, h = 160, max = 1;
+      pts.forEach(function (p) { if (p[1] > max) { max = p[1]; } });
+      var bw = Math.max(1, w / pts.length);
+      var svg = document.createElementNS(NS, "svg");
+      svg.setAttribute("width", w); svg.setAttribute("height", h + 20);
+      pts.forEach(function (p, i) {
+        var bh = Math.max(1, (p[1] / max) * h);
+        var r = document.createElementNS(NS, "rect");
+        r.setAttribute("x", i * bw); r.setAttribute("y", h - bh);
+        r.setAttribute("width", Math.max(1, bw - 1)); r.setAttribute("height", bh);
+        r.setAttribute("fill", div.dataset.color);
+        var t = document.createElementNS(NS, "title"); t.textContent = p[0] + ":00Z  " + p[1];
+        r.appendChild(t); svg.appendChild(r);
+      });
+      var label = document.createElementNS(NS, "text");
+      label.setAttribute("x", 0); label.setAttribute("y", h + 15); label.setAttribute("font-size", "11");
+      label.textContent = pts[0][0] + ":00Z .. " + pts[pts.length - 1][0] + ":00Z   (max " + max + "/h)";
+      svg.appendChild(label);
+      while (div.firstChild) { div.removeChild(div.firstChild); }
+      div.appendChild(svg);
+    });
+  })();
+  </script>
+</body>
+</html>
+""")
+
+def script_json(obj):
+    """Compact JSON that is safe inside a <script> element."""
+    text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+    return (text.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+                .replace('\u2028', '\\u2028').replace('\u2029', '\\u2029'))
+
+def _sorted_items(counter):
+    # Descending count, then key, so the output is deterministic
+    return sorted(counter.items(), key=lambda kv: (-kv[1], str(kv[0])))
+
+def iter_dashboard(summary, title="Windows Logon Triage Dashboard"):
+    """Yield the dashboard HTML in chunks."""
+    yield HEAD.substitute(
+        title=escape(title),
+        failed_total=int(summary['failed_total']),
+        success_total=int(summary['success_total']),
+    )
+
+    series = {}
+    for key, panel_title, color in SERIES:
+        points = sorted((summary.get(key) or {}).items())
+        series[key] = [[str(k), v] for k, v in points]
+        total = sum(v for _, v in points)
+        fallback = f"{len(points)} hourly buckets, {total} events" if points else "No timestamped events."
+        yield SERIES_PANEL.substitute(title=escape(panel_title), id=escape(key), key=escape(key),
+                                      color=escape(color), fallback=escape(fallback))
+
+    tables = {}
+    for key, table_title, header, element_id in TABLES:
+        items = _sorted_items(summary.get(key) or {})
+        tables[key] = [[str(k), v] for k, v in items]
+        yield TABLE_OPEN.substitute(title=escape(table_title), distinct=len(items), top=TOP_N,
+                                    id=escape(element_id), key=escape(key), header=escape(header))
+        yield "".join(TABLE_ROW.substitute(item=escape(str(k)), count=int(v)) for k, v in items[:TOP_N])
+        yield TABLE_CLOSE
+
+    yield SCRIPT.substitute(data=script_json({'tables': tables, 'series': series}), page_size=PAGE_SIZE)
+
+def render_dashboard(summary, out_path, title="Windows Logon Triage Dashboard"):
+    """Stream the dashboard to `out_path`."""
+    with open(out_path, "w", encoding="utf-8") as f:
+        for chunk in iter_dashboard(summary, title):
+            f.write(chunk)
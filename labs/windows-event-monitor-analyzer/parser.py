@@ -1,13 +1,23 @@
-import argparse, os, re
+import argparse, hashlib, json, os, re, sys
 from collections import Counter
 from datetime import datetime
 
+from columnar import write_events
+from dashboard import render_dashboard
+
+# Repo-wide instrumentation (--profile)
+SHARED_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "shared"))
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+from instrumentation import add_profile_args, profile_session
+
 # More forgiving patterns: match anywhere in the line, ignore case
 EVENT_HEADER_RE = re.compile(r'Event ID:\s*(\d+)', re.IGNORECASE)
 DATETIME_RE = re.compile(r'Date:\s*(.+)', re.IGNORECASE)
 ACCOUNT_NAME_RE = re.compile(r'Account Name:\s*(.+)', re.IGNORECASE)
 TARGET_NAME_RE = re.compile(r'User Name:\s*(.+)', re.IGNORECASE)
 SRC_IP_RE = re.compile(r'Source Network Address:\s*(.+)', re.IGNORECASE)
+COMPUTER_RE = re.compile(r'^\s*Computer:\s*(.+)', re.IGNORECASE)
 IP_INLINE_RE = re.compile(
     r'(?:(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|[01]?\d?\d)'
 )
@@ -19,27 +29,35 @@ def parse_wevtutil_text(path):
     or the same with 4624.
     Splits events by lines starting with 'Event['.
     """
-    events = []
     with open(path, "r", encoding="utf-16", errors="ignore") as f:
-        block = []
-        for line in f:
-            if line.startswith("Event[") and block:
-                ev = parse_block(block)
-                if ev:
-                    events.append(ev)
-                block = [line.rstrip("\n")]
-            else:
-                block.append(line.rstrip("\n"))
-        # last block
-        if block:
-            ev = parse_block(block)
-            if ev:
-                events.append(ev)
+        return parse_lines(f)
+
+def iter_blocks(lines):
+    """Yield one list of lines per 'Event[' block."""
+    block = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("Event[") and block:
+            yield block
+            block = [line]
+        else:
+            block.append(line)
+    # last block
+    if block:
+        yield block
+
+def parse_lines(lines):
+    """Parse already-decoded export lines into logon events."""
+    events = []
+    for block in iter_blocks(lines):
+        ev = parse_block(block)
+        if ev:
+            events.append(ev)
     return events
 
 def parse_block(lines):
-    """Extract event_id, timestamp, account, and src_ip from one event block."""
-    ev = {'event_id': None, 'when': None, 'account': None, 'src_ip': None}
+    """Extract event_id, timestamp, account, src_ip, and host from one event block."""
+    ev = {'event_id': None, 'when': None, 'account': None, 'src_ip': None, 'host': None}
 
     for ln in lines:
         ln = ln.rstrip("\r\n")
@@ -54,6 +72,11 @@ def parse_block(lines):
         if m and not ev['when']:
             ev['when'] = m.group(1).strip()
 
+        # Computer (header line)
+        m = COMPUTER_RE.search(ln)
+        if m and not ev['host']:
+            ev['host'] = m.group(1).strip()
+
         # Source IP
         m = SRC_IP_RE.search(ln)
         if m and not ev['src_ip']:
@@ -95,14 +118,137 @@ def summarize(events):
     def count_by(items, key):
         return Counter((i.get(key) or 'UNKNOWN') for i in items)
 
+    def count_by_hour(items):
+        # 'YYYY-MM-DDTHH' of the UTC timestamp; undated events are left out
+        return Counter(i['when'][:13] for i in items if i.get('when'))
+
     return {
         'failed_total': len(failed),
         'success_total': len(success),
         'failed_by_ip': count_by(failed, 'src_ip'),
         'failed_by_user': count_by(failed, 'account'),
         'success_by_user': count_by(success, 'account'),
+        'failed_by_hour': count_by_hour(failed),
+        'success_by_hour': count_by_hour(success),
     }
 
+def merge_summaries(summaries):
+    """Add several summaries together (totals and per-key counters)."""
+    merged = summarize([])
+    for s in summaries:
+        for key, val in s.items():
+            merged[key] += val
+    return merged
+
+# --- Incremental mode ---
+# Hourly re-exports are the same log with new events appended at the end, so a
+# checkpoint (file identity, byte offset, last Event[N] index) plus the running
+# totals lets the next run parse only the tail.
+# v2: summaries carry failed_by_hour/success_by_hour
+# v3: one forced full re-parse, so --store directories that earlier runs filled
+#     with duplicate rows (a full re-parse used to append) are rebuilt
+STATE_VERSION = 3
+FINGERPRINT_BYTES = 4096
+EVENT_INDEX_RE = re.compile(r'^Event\[(\d+)\]')
+
+def file_fingerprint(path, length=FINGERPRINT_BYTES):
+    """Hash the head of the export; a rotated/cleared log changes it."""
+    with open(path, "rb") as f:
+        head = f.read(length)
+    return hashlib.sha256(head).hexdigest()
+
+def detect_utf16(head):
+    """Return (codec, bom_length) for a wevtutil export."""
+    if head.startswith(b"\xfe\xff"):
+        return "utf-16-be", 2
+    if head.startswith(b"\xff\xfe"):
+        return "utf-16-le", 2
+    return "utf-16-le", 0
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {'version': STATE_VERSION, 'files': {}}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return {'version': STATE_VERSION, 'files': {}}
+    return state
+
+def save_state(path, state):
+    """Write the state file atomically so a crash never leaves half a checkpoint."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def summary_to_json(summary):
+    return {k: (dict(v) if isinstance(v, Counter) else v) for k, v in summary.items()}
+
+def summary_from_json(data):
+    summary = summarize([])
+    for key, val in data.items():
+        summary[key] = Counter(val) if isinstance(summary.get(key), Counter) else val
+    return summary
+
+def parse_incremental(path, state):
+    """
+    Parse only the part of `path` appended since the last checkpoint and merge
+    it into the stored totals. Falls back to a full parse when the file is new,
+    was truncated/rotated, or the tail does not continue the last Event[N].
+    Returns (summary, new_events, was_full_parse).
+    """
+    key = os.path.abspath(path)
+    entry = state['files'].get(key)
+    size = os.path.getsize(path)
+    # Hash the same number of head bytes as last time, so a small export that
+    # has since grown is still recognised as the same file.
+    head_len = entry.get('head_len', FINGERPRINT_BYTES) if entry else min(size, FINGERPRINT_BYTES)
+    fingerprint = file_fingerprint(path, head_len)
+
+    with open(path, "rb") as f:
+        codec, bom_len = detect_utf16(f.read(2))
+        resume = (entry is not None
+                  and entry.get('fingerprint') == fingerprint
+                  and head_len <= size
+                  and bom_len <= entry.get('offset', -1) <= size)
+        offset = entry['offset'] if resume else bom_len
+        f.seek(offset)
+        data = f.read()
+
+    # UTF-16 code units are 2 bytes; leave a dangling odd byte for next time
+    usable = len(data) - (len(data) % 2)
+    text = data[:usable].decode(codec, errors="ignore")
+    blocks = list(iter_blocks(text.splitlines()))
+
+    last_record = entry.get('last_record') if resume else None
+    if resume and blocks and last_record is not None:
+        m = EVENT_INDEX_RE.match(blocks[0][0]) if blocks[0] else None
+        if not m or int(m.group(1)) != last_record + 1:
+            # The tail does not continue where we stopped: re-read everything
+            state['files'].pop(key, None)
+            return parse_incremental(path, state)
+
+    new_events = []
+    for block in blocks:
+        m = EVENT_INDEX_RE.match(block[0]) if block else None
+        if m:
+            last_record = int(m.group(1))
+        ev = parse_block(block)
+        if ev:
+            new_events.append(ev)
+
+    previous = summary_from_json(entry['summary']) if resume else summarize([])
+    summary = merge_summaries([previous, summarize(new_events)])
+
+    state['files'][key] = {
+        'fingerprint': fingerprint,
+        'head_len': head_len,
+        'offset': offset + usable,
+        'last_record': last_record,
+        'summary': summary_to_json(summary),
+    }
+    return summary, new_events, not resume
+
 def fmt(counter, title):
     lines = [title]
     for item, cnt in counter.most_common(10):
@@ -110,89 +256,31 @@ def fmt(counter, title):
     return "\n".join(lines) + "\n"
 
 def generate_html_dashboard(summary, out_path):
-    """Generate a simple HTML dashboard showing logon stats."""
-    failed_total = summary['failed_total']
-    success_total = summary['success_total']
-
-    def counter_to_rows(counter):
-        rows = []
-        for item, cnt in counter.most_common(10):
-            rows.append(f"<tr><td>{item}</td><td>{cnt}</td></tr>")
-        return "\n".join(rows)
-
-    html = f"""<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Windows Logon Triage Dashboard</title>
-</head>
-<body>
-  <h1>Windows Logon Triage Dashboard</h1>
-
-  <h2>Totals</h2>
-  <p><strong>Failed logons (4625):</strong> {failed_total}</p>
-  <p><strong>Successful logons (4624):</strong> {success_total}</p>
-
-  <h2>Top Source IPs (Failed 4625)</h2>
-  <table border="1" cellpadding="4">
-    <tr><th>Source IP</th><th>Count</th></tr>
-    {counter_to_rows(summary['failed_by_ip'])}
-  </table>
-
-  <h2>Top Targeted Accounts (Failed 4625)</h2>
-  <table border="1" cellpadding="4">
-    <tr><th>Account</th><th>Count</th></tr>
-    {counter_to_rows(summary['failed_by_user'])}
-  </table>
-
-  <h2>Top Accounts (Successful 4624)</h2>
-  <table border="1" cellpadding="4">
-    <tr><th>Account</th><th>Count</th></tr>
-    {counter_to_rows(summary['success_by_user'])}
-  </table>
-</body>
-</html>
-"""
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(html)
-
-def main():
-    ap = argparse.ArgumentParser(description="Parse wevtutil text exports for 4625/4624 triage.")
-    ap.add_argument("--failed", help="Path to FailedLogons.txt")
-    ap.add_argument("--success", help="Path to SuccessfulLogons.txt")
-    ap.add_argument("--out", help="Write report to this path (optional)")
-    args = ap.parse_args()
-
-    events = []
-    if args.failed and os.path.exists(args.failed):
-        events += parse_wevtutil_text(args.failed)
-    if args.success and os.path.exists(args.success):
-        events += parse_wevtutil_text(args.success)
-
-    summary = summarize(events)
+    """Generate the HTML dashboard (totals, hourly panels, paged tables)."""
+    render_dashboard(summary, out_path)
 
-    # Ratio-based anomaly detection
+def ratio_note(summary):
+    """Ratio-based anomaly detection (failed 4625 vs. successful 4624)."""
     failed = summary['failed_total']
     success = summary['success_total']
     if success > 0:
         fail_ratio = failed / success
         if fail_ratio > 0.3:
-            ratio_note = f"ALERT: High failure ratio detected ({fail_ratio:.2f}). Possible brute-force or password spraying."
-        else:
-            ratio_note = f"Failure ratio is {fail_ratio:.2f}, within normal bounds."
-    else:
-        if failed > 0:
-            ratio_note = "ALERT: Failed logons detected with no successful logons recorded."
-        else:
-            ratio_note = "No logon activity detected."
+            return f"ALERT: High failure ratio detected ({fail_ratio:.2f}). Possible brute-force or password spraying."
+        return f"Failure ratio is {fail_ratio:.2f}, within normal bounds."
+    if failed > 0:
+        return "ALERT: Failed logons detected with no successful logons recorded."
+    return "No logon activity detected."
 
+def build_report(summary):
+    """Render the plain-text triage report for a summary."""
     now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%SZ')
     report = []
     report.append("Windows Logon Triage Summary")
     report.append(f"Generated: {now} UTC\n")
     report.append(f"Total failed logons (4625): {summary['failed_total']}")
     report.append(f"Total successful logons (4624): {summary['success_total']}\n")
-    report.append(ratio_note + "\n")
+    report.append(ratio_note(summary) + "\n")
     report.append(fmt(summary['failed_by_ip'], "Top source IPs (failed 4625):"))
     report.append(fmt(summary['failed_by_user'], "Top targeted accounts (failed 4625):"))
     report.append(fmt(summary['success_by_user'], "Top accounts (successful 4624):"))
@@ -200,8 +288,60 @@ def main():
     report.append("  • Investigate IPs with unusually high failed attempts.")
     report.append("  • Compare failed vs. successful to spot possible compromises.")
     report.append("  • Align timestamps with Wireshark or firewall logs for deeper correlation.\n")
+    return "\n".join(report)
+
+def main():
+    ap = argparse.ArgumentParser(description="Parse wevtutil text exports for 4625/4624 triage.")
+    ap.add_argument("--failed", help="Path to FailedLogons.txt")
+    ap.add_argument("--success", help="Path to SuccessfulLogons.txt")
+    ap.add_argument("--out", help="Write report to this path (optional)")
+    ap.add_argument("--state", help="Incremental mode: checkpoint/state file (parse only newly appended events)")
+    ap.add_argument("--store", help="Also persist parsed events to this columnar store directory (see query.py)")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    with profile_session(args, "wevt-parser"):
+        run(args)
+
+def run(args):
+    paths = [p for p in (args.failed, args.success) if p and os.path.exists(p)]
+
+    append = False
+    if args.state:
+        state = load_state(args.state)
+        summaries = []
+        per_file = []
+        for p in paths:
+            file_summary, new_events, full = parse_incremental(p, state)
+            mode = "full parse" if full else "incremental"
+            print(f"[+] {p}: {len(new_events)} new events ({mode})")
+            summaries.append(file_summary)
+            per_file.append((p, new_events, full))
+        summary = merge_summaries(summaries)
+        # A full re-parse returns every event of that file, which the store already
+        # holds; rebuild the store rather than append duplicates.
+        append = not any(full for _, _, full in per_file)
+        events = []
+        for p, new_events, full in per_file:
+            if append or full or not args.store:
+                events += new_events
+            else:
+                events += parse_wevtutil_text(p)
+    else:
+        events = []
+        for p in paths:
+            events += parse_wevtutil_text(p)
+        summary = summarize(events)
+
+    # Columnar export: incremental runs append only the new events
+    if args.store:
+        written = write_events(args.store, events, append=append)
+        print(f"[+] Stored {written} events in {args.store}")
+
+    # Save the checkpoint only once the new events are safely stored
+    if args.state:
+        save_state(args.state, state)
 
-    report_text = "\n".join(report)
+    report_text = build_report(summary)
     print(report_text)
 
     # Write HTML dashboard
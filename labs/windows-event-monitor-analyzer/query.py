@@ -0,0 +1,157 @@
+"""
+Ad-hoc queries over the columnar logon store written by `parser.py --store`.
+
+Examples:
+  python query.py --store evidence/store groupby account --event 4625
+  python query.py --store evidence/store groupby host src_ip --top 20
+  python query.py --store evidence/store hist --bucket hour --event 4625 --since 2025-11-05
+  python query.py --store evidence/store hist --bucket hour-of-day --account Tim
+
+Filters and group-bys run on the integer/dictionary-code columns (numpy when
+installed), so weeks of logons never touch the raw UTF-16 exports again.
+"""
+
+import argparse, csv, sys
+from collections import Counter
+from datetime import datetime, timezone
+
+from columnar import DICT_COLUMNS, UNDATED_TS, load_store, np, to_epoch
+
+BUCKETS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+def build_mask(columns, dictionaries, rows, args, dated=False):
+    """
+    Return a boolean mask (numpy) or list of row indexes (fallback).
+    Undated events (ts == UNDATED_TS) are left out of time filters, and out of
+    everything when `dated` is set (histograms).
+    """
+    conds = []
+    if args.event:
+        conds.append(('event_id', int(args.event)))
+    for name in DICT_COLUMNS:
+        val = getattr(args, name, None)
+        if val is not None:
+            try:
+                code = dictionaries[name].index(val)
+            except ValueError:
+                code = -1  # value never seen: matches nothing
+            conds.append((name, code))
+    since = to_epoch(args.since) if args.since else None
+    until = to_epoch(args.until) if args.until else None
+    for flag, value in (("--since", since), ("--until", until)):
+        if value == UNDATED_TS:
+            raise SystemExit(f"[!] {flag}: not an ISO time")
+    dated = dated or since is not None or until is not None
+
+    if np is not None:
+        mask = np.ones(rows, dtype=bool)
+        for name, val in conds:
+            mask &= columns[name] == val
+        if since is not None:
+            mask &= columns['ts'] >= since
+        if until is not None:
+            mask &= columns['ts'] < until
+        if dated:
+            mask &= columns['ts'] != UNDATED_TS
+        return mask
+
+    idx = range(rows)
+    for name, val in conds:
+        col = columns[name]
+        idx = [i for i in idx if col[i] == val]
+    if since is not None:
+        idx = [i for i in idx if columns['ts'][i] >= since]
+    if until is not None:
+        idx = [i for i in idx if columns['ts'][i] < until]
+    if dated:
+        idx = [i for i in idx if columns['ts'][i] != UNDATED_TS]
+    return list(idx)
+
+def group_by(columns, dictionaries, mask, keys):
+    """Count rows per key tuple. Returns Counter of tuple(str) -> count."""
+    if np is not None:
+        sizes = [max(len(dictionaries[k]), 1) for k in keys]
+        combined = np.zeros(int(mask.sum()), dtype=np.int64)
+        for k, size in zip(keys, sizes):
+            combined = combined * size + columns[k][mask].astype(np.int64)
+        uniq, counts = np.unique(combined, return_counts=True)
+        out = Counter()
+        for code, cnt in zip(uniq.tolist(), counts.tolist()):
+            parts = []
+            for k, size in reversed(list(zip(keys, sizes))):
+                code, c = divmod(code, size)
+                parts.append(dictionaries[k][c])
+            out[tuple(reversed(parts))] = cnt
+        return out
+
+    cols = [columns[k] for k in keys]
+    raw = Counter(tuple(col[i] for col in cols) for i in mask)
+    return Counter({tuple(dictionaries[k][c] for k, c in zip(keys, codes)): cnt
+                    for codes, cnt in raw.items()})
+
+def histogram(columns, mask, bucket):
+    """Count rows per time bucket. Returns sorted list of (label, count)."""
+    ts = columns['ts']
+    if bucket == 'hour-of-day':
+        if np is not None:
+            counts = np.bincount((ts[mask] // 3600) % 24, minlength=24).tolist()
+        else:
+            c = Counter((ts[i] // 3600) % 24 for i in mask)
+            counts = [c.get(h, 0) for h in range(24)]
+        return [(f"{h:02d}:00", n) for h, n in enumerate(counts)]
+
+    width = BUCKETS[bucket]
+    if np is not None:
+        uniq, counts = np.unique(ts[mask] // width, return_counts=True)
+        pairs = zip(uniq.tolist(), counts.tolist())
+    else:
+        pairs = sorted(Counter(ts[i] // width for i in mask).items())
+    fmt = "%Y-%m-%d" if bucket == 'day' else "%Y-%m-%d %H:%M"
+    return [(datetime.fromtimestamp(b * width, tz=timezone.utc).strftime(fmt), n) for b, n in pairs]
+
+def emit(rows, header, as_csv):
+    if as_csv:
+        w = csv.writer(sys.stdout)
+        w.writerow(header)
+        w.writerows(rows)
+        return
+    for row in rows:
+        *keys, cnt = row
+        print(f"  - {' | '.join(str(k) for k in keys)}: {cnt}")
+
+def main():
+    # Filters are shared by every sub-command
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--event", choices=("4624", "4625"), help="Only this event ID")
+    filters.add_argument("--account", help="Only this account")
+    filters.add_argument("--src-ip", dest="src_ip", help="Only this source IP")
+    filters.add_argument("--host", help="Only this host")
+    filters.add_argument("--since", help="ISO time, inclusive (UTC if no offset)")
+    filters.add_argument("--until", help="ISO time, exclusive (UTC if no offset)")
+    filters.add_argument("--csv", action="store_true", help="Write CSV to stdout instead of a text list")
+
+    ap = argparse.ArgumentParser(description="Query the columnar logon event store.")
+    ap.add_argument("--store", required=True, help="Store directory written by parser.py --store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    g = sub.add_parser("groupby", parents=[filters], help="Count events per column value(s)")
+    g.add_argument("keys", nargs="+", choices=DICT_COLUMNS)
+    g.add_argument("--top", type=int, default=10, help="Show the N largest groups (0 = all)")
+
+    h = sub.add_parser("hist", parents=[filters], help="Time histogram")
+    h.add_argument("--bucket", choices=(*BUCKETS, 'hour-of-day'), default='hour')
+
+    args = ap.parse_args()
+
+    columns, dictionaries, rows = load_store(args.store)
+    mask = build_mask(columns, dictionaries, rows, args, dated=args.cmd == "hist")
+
+    if args.cmd == "groupby":
+        counts = group_by(columns, dictionaries, mask, args.keys)
+        top = counts.most_common(args.top or None)
+        emit([(*k, n) for k, n in top], [*args.keys, "count"], args.csv)
+    else:
+        emit(histogram(columns, mask, args.bucket), ["bucket", "count"], args.csv)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Instrumentation
+- Shared --profile support for the portfolio CLIs (flagship pipelines/run.py,
+  windows-event-monitor-analyzer/parser.py, report_generator.py, run_automation.py)
+- cprofile: deterministic cProfile of the run (exact call counts, higher overhead)
+- sample:   a background thread samples every thread's stack every few
+  milliseconds via sys._current_frames() (low overhead, safe on large inputs)
+- tracemalloc peak memory and the top allocation sites near the peak (on by default)
+- Writes <name>-<timestamp>.collapsed (flamegraph.pl / speedscope input) and
+  <name>-<timestamp>.txt (top functions + memory); cprofile also writes .prof
+
+Only the calling process is profiled; worker processes are not.
+
+Usage from a CLI:
+    add_profile_args(parser)
+    args = parser.parse_args()
+    with profile_session(args, "parser"):
+        run(args)
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+PROFILE_DIR_DEFAULT = "profiles"
+SAMPLE_INTERVAL_MS = 5.0
+TOP_N = 25
+# Frames kept per tracemalloc allocation (more = slower; 1 is enough for a per-line summary)
+TRACEMALLOC_FRAMES = 1
+# Peak watcher: poll traced memory this often; re-snapshot once it grows 50% past the last
+# snapshot (snapshots are expensive on big heaps, so only O(log peak) are taken)
+MEMORY_POLL_S = 0.05
+MEMORY_GROWTH = 1.5
+MEMORY_MIN_BYTES = 1 << 20
+# cProfile call graphs can be cyclic; deeper collapsed stacks are cut here
+MAX_STACK_DEPTH = 64
+
+Frame = Tuple[str, int, str]  # (filename, first line, function), as in pstats
+
+
+def add_profile_args(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", choices=("cprofile", "sample"), nargs="?", const="sample", default=None,
+                       help="Profile this run (default mode: sample) and write collapsed stacks + a summary")
+    group.add_argument("--profile-out", default=PROFILE_DIR_DEFAULT,
+                       help=f"Directory for profile output (default: {PROFILE_DIR_DEFAULT})")
+    group.add_argument("--profile-interval", type=float, default=SAMPLE_INTERVAL_MS,
+                       help=f"Sampling interval in ms (default: {SAMPLE_INTERVAL_MS:g})")
+    group.add_argument("--profile-memory", action=argparse.BooleanOptionalAction, default=True,
+                       help="Track peak memory and top allocation sites with tracemalloc (default: on)")
+
+
+def frame_label(frame: Frame) -> str:
+    filename, line, func = frame
+    if filename == "~":  # builtins, e.g. <built-in method builtins.sorted>
+        return func
+    return f"{func} ({os.path.basename(filename)}:{line})"
+
+
+class Sampler:
+    """Samples every thread's Python stack at a fixed interval from a daemon thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if names.get(ident, "").startswith("profile-"):
+                    continue  # this sampler and the memory watcher
+                stack: List[Frame] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[(names.get(ident, str(ident)),) + tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> List[str]:
+        return [f"{';'.join([key[0]] + [frame_label(f) for f in key[1:]])} {count}"
+                for key, count in self.stacks.most_common()]
+
+    def top(self, n: int) -> List[str]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for key, count in self.stacks.items():
+            frames = key[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        all_samples = sum(self.stacks.values()) or 1
+        lines = [f"{'self%':>7} {'total%':>7}  function"]
+        for frame, count in own.most_common(n):
+            lines.append(f"{100 * count / all_samples:6.1f}% {100 * total[frame] / all_samples:6.1f}%  {frame_label(frame)}")
+        return lines
+
+
+class PeakWatcher:
+    """
+    tracemalloc only reports the peak size, not what was allocated at the peak, so
+    a daemon thread snapshots the heap each time traced memory grows 50% past the
+    previous snapshot. The last snapshot is the closest view of the peak.
+    """
+
+    def __init__(self, poll: float = MEMORY_POLL_S):
+        self.poll = poll
+        self.snapshot: tracemalloc.Snapshot | None = None
+        self.snapshot_size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-memory", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.check()
+        if self.snapshot is None:  # small run: never crossed MEMORY_MIN_BYTES
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = tracemalloc.get_traced_memory()[0]
+
+    def check(self) -> None:
+        current = tracemalloc.get_traced_memory()[0]
+        if current > max(self.snapshot_size * MEMORY_GROWTH, MEMORY_MIN_BYTES):
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll):
+            self.check()
+
+
+def collapse_cprofile(stats: pstats.Stats) -> List[str]:
+    """
+    cProfile keeps caller -> callee edges, not full stacks, so stacks are rebuilt by
+    walking down from the root functions and splitting each function's time between
+    its callers in proportion to the time each edge accounts for. Values are microseconds.
+    """
+    raw: Dict[Frame, Any] = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[Frame, List[Tuple[Frame, float]]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [f for f, (_, _, _, _, callers) in raw.items() if not callers]
+
+    out: Counter = Counter()
+
+    def walk(func: Frame, share: float, path: Tuple[str, ...], seen: frozenset) -> None:
+        tt = raw[func][2]
+        path = path + (frame_label(func),)
+        own = int(tt * share * 1e6)
+        if own:
+            out[";".join(path)] += own
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            if callee in seen or callee not in raw:
+                continue
+            callee_ct = raw[callee][3]
+            if callee_ct > 0:
+                walk(callee, min(1.0, share * edge_ct / callee_ct), path, seen | {callee})
+
+    for root in roots:
+        walk(root, 1.0, (), frozenset({root}))
+    return [f"{stack} {value}" for stack, value in out.most_common()]
+
+
+def _pstats_top(stats: pstats.Stats, n: int) -> List[str]:
+    rows = []
+    for func, (cc, nc, tt, ct, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append((tt, ct, nc, func))
+    rows.sort(reverse=True)
+    lines = [f"{'self s':>9} {'cum s':>9} {'calls':>9}  function"]
+    for tt, ct, nc, func in rows[:n]:
+        lines.append(f"{tt:9.4f} {ct:9.4f} {nc:9d}  {frame_label(func)}")
+    return lines
+
+
+def _memory_summary(snapshot: tracemalloc.Snapshot, size: int, peak: int, n: int) -> List[str]:
+    lines = [f"peak traced memory: {peak / 1024 / 1024:.2f} MB",
+             f"top allocation sites in the snapshot nearest the peak ({size / 1024 / 1024:.2f} MB traced):"]
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, threading.__file__),
+                                       tracemalloc.Filter(False, __file__)))
+    for stat in snapshot.statistics("lineno")[:n]:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    return lines
+
+
+@contextmanager
+def profile_session(args: argparse.Namespace, name: str) -> Iterator[None]:
+    """
+    Profile the enclosed block when args.profile is set (see add_profile_args);
+    otherwise a no-op. Output is written even if the block exits via an exception
+    or sys.exit().
+    """
+    mode = getattr(args, "profile", None)
+    if not mode:
+        yield
+        return
+
+    memory = getattr(args, "profile_memory", True)
+    watcher = None
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        watcher = PeakWatcher()
+        watcher.start()
+    profiler = sampler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+    else:
+        sampler = Sampler(max(0.1, args.profile_interval) / 1000.0)
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if watcher is not None:
+            watcher.stop()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        _write(args.profile_out, name, mode, elapsed, profiler, sampler, watcher, peak)
+
+
+def _write(outdir: str, name: str, mode: str, elapsed: float, profiler: cProfile.Profile | None,
+           sampler: Sampler | None, watcher: PeakWatcher | None, peak: int) -> None:
+    os.makedirs(outdir, exist_ok=True)
+    base = os.path.join(outdir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    summary = [f"{name}: {mode} profile, {elapsed:.3f}s wall", f"command: {' '.join(sys.argv)}", ""]
+
+    if profiler is not None:
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(f"{base}.prof")
+        collapsed = collapse_cprofile(stats)
+        summary += ["top functions by self time:"] + _pstats_top(stats, TOP_N)
+    else:
+        collapsed = sampler.collapsed()
+        summary += [f"{sampler.samples} samples at {sampler.interval * 1000:g} ms; top functions by self samples:"]
+        summary += sampler.top(TOP_N)
+
+    if watcher is not None:
+        summary += [""] + _memory_summary(watcher.snapshot, watcher.snapshot_size, peak, TOP_N // 2)
+
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+        f.write("\n".join(collapsed) + ("\n" if collapsed else ""))
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(summary) + "\n")
+    peak_note = f", peak {peak / 1024 / 1024:.1f} MB" if watcher is not None else ""
+    print(f"[+] Profile ({mode}, {elapsed:.2f}s{peak_note}): {base}.txt, {base}.collapsed", file=sys.stderr)